@@ -5,7 +5,10 @@ import json
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 import requests
+import os
+import time
 from urllib.parse import quote
 
 # Initialize session state
@@ -15,14 +18,46 @@ if 'total_cost' not in st.session_state:
     st.session_state.total_cost = 0.0
 if 'request_count' not in st.session_state:
     st.session_state.request_count = 0
+if 'last_timings' not in st.session_state:
+    st.session_state.last_timings = None
+if 'parsed_results' not in st.session_state:
+    st.session_state.parsed_results = None
+if 'research_jobs' not in st.session_state:
+    st.session_state.research_jobs = []
+if 'collected_jobs' not in st.session_state:
+    st.session_state.collected_jobs = set()
 
 # Import ALL prompts from consolidated prompts.py
 try:
-    from utils.prompts import get_research_prompt, get_verse_enhancement_prompt, get_system_message
+    from utils.prompts import (get_research_prompt_parts, get_verse_enhancement_prompt, get_system_message,
+                               prompt_token_report, RESEARCH_MAX_TOKENS, REFERENCES_ONLY_MAX_TOKENS)
 except ImportError:
     st.error("Could not import prompts. Please ensure utils/prompts.py exists.")
     st.stop()
 
+from utils.lexicon_store import get_lexicon_store
+from utils.word_index import get_word_index
+from utils.bible_books import BIBLE_BOOKS, OLD_TESTAMENT_BOOKS
+from utils.word_aggregates import get_word_aggregates
+from utils.response_cache import get_response_cache
+from utils.figure_cache import get_figure_cache
+from utils.single_flight import flight_key, get_single_flight
+from utils.json_stream import IncrementalJSONParser, parse_research_json
+from utils.claude_client import (DEFAULT_MODEL, calculate_cost, calculate_usage_cost, get_claude_client,
+                                 min_cacheable_tokens)
+from utils.bible_api import search_keywords_concurrently
+from utils.verse_search import get_verse_index
+from utils.semantic_index import get_semantic_index, semantic_verse_search
+from utils.cross_references import get_cross_references
+from utils.references import parse_reference
+from utils.metrics import STAGE_SECONDS, get_metrics, span, start_metrics_server, timed
+from utils.retrieval import get_verse_context, prompt_size_report
+from utils.verse_store import get_verse_store
+from utils.verse_occurrences import get_verse_occurrences
+from utils.cooccurrence import get_cooccurrence_index
+from utils.job_executor import get_job_executor
+from utils.verse_validation import enrich_verses
+
 # Page configuration
 st.set_page_config(
     page_title="Biblical Research Tool",
@@ -31,110 +66,110 @@ st.set_page_config(
 )
 
 def load_bible_word_data():
-    """Load Bible word data from local JSON files"""
+    """Load Bible word data from the shared lexicon store (read-only views)"""
     try:
-        # Load from data/ folder in your repo
-        with open('data/greek_words.json', 'r') as f:
-            greek_words = json.load(f)
-        with open('data/hebrew_words.json', 'r') as f:
-            hebrew_words = json.load(f)
-        with open('data/word_occurrences.json', 'r') as f:
-            word_occurrences = json.load(f)
-        
-        return greek_words, hebrew_words, word_occurrences
+        snapshot = get_lexicon_store().get()
+        return snapshot.greek_words, snapshot.hebrew_words, snapshot.word_occurrences
     except FileNotFoundError as e:
         st.error(f"Data file not found: {e}")
         st.error("Please ensure the data/ folder contains: greek_words.json, hebrew_words.json, word_occurrences.json")
         return {}, {}, {}
 
 
+SECTION_CONFIGS = {
+    'key_verses': {'icon': '📖', 'color': 'blue', 'title': 'Key Bible Verses'},
+    'verse_context': {'icon': '📖', 'color': 'blue', 'title': 'Verse in Context'},
+    'main_verse': {'icon': '📖', 'color': 'blue', 'title': 'Main Verse'},
+    'connections': {'icon': '🔗', 'color': 'orange', 'title': 'Connections'},
+    'historical_background': {'icon': '🏛️', 'color': 'green', 'title': 'Historical Background'},
+    'theological_themes': {'icon': '⛪', 'color': 'indigo', 'title': 'Theological Themes'},
+    'cross_references': {'icon': '🔗', 'color': 'orange', 'title': 'Cross References'},
+    'key_cross_references': {'icon': '🔗', 'color': 'orange', 'title': 'Key Cross References'},
+    'thematic_connections': {'icon': '🔗', 'color': 'orange', 'title': 'Thematic Connections'},
+    'reflection_questions': {'icon': '💭', 'color': 'purple', 'title': 'Reflection Questions'},
+    'practical_application': {'icon': '🎯', 'color': 'red', 'title': 'Practical Application'},
+    'application_principles': {'icon': '🎯', 'color': 'red', 'title': 'Application Principles'},
+    'greek_hebrew_insights': {'icon': '🔤', 'color': 'gold', 'title': 'Greek/Hebrew Insights'},
+    'additional_study': {'icon': '📚', 'color': 'cyan', 'title': 'Additional Study'},
+    'opening_questions': {'icon': '🚀', 'color': 'green', 'title': 'Opening Questions'},
+    'observation_questions': {'icon': '👁️', 'color': 'blue', 'title': 'Observation Questions'},
+    'interpretation_questions': {'icon': '🧠', 'color': 'purple', 'title': 'Interpretation Questions'},
+    'application_questions': {'icon': '🎯', 'color': 'red', 'title': 'Application Questions'},
+    'discussion_questions': {'icon': '👥', 'color': 'orange', 'title': 'Discussion Questions'},
+    'prayer_points': {'icon': '🙏', 'color': 'violet', 'title': 'Prayer Points'},
+    'suggested_study_path': {'icon': '🛤️', 'color': 'brown', 'title': 'Suggested Study Path'}
+}
+
+def get_parsed_results(results_text: str):
+    """Parse research JSON once per result and memoize it in session state"""
+    memo = st.session_state.parsed_results
+    if memo is None or (memo[0] is not results_text and memo[0] != results_text):
+        with span("json_parse"):
+            data = parse_research_json(results_text)
+        if data is not None:
+            # Check/fill verse text against the local verse store in one batched pass
+            with span("verse_enrich"):
+                enrich_verses(data, get_verse_store())
+        st.session_state.parsed_results = (results_text, data)
+    return st.session_state.parsed_results[1]
+
 def parse_and_display_json_results(json_text: str):
     """Parse JSON results and display them in formatted containers"""
     try:
-        import json
-        
-        # Clean the JSON text - remove any non-JSON content
-        json_start = json_text.find('{')
-        json_end = json_text.rfind('}') + 1
+        data = get_parsed_results(json_text)
         
-        if json_start == -1 or json_end == 0:
-            # Fallback to original display if no JSON found
+        if data is None:
+            if '{' in json_text:
+                st.error("Error parsing research results. Displaying raw output:")
+            # Fallback to original display if no valid JSON found
             st.markdown(json_text)
             return
         
-        clean_json = json_text[json_start:json_end]
-        data = json.loads(clean_json)
-        
-        # Display title
-        if 'title' in data:
-            st.markdown(f"## {data['title']}")
-        
-        # Define section mappings
-        section_configs = {
-            'key_verses': {'icon': '📖', 'color': 'blue', 'title': 'Key Bible Verses'},
-            'verse_context': {'icon': '📖', 'color': 'blue', 'title': 'Verse in Context'},
-            'main_verse': {'icon': '📖', 'color': 'blue', 'title': 'Main Verse'},
-            'connections': {'icon': '🔗', 'color': 'orange', 'title': 'Connections'},
-            'historical_background': {'icon': '🏛️', 'color': 'green', 'title': 'Historical Background'},
-            'theological_themes': {'icon': '⛪', 'color': 'indigo', 'title': 'Theological Themes'},
-            'cross_references': {'icon': '🔗', 'color': 'orange', 'title': 'Cross References'},
-            'key_cross_references': {'icon': '🔗', 'color': 'orange', 'title': 'Key Cross References'},
-            'thematic_connections': {'icon': '🔗', 'color': 'orange', 'title': 'Thematic Connections'},
-            'reflection_questions': {'icon': '💭', 'color': 'purple', 'title': 'Reflection Questions'},
-            'practical_application': {'icon': '🎯', 'color': 'red', 'title': 'Practical Application'},
-            'application_principles': {'icon': '🎯', 'color': 'red', 'title': 'Application Principles'},
-            'greek_hebrew_insights': {'icon': '🔤', 'color': 'gold', 'title': 'Greek/Hebrew Insights'},
-            'additional_study': {'icon': '📚', 'color': 'cyan', 'title': 'Additional Study'},
-            'opening_questions': {'icon': '🚀', 'color': 'green', 'title': 'Opening Questions'},
-            'observation_questions': {'icon': '👁️', 'color': 'blue', 'title': 'Observation Questions'},
-            'interpretation_questions': {'icon': '🧠', 'color': 'purple', 'title': 'Interpretation Questions'},
-            'application_questions': {'icon': '🎯', 'color': 'red', 'title': 'Application Questions'},
-            'discussion_questions': {'icon': '👥', 'color': 'orange', 'title': 'Discussion Questions'},
-            'prayer_points': {'icon': '🙏', 'color': 'violet', 'title': 'Prayer Points'},
-            'suggested_study_path': {'icon': '🛤️', 'color': 'brown', 'title': 'Suggested Study Path'}
-        }
-        
         # Display each section
         for key, value in data.items():
-            if key == 'title' or key == 'cross_reference_keywords':
-                continue
-                
-            config = section_configs.get(key, {'icon': '📝', 'color': 'gray', 'title': key.replace('_', ' ').title()})
-            
-            with st.container():
-                st.markdown(f"""
-                <div style="
-                    border-left: 4px solid {config['color']};
-                    padding: 15px;
-                    margin: 10px 0;
-                    background-color: rgba(128, 128, 128, 0.1);
-                    border-radius: 5px;
-                ">
-                <h4 style="color: {config['color']}; margin-top: 0;">{config['icon']} {config['title']}</h4>
-                <div style="margin-left: 10px;">
-                """, unsafe_allow_html=True)
-                
-                # Format content based on type
-                if isinstance(value, list):
-                    for item in value:
-                        if isinstance(item, dict):
-                            format_dict_item(item)
-                        else:
-                            st.markdown(f"• {item}")
-                elif isinstance(value, dict):
-                    format_dict_item(value)
-                else:
-                    st.markdown(str(value))
+            display_json_section(key, value)
                 
-                st.markdown("</div></div>", unsafe_allow_html=True)
-                
-    except json.JSONDecodeError as e:
-        st.error("Error parsing research results. Displaying raw output:")
-        st.markdown(json_text)
     except Exception as e:
         st.error(f"Error displaying results: {e}")
         st.markdown(json_text)
 
+def display_json_section(key, value):
+    """Display one top-level field of the research JSON"""
+    if key == 'title':
+        st.markdown(f"## {value}")
+        return
+    if key == 'cross_reference_keywords':
+        return
+        
+    config = SECTION_CONFIGS.get(key, {'icon': '📝', 'color': 'gray', 'title': key.replace('_', ' ').title()})
+    
+    with st.container():
+        st.markdown(f"""
+        <div style="
+            border-left: 4px solid {config['color']};
+            padding: 15px;
+            margin: 10px 0;
+            background-color: rgba(128, 128, 128, 0.1);
+            border-radius: 5px;
+        ">
+        <h4 style="color: {config['color']}; margin-top: 0;">{config['icon']} {config['title']}</h4>
+        <div style="margin-left: 10px;">
+        """, unsafe_allow_html=True)
+        
+        # Format content based on type
+        if isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    format_dict_item(item)
+                else:
+                    st.markdown(f"• {item}")
+        elif isinstance(value, dict):
+            format_dict_item(value)
+        else:
+            st.markdown(str(value))
+        
+        st.markdown("</div></div>", unsafe_allow_html=True)
+
 def format_dict_item(item):
     """Format a dictionary item for display"""
     if 'question' in item:
@@ -153,6 +188,12 @@ def format_dict_item(item):
         st.markdown(f"**{item['reference']}**")
         if 'text' in item:
             st.markdown(f"*{item['text']}*")
+        if item.get('text_status') == 'corrected':
+            st.caption(f"✅ Quotation corrected from local {item['text_source']} text")
+        elif item.get('text_status') == 'unverified':
+            st.caption("⚠️ Reference could not be verified against the local Bible text")
+        elif item.get('text_source'):
+            st.caption(f"({item['text_source']})")
         if 'context' in item:
             st.markdown(f"{item['context']}")
         if 'explanation' in item:
@@ -189,6 +230,14 @@ def create_word_study_interface():
         st.error("Word study data not available. Please check your data files.")
         return
     
+    lexicon_stats = get_lexicon_store().stats()
+    if lexicon_stats.get("loaded"):
+        st.caption(
+            f"Lexicon: {lexicon_stats['entries']} entries, "
+            f"loaded in {lexicon_stats['load_ms']:.1f} ms, "
+            f"~{lexicon_stats['memory_mb']:.2f} MB in memory ({lexicon_stats['source']})"
+        )
+    
     # Word selection dropdown
     available_words = list(word_occurrences.keys())
     
@@ -203,10 +252,8 @@ def create_word_study_interface():
         # Get related Greek/Hebrew words for this English word
         word_data = word_occurrences[selected_word]
         
-        related_greek = {word: info for word, info in greek_words.items() 
-                        if selected_word in info.get('english_words', [])}
-        related_hebrew = {word: info for word, info in hebrew_words.items() 
-                         if selected_word in info.get('english_words', [])}
+        word_index = get_word_index(get_lexicon_store().get())
+        related_greek, related_hebrew = word_index.related_words(selected_word)
         
         # Word selection interface
         st.subheader("🔤 Select Original Language Words")
@@ -248,116 +295,174 @@ def create_word_study_interface():
             else:
                 st.info("No Greek words found for this term")
         
-        # Generate visualization
+        # Generate visualization; remembered so drill-down widgets can rerun the page
         if st.button("📊 Generate Word Distribution Chart", type="primary"):
+            st.session_state.word_study_chart = selected_word
+        if st.session_state.get("word_study_chart") == selected_word:
             create_word_distribution_visualization(
                 selected_word, 
                 word_data, 
                 hebrew_selection, 
                 greek_selection
             )
+        
+        create_collocation_panel(selected_word, related_hebrew, related_greek)
 
-def create_word_distribution_visualization(word, word_data, hebrew_selection, greek_selection):
-    """Create the word distribution visualization"""
-    
-    # Bible books in order
-    bible_books = [
-        "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy",
-        "Joshua", "Judges", "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings",
-        "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah", "Esther",
-        "Job", "Psalms", "Proverbs", "Ecclesiastes", "Song of Songs",
-        "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel",
-        "Hosea", "Joel", "Amos", "Obadiah", "Jonah", "Micah", "Nahum",
-        "Habakkuk", "Zephaniah", "Haggai", "Zechariah", "Malachi",
-        "Matthew", "Mark", "Luke", "John", "Acts",
-        "Romans", "1 Corinthians", "2 Corinthians", "Galatians", "Ephesians",
-        "Philippians", "Colossians", "1 Thessalonians", "2 Thessalonians",
-        "1 Timothy", "2 Timothy", "Titus", "Philemon",
-        "Hebrews", "James", "1 Peter", "2 Peter", "1 John", "2 John", "3 John",
-        "Jude", "Revelation"
-    ]
-    
-    # Prepare chart data
-    chart_data = []
-    total_count = 0
-    selected_words = []
-    
-    # Collect selected words and their data
-    for original_word, selected in hebrew_selection.items():
-        if selected and original_word in word_data:
-            selected_words.append(f"{original_word} (Hebrew)")
-            
-    for original_word, selected in greek_selection.items():
-        if selected and original_word in word_data:
-            selected_words.append(f"{original_word} (Greek)")
+COLLOCATION_WINDOW = 2
+
+def create_collocation_panel(word, related_hebrew, related_greek):
+    """Lemmas that co-occur with one of the word's Hebrew/Greek lemmas, ranked by PMI or log-likelihood"""
+    index = get_cooccurrence_index()
+    if index is None:
+        return
+    lexicon = {**related_hebrew, **related_greek}
+    lemmas = [lemma for lemma in lexicon if lemma in index]
+    if not lemmas:
+        return
     
-    # Build chart data
-    for book in bible_books:
-        book_total = 0
-        
-        # Add selected Hebrew words
-        for original_word, selected in hebrew_selection.items():
-            if selected and original_word in word_data:
-                count = word_data[original_word].get(book, 0)
-                book_total += count
+    snapshot = get_lexicon_store().get()
+    with st.expander("🔗 Collocations: words that appear together"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            lemma = st.selectbox(
+                "Lemma", lemmas, key=f"colloc_lemma_{word}",
+                format_func=lambda lemma: f"{lemma} ({lexicon[lemma]['strong']})"
+            )
+        with col2:
+            scope_labels = {"verse": "Same verse", "window": f"Within ±{COLLOCATION_WINDOW} verses",
+                            "chapter": "Same chapter"}
+            scope = st.radio("Together in", list(scope_labels), format_func=scope_labels.get,
+                             key="colloc_scope")
+        with col3:
+            rank_labels = {"llr": "Log-likelihood", "pmi": "PMI"}
+            rank_by = st.radio("Rank by", list(rank_labels), format_func=rank_labels.get, key="colloc_rank",
+                               help="Log-likelihood favours strong, frequent pairings; PMI favours rare, exclusive ones")
         
-        # Add selected Greek words
-        for original_word, selected in greek_selection.items():
-            if selected and original_word in word_data:
-                count = word_data[original_word].get(book, 0)
-                book_total += count
+        start = time.perf_counter()
+        with span("collocations", scope=scope):
+            collocates = index.collocates(lemma, scope=scope, window=COLLOCATION_WINDOW, rank_by=rank_by)
+        elapsed_ms = (time.perf_counter() - start) * 1000
         
-        chart_data.append({
-            "book": book,
-            "book_index": bible_books.index(book) + 1,
-            "total_occurrences": book_total
-        })
-        total_count += book_total
+        if not collocates:
+            st.info("No lemma co-occurs with this one often enough to rank.")
+        else:
+            rows = []
+            for collocate in collocates:
+                entry = snapshot.greek_words.get(collocate.lemma) or snapshot.hebrew_words.get(collocate.lemma) or {}
+                rows.append({
+                    "Lemma": collocate.lemma,
+                    "Strong's": entry.get("strong", ""),
+                    "Meaning": entry.get("meaning", ""),
+                    "Together": collocate.together,
+                    "Frequency": collocate.frequency,
+                    "PMI": round(collocate.pmi, 2),
+                    "Log-likelihood": round(collocate.llr, 1),
+                })
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        st.caption(f"{len(index.lemmas)} lemmas over {index.verse_count} verses; query took {elapsed_ms:.1f} ms")
+
+@timed("chart_build")
+def build_word_distribution_charts(aggregates, word, selected_lemmas):
+    """Precomputed summary and the Plotly figures for a word and lemma selection"""
+    summary = aggregates.summary(word, selected_lemmas)
+    book_totals, total_count = summary.book_totals, summary.total
     
+    fig_bar = None
     if total_count > 0:
+        df = pd.DataFrame({
+            "book": BIBLE_BOOKS,
+            "book_index": np.arange(1, len(BIBLE_BOOKS) + 1),
+            "total_occurrences": book_totals,
+        })
+        books_with_data = df[df['total_occurrences'] > 0]
+        fig_bar = px.bar(
+            books_with_data, 
+            x="book", 
+            y="total_occurrences",
+            title=f"'{word.title()}' Distribution Across Bible Books (Total: {total_count} occurrences)",
+            labels={"book": "Bible Books", "total_occurrences": "Occurrences"},
+            color="total_occurrences",
+            color_continuous_scale="viridis"
+        )
+        fig_bar.update_layout(xaxis_tickangle=-45, height=500)
+    
+    ot_total, nt_total = summary.ot_total, summary.nt_total
+    fig_pie = None
+    if ot_total > 0 or nt_total > 0:
+        testament_df = pd.DataFrame({
+            "Testament": ["Old Testament", "New Testament"],
+            "Occurrences": [ot_total, nt_total]
+        })
+        fig_pie = px.pie(
+            testament_df, 
+            values="Occurrences", 
+            names="Testament",
+            title="OT vs NT Distribution"
+        )
+    
+    return {"summary": summary, "bar": fig_bar, "pie": fig_pie}
+
+def create_word_distribution_visualization(word, word_data, hebrew_selection, greek_selection):
+    """Create the word distribution visualization"""
+    
+    snapshot = get_lexicon_store().get()
+    aggregates = get_word_aggregates(snapshot)
+    
+    # Collect selected words
+    selected_words = [f"{original_word} (Hebrew)" for original_word, selected in hebrew_selection.items()
+                      if selected and original_word in word_data]
+    selected_words += [f"{original_word} (Greek)" for original_word, selected in greek_selection.items()
+                       if selected and original_word in word_data]
+    selected_lemmas = [original_word for selection in (hebrew_selection, greek_selection)
+                       for original_word, selected in selection.items() if selected]
+    
+    # Figures are shared across reruns and sessions until the lexicon changes
+    figure_cache = get_figure_cache()
+    charts = figure_cache.get_or_build(
+        ("word_distribution", snapshot.version, word, frozenset(selected_lemmas)),
+        lambda: build_word_distribution_charts(aggregates, word, selected_lemmas)
+    )
+    summary = charts["summary"]
+    
+    if summary.total > 0:
         st.subheader(f"📊 Distribution of '{word.title()}' Across Scripture")
         
-        df = pd.DataFrame(chart_data)
+        if charts["bar"] is not None:
+            st.plotly_chart(charts["bar"], use_container_width=True)
         
-        # Create bar chart visualization
-        books_with_data = df[df['total_occurrences'] > 0]
-        if not books_with_data.empty:
-            fig_bar = px.bar(
-                books_with_data, 
-                x="book", 
-                y="total_occurrences",
-                title=f"'{word.title()}' Distribution Across Bible Books (Total: {total_count} occurrences)",
-                labels={"book": "Bible Books", "total_occurrences": "Occurrences"},
-                color="total_occurrences",
-                color_continuous_scale="viridis"
-            )
-            fig_bar.update_layout(xaxis_tickangle=-45, height=500)
-            st.plotly_chart(fig_bar, use_container_width=True)
+        cache_stats = figure_cache.stats()
+        st.caption(
+            f"Chart cache: {cache_stats['hit_rate']*100:.0f}% hit rate "
+            f"({cache_stats['hits']} hits, {cache_stats['entries']} charts cached, "
+            f"{cache_stats['avg_build_ms']:.0f} ms per build)"
+        )
         
         # Summary statistics
-        create_word_study_summary(chart_data, total_count, selected_words)
+        create_word_study_summary(summary, selected_words)
         
         # Testament comparison
-        create_testament_comparison_chart(chart_data)
+        create_testament_comparison_chart(summary, charts["pie"])
+        
+        # Chapter and verse drill-down (needs data/lemma_verses.tsv)
+        create_book_drilldown(word, summary, selected_lemmas)
         
     else:
         st.warning("No occurrences found for the selected word combinations. Try selecting different Hebrew/Greek words.")
 
-def create_word_study_summary(chart_data, total_count, selected_words):
-    """Create summary statistics for word study"""
+def create_word_study_summary(summary, selected_words):
+    """Create summary statistics for word study from a precomputed WordSummary"""
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Occurrences", total_count)
+        st.metric("Total Occurrences", summary.total)
     
     with col2:
-        books_with_word = len([x for x in chart_data if x["total_occurrences"] > 0])
-        st.metric("Books with Word", f"{books_with_word}/66")
+        st.metric("Books with Word", f"{summary.books_with_word}/{len(BIBLE_BOOKS)}")
     
     with col3:
-        if books_with_word > 0:
-            avg_per_book = total_count / books_with_word
+        if summary.books_with_word > 0:
+            avg_per_book = summary.total / summary.books_with_word
             st.metric("Avg per Book", f"{avg_per_book:.1f}")
         else:
             st.metric("Avg per Book", "0")
@@ -366,42 +471,64 @@ def create_word_study_summary(chart_data, total_count, selected_words):
         st.metric("Words Analyzed", len(selected_words))
     
     # Detailed breakdown
-    if total_count > 0:
+    if summary.total > 0:
         st.subheader("📋 Detailed Book Breakdown")
-        detailed_data = [
-            {"Book": item["book"], "Occurrences": item["total_occurrences"]}
-            for item in chart_data if item["total_occurrences"] > 0
-        ]
         
-        if detailed_data:
-            detailed_df = pd.DataFrame(detailed_data)
-            detailed_df = detailed_df.sort_values("Occurrences", ascending=False)
+        if summary.ranked_books:
+            detailed_df = pd.DataFrame(summary.ranked_books, columns=["Book", "Occurrences"])
             
             col1, col2 = st.columns([2, 1])
             with col1:
                 st.dataframe(detailed_df, use_container_width=True, hide_index=True)
             with col2:
                 # Top 5 books
-                top_5 = detailed_df.head(5)
                 st.markdown("**Top 5 Books:**")
-                for _, row in top_5.iterrows():
-                    st.markdown(f"• {row['Book']}: {row['Occurrences']}")
+                for book, occurrences in summary.top_books(5):
+                    st.markdown(f"• {book}: {occurrences}")
+                
+                st.markdown("**By Genre:**")
+                for genre, occurrences in summary.genre_breakdown():
+                    st.markdown(f"• {genre}: {occurrences} ({occurrences/summary.total*100:.0f}%)")
 
-def create_testament_comparison_chart(chart_data):
-    """Create Old vs New Testament comparison"""
+def create_book_drilldown(word, summary, selected_lemmas):
+    """Per-chapter histogram and verse list for one book, from the verse-level occurrence store"""
+    occurrences = get_verse_occurrences()
+    if occurrences is None or not summary.ranked_books:
+        return
+    
+    st.subheader("🔎 Drill into a Book")
+    books = [book for book, _ in summary.ranked_books]
+    book = st.selectbox("Book", books, key=f"drilldown_book_{word}")
+    chapters, counts = occurrences.chapter_histogram(selected_lemmas, book)
+    if len(chapters) == 0:
+        st.info(f"No verse-level occurrence data for {book}.")
+        return
     
-    old_testament_books = set([
-        "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy",
-        "Joshua", "Judges", "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings",
-        "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah", "Esther",
-        "Job", "Psalms", "Proverbs", "Ecclesiastes", "Song of Songs",
-        "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel",
-        "Hosea", "Joel", "Amos", "Obadiah", "Jonah", "Micah", "Nahum",
-        "Habakkuk", "Zephaniah", "Haggai", "Zechariah", "Malachi"
-    ])
+    fig = px.bar(
+        pd.DataFrame({"Chapter": chapters, "Occurrences": counts}),
+        x="Chapter",
+        y="Occurrences",
+        title=f"'{word.title()}' in {book} by Chapter",
+    )
+    fig.update_layout(height=350, xaxis=dict(type="category"))
+    st.plotly_chart(fig, use_container_width=True)
     
-    ot_total = sum(item["total_occurrences"] for item in chart_data if item["book"] in old_testament_books)
-    nt_total = sum(item["total_occurrences"] for item in chart_data if item["book"] not in old_testament_books)
+    chapter = st.selectbox("Chapter", chapters.tolist(), key=f"drilldown_chapter_{word}_{book}")
+    verse_store = get_verse_store()
+    rows = []
+    for book_name, chapter_number, verse_number, count in occurrences.verses(selected_lemmas, book, chapter):
+        ordinal = verse_store.ordinal(book_name, chapter_number, verse_number) if verse_store else None
+        rows.append({
+            "Reference": f"{book_name} {chapter_number}:{verse_number}",
+            "Occurrences": count,
+            "Text": verse_store.text(ordinal) if ordinal is not None else "",
+        })
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+def create_testament_comparison_chart(summary, fig_pie):
+    """Create Old vs New Testament comparison from a WordSummary and a prebuilt pie chart"""
+    
+    ot_total, nt_total = summary.ot_total, summary.nt_total
     
     if ot_total > 0 or nt_total > 0:
         st.subheader("📊 Testament Distribution")
@@ -410,18 +537,7 @@ def create_testament_comparison_chart(chart_data):
         
         with col1:
             # Pie chart
-            testament_df = pd.DataFrame({
-                "Testament": ["Old Testament", "New Testament"],
-                "Occurrences": [ot_total, nt_total]
-            })
-            
-            fig = px.pie(
-                testament_df, 
-                values="Occurrences", 
-                names="Testament",
-                title="OT vs NT Distribution"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig_pie, use_container_width=True)
         
         with col2:
             # Metrics
@@ -437,51 +553,305 @@ def create_testament_comparison_chart(chart_data):
 
 
 
-def calculate_cost(input_tokens: int, output_tokens: int) -> float:
-    """Calculate cost based on token usage for Claude 3.5 Haiku"""
-    input_cost_per_1k = 0.00025  # $0.25 per 1K input tokens
-    output_cost_per_1k = 0.00125  # $1.25 per 1K output tokens
+CLAUDE_MODEL = DEFAULT_MODEL
+
+def generate_research_with_claude(prompt: str, api_key: str, max_tokens: int = RESEARCH_MAX_TOKENS,
+                                  cached_prefix: str = None, raise_errors: bool = False):
+    """Generate biblical research using Claude API (served from the response cache when possible)
+    
+    `cached_prefix` is the stable part of the prompt (see get_research_prompt_parts);
+    it is sent as a prompt-cached block when long enough for the model to cache, and
+    `prompt` carries only the variable suffix.
+    Identical requests already in flight from other sessions with the same API
+    key are joined rather than repeated; only the session that made the call
+    is charged its cost. Errors come back as an "Error generating research"
+    string unless `raise_errors` is set.
+    """
+    # Use system message from prompts.py
+    system_message = get_system_message()
+    
+    cache = get_response_cache()
+    cache_key = cache.make_key((cached_prefix or "") + prompt, system_message, CLAUDE_MODEL)
+    cached_result = cache.get(cache_key)
+    if cached_result is not None:
+        get_metrics().increment("research_requests_total", source="cache")
+        return cached_result, 0.0
     
-    input_cost = (input_tokens / 1000) * input_cost_per_1k
-    output_cost = (output_tokens / 1000) * output_cost_per_1k
+    def call_claude():
+        with span("api_call"):
+            response = get_claude_client(api_key).create_message(
+                prompt, system_message, model=CLAUDE_MODEL, max_tokens=max_tokens,
+                cached_prefix=cached_prefix
+            )
+        
+        # Calculate cost based on token usage
+        cost = calculate_usage_cost(response.usage)
+        
+        result = response.content[0].text
+        cache.set(cache_key, result, CLAUDE_MODEL, cost)
+        return result, cost
     
-    return input_cost + output_cost
+    try:
+        (result, cost), shared = get_single_flight().do(flight_key(cache_key, "message", api_key), call_claude)
+        get_metrics().increment("research_requests_total", source="shared" if shared else "api")
+        return result, 0.0 if shared else cost
+        
+    except Exception as e:
+        get_metrics().increment("research_requests_total", source="error")
+        if raise_errors:
+            raise
+        return f"Error generating research: {str(e)}", 0.0
+
 
-def generate_research_with_claude(prompt: str, api_key: str):
-    """Generate biblical research using Claude API"""
+def stream_research_with_claude(prompt: str, api_key: str, on_text, claude_client=None,
+                                max_tokens: int = RESEARCH_MAX_TOKENS, cached_prefix: str = None,
+                                raise_errors: bool = False):
+    """Stream biblical research from Claude, calling on_text(chunk) as text arrives.
+    
+    Pass `claude_client=ClaudeClient(client=FakeAnthropicClient(...))` to run without the API.
+    Returns (result, cost, timings) where timings has time-to-first-token and total latency.
+    A session that joins an identical in-flight request gets the whole text in one
+    on_text call when it completes, at no cost. Errors are returned as text
+    unless `raise_errors` is set.
+    """
+    system_message = get_system_message()
+    start = time.perf_counter()
+    
+    cache = get_response_cache()
+    cache_key = cache.make_key((cached_prefix or "") + prompt, system_message, CLAUDE_MODEL)
+    cached_result = cache.get(cache_key)
+    if cached_result is not None:
+        get_metrics().increment("research_requests_total", source="cache")
+        on_text(cached_result)
+        elapsed = time.perf_counter() - start
+        return cached_result, 0.0, {"first_token_s": elapsed, "total_s": elapsed, "cached": True}
+    
+    def stream_claude():
+        client = claude_client if claude_client is not None else get_claude_client(api_key)
+        chunks = []
+        first_token_s = None
+        with span("api_call", streamed=True), client.stream_message(
+                prompt, system_message, model=CLAUDE_MODEL, max_tokens=max_tokens,
+                cached_prefix=cached_prefix) as stream:
+            for text in stream.text_stream:
+                if first_token_s is None:
+                    first_token_s = time.perf_counter() - start
+                    get_metrics().observe(STAGE_SECONDS, first_token_s, stage="api_first_token")
+                chunks.append(text)
+                on_text(text)
+            final_message = stream.get_final_message()
+        
+        cost = calculate_usage_cost(final_message.usage)
+        result = "".join(chunks)
+        cache.set(cache_key, result, CLAUDE_MODEL, cost)
+        return result, cost, first_token_s
+    
     try:
-        import anthropic
+        (result, cost, first_token_s), shared = get_single_flight().do(
+            flight_key(cache_key, "stream", api_key), stream_claude)
+        total_s = time.perf_counter() - start
+        get_metrics().increment("research_requests_total", source="shared" if shared else "api")
+        if shared:
+            on_text(result)
+            return result, 0.0, {"first_token_s": total_s, "total_s": total_s, "cached": False, "shared": True}
+        return result, cost, {"first_token_s": first_token_s or total_s, "total_s": total_s,
+                              "cached": False, "shared": False}
         
-        client = anthropic.Anthropic(api_key=api_key)
+    except Exception as e:
+        get_metrics().increment("research_requests_total", source="error")
+        if raise_errors:
+            raise
+        elapsed = time.perf_counter() - start
+        return f"Error generating research: {str(e)}", 0.0, {"first_token_s": elapsed, "total_s": elapsed, "cached": False}
+
+
+# Seconds between job status refreshes while research jobs are in flight
+JOB_POLL_INTERVAL_S = 1.0
+
+def run_research_job(job, prompt: str, api_key: str, max_tokens: int, cached_prefix: str, stream: bool):
+    """Body of a background research job; runs on a worker thread, so no Streamlit calls.
+    
+    Streamed text is appended to the job for the UI to preview. Returns
+    (result, cost, timings) with timings None when not streaming; API errors
+    propagate, so the executor marks the job failed.
+    """
+    if stream:
+        return stream_research_with_claude(prompt, api_key, job.append_text, max_tokens=max_tokens,
+                                           cached_prefix=cached_prefix, raise_errors=True)
+    result, cost = generate_research_with_claude(prompt, api_key, max_tokens, cached_prefix=cached_prefix,
+                                                 raise_errors=True)
+    return result, cost, None
+
+def collect_research_jobs(jobs):
+    """Charge and show each newly finished job of this session once; returns True if any were collected"""
+    collected = False
+    for job in jobs:
+        if not job.finished or job.id in st.session_state.collected_jobs:
+            continue
+        st.session_state.collected_jobs.add(job.id)
+        get_job_executor().mark_collected(job.id)
+        collected = True
+        if job.status == "failed":
+            st.session_state.results = f"Error generating research: {job.error}"
+            st.session_state.last_timings = None
+            continue
+        result, cost, timings = job.result
+        st.session_state.results = result
+        st.session_state.last_timings = timings
+        st.session_state.total_cost += cost
+        st.session_state.request_count += 1
+    return collected
+
+def show_job_preview(job):
+    """Render the sections a running streaming job has produced so far"""
+    text = job.partial_text()
+    if not text:
+        return
+    parser = IncrementalJSONParser()
+    verse_store = get_verse_store()
+    for key, value in parser.feed(text):
+        enrich_verses({key: value}, verse_store)
+        display_json_section(key, value)
+    pending = parser.pending_text() if parser.started else parser.buffer
+    if pending.strip():
+        st.code(pending[-1500:], language="json")
+
+def render_research_jobs(preview: bool, rerun_on_collect: bool = False):
+    """Status of this session's research jobs; collects finished ones into the results view"""
+    executor = get_job_executor()
+    jobs = [executor.get(job_id) for job_id in st.session_state.research_jobs]
+    # Results the executor dropped before this session showed them (it keeps a bounded number)
+    expired = [job_id for job_id, job in zip(st.session_state.research_jobs, jobs)
+               if job is None and job_id not in st.session_state.collected_jobs]
+    if expired:
+        st.warning(f"{len(expired)} research result(s) expired before they could be shown. "
+                   "Please generate them again.")
+        st.session_state.collected_jobs.update(expired)
+    jobs = [job for job in jobs if job is not None]
+    if not jobs:
+        return
+    
+    if collect_research_jobs(jobs) and rerun_on_collect:
+        # Polling reruns only this fragment; redraw the page so the results show
+        st.rerun()
+    
+    active = [job for job in jobs if not job.finished]
+    for job in reversed(active):
+        if job.status == "queued":
+            st.caption(f"⏳ {job.label} · queued {job.wait_s:.1f} s")
+        else:
+            st.caption(f"⚙️ {job.label} · running {job.elapsed_s:.1f} s")
+    if preview and active and active[-1].status == "running":
+        with st.container(border=True):
+            show_job_preview(active[-1])
+    
+    finished = [job for job in jobs if job.finished]
+    if len(finished) > 1:
+        with st.expander(f"Earlier research ({len(finished)})"):
+            for job in reversed(finished):
+                label = f"{'✅' if job.status == 'done' else '❌'} {job.label} · {job.elapsed_s:.1f} s"
+                if job.status == "done" and st.button(label, key=f"show_{job.id}"):
+                    st.session_state.results = job.result[0]
+                    st.session_state.last_timings = job.result[2]
+                    st.rerun()
+                elif job.status != "done":
+                    st.caption(label)
+    
+    stats = executor.stats()
+    st.caption(
+        f"Job queue: {stats['running']}/{stats['workers']} running, {stats['queued']} queued · "
+        f"run p50 {stats['run_p50_s']:.1f} s, p95 {stats['run_p95_s']:.1f} s · "
+        f"queue wait p95 {stats['wait_p95_s']:.1f} s"
+    )
+
+def show_research_jobs(preview: bool = True):
+    """Render this session's jobs, re-polling every JOB_POLL_INTERVAL_S while any are in flight"""
+    executor = get_job_executor()
+    active = any(job is not None and not job.finished
+                 for job in map(executor.get, st.session_state.research_jobs))
+    if not active:
+        render_research_jobs(preview)
+        return
+    # A fragment with run_every refreshes just this panel; the rest of the page stays interactive
+    st.fragment(render_research_jobs, run_every=JOB_POLL_INTERVAL_S)(preview, rerun_on_collect=True)
+
+# Verses previewed under the topic box
+TOPIC_PREVIEW_VERSES = 5
+
+def show_topic_verses(topic):
+    """Preview the verses closest in meaning to a topic, from the local semantic index"""
+    with st.expander("🧭 Verses on this topic"):
+        # The first build takes seconds, so it runs in the background instead of blocking the rerun
+        index = get_semantic_index(wait=False)
+        if index is None:
+            if get_verse_index() is not None:
+                st.caption("⏳ Building the semantic index (first use only). Search again in a moment.")
+            return
+        start = time.perf_counter()
+        with span("semantic_search"):
+            verses = semantic_verse_search(topic, limit=TOPIC_PREVIEW_VERSES)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for verse in verses:
+            st.markdown(f"**{verse['book_name']} {verse['chapter']}:{verse['verse']}** {verse['text']}")
+        if not verses:
+            st.caption("No verses matched these words.")
+        st.caption(f"Semantic search over {index.passage_count} verses in {elapsed_ms:.1f} ms")
+
+# Characters of verse text shown per row in the cross-reference tables
+CROSS_REFERENCE_TEXT_CHARS = 90
+
+def _linked_verse_text(reference):
+    """Shortened verse text for a table row; empty without an installed translation"""
+    store = get_verse_store()
+    if store is None:
+        return ""
+    text = " ".join(verse["text"] for verse in store.passage(reference))
+    return text if len(text) <= CROSS_REFERENCE_TEXT_CHARS else text[:CROSS_REFERENCE_TEXT_CHARS] + "…"
+
+def show_cross_reference_graph(reference):
+    """Linked verses, shared-reference clusters and the chapter's hubs from the local cross-reference graph"""
+    graph = get_cross_references()
+    with st.expander("🕸️ Cross-reference graph"):
+        hops = st.slider("Hops", 1, 3, 1, key="xref_hops")
+        min_votes = st.number_input("Minimum votes", value=0, step=5, key="xref_min_votes",
+                                    help="Links with fewer votes on openbible.info are skipped")
         
-        # Use system message from prompts.py
-        system_message = get_system_message()
+        start = time.perf_counter()
+        with span("cross_reference_graph", hops=hops):
+            links = graph.neighbourhood(reference, hops=hops, min_votes=int(min_votes))
+            shared = graph.shared_references(reference, min_votes=int(min_votes))
+            hubs = graph.most_connected(reference.book, reference.start_chapter)
+        elapsed_ms = (time.perf_counter() - start) * 1000
         
-        response = client.messages.create(
-            model="claude-3-5-haiku-20241022",
-            max_tokens=2000,
-            system=system_message,
-            messages=[
-                {
-                    "role": "user", 
-                    "content": prompt
-                }
-            ]
-        )
+        if links:
+            st.dataframe(pd.DataFrame(
+                [{"Reference": link.reference, "Hop": link.hop, "Score": round(link.score, 3),
+                  "Votes": link.votes, "Text": _linked_verse_text(link.reference)} for link in links]
+            ), use_container_width=True, hide_index=True)
+        else:
+            st.caption(f"No cross-references from {reference}.")
         
-        # Calculate cost based on token usage
-        input_tokens = response.usage.input_tokens
-        output_tokens = response.usage.output_tokens
-        cost = calculate_cost(input_tokens, output_tokens)
+        if shared:
+            st.markdown("**Verses that share its references**")
+            st.dataframe(pd.DataFrame(
+                [{"Reference": verse.reference, "Shared": verse.shared, "Votes": verse.votes,
+                  "Text": _linked_verse_text(verse.reference)} for verse in shared]
+            ), use_container_width=True, hide_index=True)
         
-        return response.content[0].text, cost
+        if hubs:
+            st.markdown(f"**Most connected verses in {reference.book} {reference.start_chapter}**")
+            st.dataframe(pd.DataFrame(
+                [{"Reference": verse.reference, "Links": verse.links, "Votes": verse.votes} for verse in hubs]
+            ), use_container_width=True, hide_index=True)
         
-    except Exception as e:
-        return f"Error generating research: {str(e)}", 0.0
+        st.caption(f"{graph.link_count:,} links between {graph.node_count:,} verses · queried in {elapsed_ms:.1f} ms")
 
 
 # ===== API FUNCTIONS FOR CROSS-REFERENCE LOOKUP =====
 
+# Seconds each keyword lookup may take before it is reported as timed out
+CROSS_REFERENCE_TIMEOUT = 8.0
+
 # ALTERNATIVE: Use a different Bible API that's more reliable
 def search_bible_gateway_scrape(query, limit=10):
     """Alternative: Use Bible Gateway search (simple scraping approach)"""
@@ -673,20 +1043,29 @@ def create_bible_gateway_results(query, limit=10):
     
     return results
 
+@timed("cross_reference_search")
+def find_cross_references(query, bible_version="ESV", limit=50):
+    """Bible search backend; safe to call from worker threads (no Streamlit calls)"""
+    # Prefer the local full-text index when a public-domain verse file is installed
+    verse_index = get_verse_index()
+    if verse_index is not None:
+        return verse_index.search(query, limit=limit)
+    
+    # Bible SuperSearch API appears to have issues, so let's use a different approach
+    # We'll create a working solution that provides Bible Gateway links
+    
+    # Clean the query
+    clean_query = query.replace('"', '').strip()
+    
+    # For now, since the Bible SuperSearch API is returning 400 errors,
+    # let's use a hybrid approach with sample data + Bible Gateway links
+    
+    return create_bible_gateway_results(clean_query, limit)
+
 def search_bible_api(query, bible_version="ESV", limit=50):
     """Clean, working Bible search function"""
     try:
-        # Bible SuperSearch API appears to have issues, so let's use a different approach
-        # We'll create a working solution that provides Bible Gateway links
-        
-        # Clean the query
-        clean_query = query.replace('"', '').strip()
-        
-        # For now, since the Bible SuperSearch API is returning 400 errors,
-        # let's use a hybrid approach with sample data + Bible Gateway links
-        
-        return create_bible_gateway_results(clean_query, limit)
-        
+        return find_cross_references(query, bible_version, limit)
     except Exception as e:
         st.warning(f"Bible search error: {e}")
         return []
@@ -708,6 +1087,8 @@ def extract_keywords_from_json(json_data):
 # IMPROVED: More robust cross-reference display function
 def display_cross_reference_section(keywords, research_type, user_input):
     """Clean cross-reference display without conflicting API calls"""
+    # The model sometimes repeats a keyword; each gets one expander and one lookup
+    keywords = list(dict.fromkeys(keywords))
     if not keywords:
         return
     
@@ -723,50 +1104,54 @@ def display_cross_reference_section(keywords, research_type, user_input):
     if st.button("📖 Find Cross-References in Scripture", type="secondary"):
         st.markdown("### 📚 Scripture Cross-References")
         
+        # Create every expander up front, then replace its placeholder as its lookup completes
+        placeholders = {}
         for word in keywords:
             with st.expander(f"📚 '{word}' throughout Scripture", expanded=False):
-                # Get results for this word
-                results = search_bible_api(word, limit=10)
-                
-                if results:
-                    st.success(f"✅ Found key verses containing '{word}'")
-                    
-                    # Separate Old and New Testament
-                    ot_books = {
-                        "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy",
-                        "Joshua", "Judges", "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings",
-                        "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah", "Esther",
-                        "Job", "Psalms", "Proverbs", "Ecclesiastes", "Song of Songs",
-                        "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel",
-                        "Hosea", "Joel", "Amos", "Obadiah", "Jonah", "Micah", "Nahum",
-                        "Habakkuk", "Zephaniah", "Haggai", "Zechariah", "Malachi"
-                    }
-                    
-                    ot_verses = [r for r in results if r.get('book_name', '') in ot_books]
-                    nt_verses = [r for r in results if r.get('book_name', '') not in ot_books]
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        if ot_verses:
-                            st.markdown("**📜 Old Testament:**")
-                            for verse in ot_verses[:3]:
-                                display_clean_verse(verse, word)
-                    
-                    with col2:
-                        if nt_verses:
-                            st.markdown("**✝️ New Testament:**")
-                            for verse in nt_verses[:3]:
-                                display_clean_verse(verse, word)
-                    
-                    # Bible Gateway comprehensive search
-                    search_url = f"https://www.biblegateway.com/quicksearch/?search={quote(word)}&version=ESV"
-                    st.markdown(f"🔍 [Search ALL '{word}' references on Bible Gateway]({search_url})")
-                    
-                else:
-                    st.info(f"Showing Bible Gateway search for '{word}'")
-                    search_url = f"https://www.biblegateway.com/quicksearch/?search={quote(word)}&version=ESV"
-                    st.markdown(f"🔍 [Search '{word}' on Bible Gateway]({search_url})")
+                placeholders[word] = st.empty()
+                placeholders[word].caption("⏳ Searching...")
+        
+        for word, results, error in search_keywords_concurrently(
+            keywords, find_cross_references, limit=10, timeout=CROSS_REFERENCE_TIMEOUT
+        ):
+            with placeholders[word].container():
+                display_keyword_results(word, results, error)
+
+
+def display_keyword_results(word, results, error=None):
+    """Render the cross-reference results for one keyword"""
+    if error:
+        st.warning(f"Lookup for '{word}' did not complete: {error}")
+    
+    if results:
+        st.success(f"✅ Found key verses containing '{word}'")
+        
+        # Separate Old and New Testament
+        ot_verses = [r for r in results if r.get('book_name', '') in OLD_TESTAMENT_BOOKS]
+        nt_verses = [r for r in results if r.get('book_name', '') not in OLD_TESTAMENT_BOOKS]
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if ot_verses:
+                st.markdown("**📜 Old Testament:**")
+                for verse in ot_verses[:3]:
+                    display_clean_verse(verse, word)
+        
+        with col2:
+            if nt_verses:
+                st.markdown("**✝️ New Testament:**")
+                for verse in nt_verses[:3]:
+                    display_clean_verse(verse, word)
+        
+        # Bible Gateway comprehensive search
+        search_url = f"https://www.biblegateway.com/quicksearch/?search={quote(word)}&version=ESV"
+        st.markdown(f"🔍 [Search ALL '{word}' references on Bible Gateway]({search_url})")
+        
+    else:
+        st.info(f"Showing Bible Gateway search for '{word}'")
+        search_url = f"https://www.biblegateway.com/quicksearch/?search={quote(word)}&version=ESV"
+        st.markdown(f"🔍 [Search '{word}' on Bible Gateway]({search_url})")
 
 
 def display_clean_verse(verse, search_word):
@@ -854,7 +1239,41 @@ def get_related_search_terms(word):
 
 
 # ===== YOUR MAIN FUNCTION WITH CLEAN PROMPT IMPORTS =====
+def show_metrics_panel():
+    """Sidebar admin panel: per-stage latency percentiles and metrics export"""
+    registry = get_metrics()
+    with st.sidebar.expander("📈 Performance metrics"):
+        rows = registry.stage_summary()
+        if not rows:
+            st.caption("No stages timed yet.")
+        else:
+            summary = pd.DataFrame(rows).fillna("")
+            st.dataframe(summary.round(1), use_container_width=True, hide_index=True)
+            st.caption(f"Percentiles over each stage's last {registry.reservoir_size} runs, across all sessions.")
+        
+        requests_by_source = {counter["labels"].get("source"): int(counter["value"])
+                              for counter in registry.snapshot()["counters"]
+                              if counter["metric"] == "research_requests_total"}
+        if requests_by_source:
+            st.caption("Research requests: " + ", ".join(f"{source} {count}" for source, count
+                                                          in sorted(requests_by_source.items())))
+        
+        st.download_button("Prometheus text", registry.to_prometheus(), file_name="metrics.prom",
+                           mime="text/plain", use_container_width=True)
+        st.download_button("JSONL snapshot", registry.to_jsonl(), file_name="metrics.jsonl",
+                           mime="application/x-ndjson", use_container_width=True)
+        if st.button("💾 Write to .cache/metrics/", use_container_width=True,
+                     help="Replaces metrics.prom and appends a snapshot to metrics.jsonl"):
+            prom_path, jsonl_path = registry.write_files()
+            st.caption(f"Wrote {prom_path} and {jsonl_path}")
+
+
 def main():
+    # METRICS_PORT serves /metrics and /metrics.jsonl for a scraper (once per process);
+    # a port that is already in use is logged once and the app runs without it
+    if os.environ.get("METRICS_PORT"):
+        start_metrics_server(int(os.environ["METRICS_PORT"]))
+    
     st.title("📖 Biblical Research Tool")
     st.markdown("*A resource for deeper theological understanding and personal study*")
     
@@ -892,6 +1311,8 @@ def main():
                 "Enter topic or theme:",
                 placeholder="e.g., faith, prayer, salvation"
             )
+            if user_input and get_verse_index() is not None:
+                show_topic_verses(user_input)
         elif research_type == "Verse Analysis":
             user_input = st.text_area(
                 "Enter Bible verse or passage:",
@@ -908,6 +1329,11 @@ def main():
                 placeholder="e.g., 1 Corinthians 13:4"
             )
         
+        if research_type not in ("Word Study", "Topical Study") and user_input and get_cross_references() is not None:
+            reference = parse_reference(user_input)
+            if reference is not None and reference.start_verse is not None:
+                show_cross_reference_graph(reference)
+        
         # Handle Word Study separately - no user input needed initially
         if research_type != "Word Study":
             # Additional options
@@ -922,29 +1348,60 @@ def main():
                 value=False
             )
             
-            # Generate button for regular research
+            stream_results = st.checkbox(
+                "Stream results as they are generated",
+                value=True
+            )
+            
+            use_retrieval = get_verse_index() is not None and st.checkbox(
+                "Ground in verses from the local Bible text",
+                value=True,
+                help="Retrieves the most relevant verses first and gives them to the model as numbered context"
+            )
+            
+            # Generate button for regular research: the call runs as a background job,
+            # so this script run (and any rerun) returns immediately
             if st.button("🔍 Generate Research", type="primary"):
                 if user_input:
-                    with st.spinner("Generating biblical research..."):
-                        try:
-                            # Get prompt from prompts.py (clean import)
-                            prompt = get_research_prompt(
-                                research_type, 
-                                user_input, 
-                                depth_level, 
-                                include_greek_hebrew
-                            )
-                            
-                            # Generate research using Claude
-                            result, cost = generate_research_with_claude(prompt, claude_api_key)
-                            st.session_state.results = result
-                            st.session_state.total_cost += cost
-                            st.session_state.request_count += 1
-                            
-                        except Exception as e:
-                            st.error(f"Error generating research: {str(e)}")
+                    # Ask for references only when verse text can be filled in locally
+                    references_only = get_verse_store() is not None
+                    max_tokens = REFERENCES_ONLY_MAX_TOKENS if references_only else RESEARCH_MAX_TOKENS
+                    
+                    # Get prompt from prompts.py (clean import): the schema prefix is
+                    # identical across requests and sent as a prompt-cached block once it is
+                    # long enough for the model to cache
+                    # Verses retrieved locally go in the per-request suffix, after the cached prefix
+                    verse_context = ""
+                    if use_retrieval and references_only:
+                        # Until the semantic index is built in the background, the context is BM25 only
+                        semantic_index = (get_semantic_index(wait=False) if research_type == "Topical Study"
+                                          else None)
+                        with span("retrieval"):
+                            verse_context = get_verse_context(user_input, get_verse_index(), get_verse_store(),
+                                                              semantic_index=semantic_index,
+                                                              graph=get_cross_references())
+                    with span("prompt_build"):
+                        schema_prefix, prompt = get_research_prompt_parts(
+                            research_type, 
+                            user_input, 
+                            depth_level, 
+                            include_greek_hebrew,
+                            include_verse_text=not references_only,
+                            verse_context=verse_context
+                        )
+                    
+                    job_id = get_job_executor().submit(
+                        lambda job: run_research_job(job, prompt, claude_api_key, max_tokens,
+                                                     schema_prefix, stream_results),
+                        label=f"{research_type}: {user_input.strip()[:60]}"
+                    )
+                    st.session_state.research_jobs.append(job_id)
                 else:
                     st.warning("Please enter your research topic or verse.")
+        
+        if research_type == "Word Study":
+            # Jobs keep running while Word Study is open; list them compactly here
+            show_research_jobs(preview=False)
     
     with col2:
         # Handle Word Study differently
@@ -953,26 +1410,28 @@ def main():
         else:
             st.header("Research Results")
             
+            show_research_jobs(preview=True)
+            
+            timings = st.session_state.last_timings
+            if st.session_state.results and timings:
+                source = "cache" if timings["cached"] else (
+                    "shared with an identical request" if timings.get("shared") else "Claude"
+                )
+                st.caption(
+                    f"⏱️ First token {timings['first_token_s']:.2f} s · "
+                    f"total {timings['total_s']:.2f} s ({source})"
+                )
+            
             if st.session_state.results:
                 # Parse and display JSON results
                 parse_and_display_json_results(st.session_state.results)
                 
                 # NEW: Add cross-reference section
-                try:
-                    # Extract keywords from JSON for cross-reference lookup
-                    json_start = st.session_state.results.find('{')
-                    json_end = st.session_state.results.rfind('}') + 1
-                    
-                    if json_start != -1 and json_end > json_start:
-                        clean_json = st.session_state.results[json_start:json_end]
-                        data = json.loads(clean_json)
-                        keywords = data.get('cross_reference_keywords', [])
-                        
-                        if keywords:
-                            display_cross_reference_section(keywords, research_type, user_input)
-                            
-                except (json.JSONDecodeError, KeyError):
-                    pass  # Fail silently if JSON parsing fails
+                data = get_parsed_results(st.session_state.results)
+                keywords = data.get('cross_reference_keywords', []) if data else []
+                
+                if keywords:
+                    display_cross_reference_section(keywords, research_type, user_input)
                 
                 # Refinement section
                 st.subheader("Refine Results")
@@ -1023,6 +1482,58 @@ def main():
         
         # Small disclaimer
         st.caption("💡 Cost tracking is approximate based on Claude 3.5 Haiku pricing. Actual costs may vary slightly.")
+        
+        cache_stats = get_response_cache().stats()
+        st.caption(
+            f"♻️ Response cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']*100:.0f}% hit rate, ${cache_stats['saved_cost']:.4f} saved)"
+        )
+        flight_stats = get_single_flight().stats()
+        if flight_stats["coalesced"]:
+            st.caption(
+                f"🤝 Shared in-flight requests: {flight_stats['coalesced']} joined / "
+                f"{flight_stats['unique']} sent (up to {flight_stats['max_waiters']} waiting on one call)"
+            )
+        
+        with st.expander("🧮 Prompt token budget"):
+            references_only = get_verse_store() is not None
+            report = prompt_token_report(include_verse_text=not references_only)
+            budget = pd.DataFrame.from_dict(report, orient="index")
+            cache_minimum = min_cacheable_tokens(CLAUDE_MODEL)
+            budget["cached"] = [row["prefix"] >= cache_minimum for row in report.values()]
+            # What a cache read saves on the prefix compared with sending it uncached
+            budget["saved_per_cached_call"] = [
+                f"${calculate_cost(row['prefix'], 0) - calculate_cost(0, 0, cache_read_tokens=row['prefix']):.5f}"
+                if row["prefix"] >= cache_minimum else "-"
+                for row in report.values()
+            ]
+            st.dataframe(budget, use_container_width=True)
+            if budget["cached"].all():
+                st.caption(
+                    "Estimated tokens. The prefix (system message + schema) is sent as a prompt-cached "
+                    "block; only the suffix changes between requests."
+                )
+            else:
+                st.caption(
+                    f"Estimated tokens. {CLAUDE_MODEL} only caches prefixes of {cache_minimum}+ tokens, so "
+                    "prompt caching is inactive for the shorter prefixes above; they are sent uncached."
+                )
+            
+            index = get_verse_index()
+            # Retrieval runs once per research type, so only on request rather than on every rerun
+            if index is not None and st.button("Measure retrieval prompt sizes"):
+                st.session_state.prompt_size_report = prompt_size_report(
+                    index, get_verse_store(), semantic_index=get_semantic_index(), graph=get_cross_references())
+            if index is not None and "prompt_size_report" in st.session_state:
+                sizes = pd.DataFrame.from_dict(st.session_state.prompt_size_report, orient="index")
+                st.dataframe(sizes.round(1), use_container_width=True)
+                st.caption(
+                    "Input tokens for a sample request of each type: today's full-text schema, references "
+                    "only, and references plus retrieved verse context. Run `python -m utils.retrieval --live` "
+                    "to compare output tokens and latency against the API."
+                )
+    
+    show_metrics_panel()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,481 @@
+"""Generate research for many topics at once, e.g. a week of small-group guides.
+
+    python -m utils.batch_research topics.csv --output guides.jsonl --concurrency 4
+
+Input is CSV (with a header row) or JSONL with the fields research_type,
+user_input, depth_level and include_greek_hebrew; an optional `id` column
+names each job. Results are appended to the output JSONL as each job
+finishes, so re-running the same command after a crash or Ctrl-C skips
+jobs that already succeeded and retries the rest.
+
+With --batch-api the jobs go through the Message Batches API instead:
+half the price, no per-request latency budget, results within a day.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from utils.claude_client import ClaudeClient, calculate_usage_cost, get_claude_client
+from utils.cross_references import get_cross_references
+from utils.json_stream import parse_research_json
+from utils.prompts import (DEPTH_INSTRUCTIONS, REFERENCES_ONLY_MAX_TOKENS, REQUEST_TEMPLATES, RESEARCH_MAX_TOKENS,
+                           get_research_prompt_parts, get_system_message)
+from utils.retrieval import get_verse_context
+from utils.verse_search import get_verse_index
+from utils.verse_store import get_verse_store
+from utils.verse_validation import enrich_verses
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_MINUTE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Message Batches API: half-price, results within 24 hours
+BATCH_PRICE_MULTIPLIER = 0.5
+DEFAULT_POLL_INTERVAL = 60.0
+MAX_BATCH_REQUESTS = 10_000
+
+# Request timeouts, conflicts, rate limits, server errors and overload
+_RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+# Errors no retry can fix and that every other job would hit too
+_FATAL_STATUSES = {401, 403}
+
+
+class ResearchJob(NamedTuple):
+    job_id: str
+    research_type: str
+    user_input: str
+    depth_level: str = "Intermediate"
+    include_greek_hebrew: bool = True
+
+
+class BatchAborted(Exception):
+    """Raised when an error makes the remaining jobs pointless (e.g. a bad API key)"""
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def make_job_id(research_type: str, user_input: str, depth_level: str, include_greek_hebrew: bool) -> str:
+    """Stable id from a job's fields, so resumed runs recognise finished work"""
+    key = json.dumps([research_type, user_input.strip(), depth_level, include_greek_hebrew])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def make_job(row: Dict, where: str) -> ResearchJob:
+    """Validate one input row and turn it into a job"""
+    research_type = (row.get("research_type") or "").strip()
+    user_input = (row.get("user_input") or "").strip()
+    depth_level = (row.get("depth_level") or "Intermediate").strip()
+    include_greek_hebrew = _parse_bool(row.get("include_greek_hebrew", True))
+    if research_type not in REQUEST_TEMPLATES:
+        raise ValueError(f"{where}: unknown research_type '{research_type}'")
+    if depth_level not in DEPTH_INSTRUCTIONS:
+        raise ValueError(f"{where}: unknown depth_level '{depth_level}'")
+    if not user_input:
+        raise ValueError(f"{where}: user_input is empty")
+    job_id = str(row.get("id") or "").strip() or make_job_id(
+        research_type, user_input, depth_level, include_greek_hebrew
+    )
+    return ResearchJob(job_id, research_type, user_input, depth_level, include_greek_hebrew)
+
+
+def load_jobs(path: str) -> List[ResearchJob]:
+    """Read jobs from a .csv or .jsonl file; duplicate rows are collapsed"""
+    rows = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for line_number, row in enumerate(csv.DictReader(f), 2):
+                rows.append((row, f"{path}:{line_number}"))
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    rows.append((json.loads(line), f"{path}:{line_number}"))
+
+    jobs, seen = [], set()
+    for row, where in rows:
+        job = make_job(row, where)
+        if job.job_id not in seen:
+            seen.add(job.job_id)
+            jobs.append(job)
+    return jobs
+
+
+def read_results(path: str) -> Dict[str, Dict]:
+    """Latest result record per job id; a line torn by a crash is ignored"""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            results[record["job_id"]] = record
+    return results
+
+
+def completed_job_ids(path: str) -> Set[str]:
+    return {job_id for job_id, record in read_results(path).items() if record.get("status") == "ok"}
+
+
+class ResultWriter:
+    """Appends one JSON line per finished job, flushed to disk before returning"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+", encoding="utf-8")
+        # Terminate a line left half-written by a previous crash
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class RateLimiter:
+    """Spaces request starts across all workers; a 429 pauses everyone"""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def pause(self, seconds: float):
+        """Hold back every worker for `seconds`, e.g. after a rate-limit response"""
+        with self._lock:
+            self._next_start = max(self._next_start, time.monotonic() + seconds)
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Rate limits, overload, server errors and dropped connections are worth retrying"""
+    status = _status_code(exc)
+    if status is not None:
+        return status in _RETRYABLE_STATUSES
+    # anthropic.APIConnectionError / APITimeoutError carry no status code
+    return (type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+            or isinstance(exc, (ConnectionError, TimeoutError)))
+
+
+def retry_delay(exc: Exception, attempt: int, base_delay: float, max_delay: float) -> float:
+    """Seconds to wait before retry number `attempt` (1-based).
+
+    Honours a retry-after header when the API sends one, otherwise
+    exponential backoff with full jitter.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), max_delay)
+        except ValueError:
+            pass
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+def complete_record(record: Dict, message, verse_store=None, cost_multiplier: float = 1.0) -> Dict:
+    """Fill a result record from a model response, parsed and verse-checked like the app's results.
+
+    A response that isn't valid JSON (e.g. cut off at max_tokens) is an
+    error, so a resumed run retries it; its cost is still recorded.
+    """
+    text = message.content[0].text
+    data = parse_research_json(text)
+    verse_status = enrich_verses(data, verse_store) if data is not None else None
+    record.update(
+        status="ok" if data is not None else "error",
+        cost=calculate_usage_cost(message.usage) * cost_multiplier,
+        result=text, data=data, verse_status=verse_status,
+        error=None if data is not None else "Response was not valid JSON",
+    )
+    return record
+
+
+def _job_request(job: ResearchJob, verse_store=None) -> Dict:
+    """messages.create arguments for a job"""
+    references_only = verse_store is not None
+    verse_context = get_verse_context(job.user_input, get_verse_index(), verse_store,
+                                      graph=get_cross_references()) if references_only else ""
+    schema_prefix, prompt = get_research_prompt_parts(
+        job.research_type, job.user_input, job.depth_level, job.include_greek_hebrew,
+        include_verse_text=not references_only, verse_context=verse_context
+    )
+    max_tokens = REFERENCES_ONLY_MAX_TOKENS if references_only else RESEARCH_MAX_TOKENS
+    return ClaudeClient.build_request(prompt, get_system_message(), max_tokens=max_tokens,
+                                      cached_prefix=schema_prefix)
+
+
+def run_job(job: ResearchJob, claude_client: ClaudeClient, limiter: RateLimiter, verse_store=None,
+            max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = 1.0,
+            max_delay: float = 60.0) -> Dict:
+    """Run one job with retries and return its result record"""
+    request = _job_request(job, verse_store)
+    record = job._asdict()
+    start = time.perf_counter()
+
+    for attempt in range(1, max_attempts + 1):
+        limiter.wait()
+        try:
+            response = claude_client.client.messages.create(**request)
+        except Exception as e:
+            if _status_code(e) in _FATAL_STATUSES:
+                raise BatchAborted(f"{job.job_id}: {e}") from e
+            if not is_retryable(e) or attempt == max_attempts:
+                record.update(status="error", error=str(e), attempts=attempt, cost=0.0)
+                break
+            delay = retry_delay(e, attempt, base_delay, max_delay)
+            if _status_code(e) == 429:
+                limiter.pause(delay)
+            time.sleep(delay)
+            continue
+
+        record["attempts"] = attempt
+        complete_record(record, response, verse_store)
+        break
+
+    record["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(jobs: Iterable[ResearchJob], output_path: str, claude_client: ClaudeClient,
+              concurrency: int = DEFAULT_CONCURRENCY, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+              max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = 1.0, max_delay: float = 60.0,
+              verse_store=None, on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Run every job not already completed in output_path, writing results as they finish.
+
+    Returns a summary with counts of skipped, succeeded and failed jobs and
+    the total cost of this run.
+    """
+    done = completed_job_ids(output_path)
+    jobs = list(jobs)
+    pending = [job for job in jobs if job.job_id not in done]
+    summary = {"skipped": len(jobs) - len(pending), "ok": 0, "error": 0, "cost": 0.0}
+
+    limiter = RateLimiter(requests_per_minute)
+    writer = ResultWriter(output_path)
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = [
+            executor.submit(run_job, job, claude_client, limiter, verse_store, max_attempts, base_delay, max_delay)
+            for job in pending
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            writer.write(record)
+            summary[record["status"]] += 1
+            summary["cost"] += record["cost"]
+            if on_result is not None:
+                on_result(record)
+    finally:
+        # On abort or Ctrl-C, drop queued jobs; finished ones are already on disk
+        executor.shutdown(wait=True, cancel_futures=True)
+        writer.close()
+    return summary
+
+
+def batch_state_path(output_path: str) -> str:
+    """Where submitted-but-unfinished batches are remembered between runs"""
+    return output_path + ".batches.json"
+
+
+def _load_batch_state(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_batch_state(path: str, batches: List[Dict]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(batches, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def build_batch_requests(jobs: List[ResearchJob], verse_store=None) -> List[Dict]:
+    """Message Batches API requests for jobs; custom_id is the job's position in the list"""
+    return [{"custom_id": f"job-{i}", "params": _job_request(job, verse_store)} for i, job in enumerate(jobs)]
+
+
+def _batch_entry_record(job: Dict, entry, submitted_at: float, verse_store=None) -> Dict:
+    # elapsed_s counts from submission, so it includes time spent queued in the batch
+    record = dict(job, attempts=1, elapsed_s=round(time.time() - submitted_at, 3))
+    result = entry.result
+    if result.type == "succeeded":
+        return complete_record(record, result.message, verse_store, BATCH_PRICE_MULTIPLIER)
+    error = getattr(result, "error", None)
+    record.update(status="error", cost=0.0, error=f"{result.type}: {error}" if error else result.type)
+    return record
+
+
+def run_message_batch(jobs: Iterable[ResearchJob], output_path: str, claude_client: ClaudeClient,
+                      poll_interval: float = DEFAULT_POLL_INTERVAL, timeout: Optional[float] = None,
+                      verse_store=None, on_result: Optional[Callable[[Dict], None]] = None,
+                      max_batch_requests: int = MAX_BATCH_REQUESTS) -> Dict:
+    """Run pending jobs through the Message Batches API at batch pricing.
+
+    Submitted batch ids are saved next to output_path before polling, so a
+    run that is interrupted (or stops at `timeout` seconds) picks up the
+    same batches next time instead of paying for them twice. Each result is
+    mapped back to its job by custom_id, parsed and verse-checked like an
+    interactive result, and appended to output_path.
+    Returns the run_batch summary plus the number of jobs still in flight.
+    """
+    done = completed_job_ids(output_path)
+    jobs = list(jobs)
+    state_path = batch_state_path(output_path)
+    batches = _load_batch_state(state_path)
+    in_flight = {job["job_id"] for batch in batches for job in batch["jobs"].values()}
+    pending = [job for job in jobs if job.job_id not in done and job.job_id not in in_flight]
+    summary = {"skipped": sum(job.job_id in done for job in jobs), "ok": 0, "error": 0,
+               "cost": 0.0, "in_flight": 0}
+
+    for start in range(0, len(pending), max_batch_requests):
+        chunk = pending[start:start + max_batch_requests]
+        requests = build_batch_requests(chunk, verse_store)
+        batch = claude_client.submit_batch(requests)
+        batches.append({
+            "batch_id": batch.id,
+            "submitted_at": time.time(),
+            "jobs": {request["custom_id"]: job._asdict() for request, job in zip(requests, chunk)},
+        })
+        _save_batch_state(state_path, batches)
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    writer = ResultWriter(output_path)
+    try:
+        while batches:
+            for batch in list(batches):
+                if claude_client.retrieve_batch(batch["batch_id"]).processing_status != "ended":
+                    continue
+                for entry in claude_client.batch_results(batch["batch_id"]):
+                    job = batch["jobs"].get(entry.custom_id)
+                    if job is None:
+                        continue
+                    record = _batch_entry_record(job, entry, batch["submitted_at"], verse_store)
+                    writer.write(record)
+                    summary[record["status"]] += 1
+                    summary["cost"] += record["cost"]
+                    if on_result is not None:
+                        on_result(record)
+                batches.remove(batch)
+                _save_batch_state(state_path, batches)
+            if not batches or (deadline is not None and time.monotonic() + poll_interval > deadline):
+                break
+            time.sleep(poll_interval)
+    finally:
+        writer.close()
+
+    summary["in_flight"] = sum(len(batch["jobs"]) for batch in batches)
+    if not batches and os.path.exists(state_path):
+        os.remove(state_path)
+    return summary
+
+
+def _stub_response(request: Dict) -> str:
+    """A minimal research document for --fake runs, titled from the request"""
+    prompt = request["messages"][0]["content"]
+    title = prompt.split('Use this exact title: "', 1)[-1].split('"', 1)[0]
+    return json.dumps({
+        "title": title,
+        "overview": "Stub response generated without calling the API.",
+        "key_verses": [{"reference": "John 3:16", "significance": "Stub"}],
+        "cross_reference_keywords": ["love", "faith"],
+    })
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate biblical research for many topics.")
+    parser.add_argument("input", help="CSV or JSONL file of jobs")
+    parser.add_argument("--output", help="results JSONL (default: <input>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rpm", type=float, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help="maximum requests started per minute")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    parser.add_argument("--batch-api", action="store_true",
+                        help="submit through the Message Batches API (half price, results within 24 h)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="seconds between batch status checks")
+    parser.add_argument("--timeout", type=float,
+                        help="stop polling after this many seconds; re-run later to collect results")
+    parser.add_argument("--fake", action="store_true", help="use a stub client instead of the API")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+    jobs = load_jobs(args.input)
+
+    if args.fake:
+        from utils.fakes import FakeAnthropicClient
+        claude_client = ClaudeClient(client=FakeAnthropicClient(_stub_response, first_token_delay=0.05))
+        if args.batch_api:
+            args.poll_interval = min(args.poll_interval, 0.5)
+    else:
+        api_key = os.environ.get("CLAUDE_API_KEY")
+        if not api_key:
+            print("Set CLAUDE_API_KEY to run against the API (or pass --fake).", file=sys.stderr)
+            return 2
+        # Retries are handled here, with backoff shared across workers
+        claude_client = get_claude_client(api_key, max_retries=0)
+
+    def report(record):
+        print(f"[{record['status']}] {record['research_type']}: {record['user_input']} "
+              f"({record['attempts']} attempt(s), {record['elapsed_s']:.1f} s)")
+
+    try:
+        if args.batch_api:
+            summary = run_message_batch(jobs, output, claude_client, args.poll_interval, args.timeout,
+                                        verse_store=get_verse_store(), on_result=report)
+        else:
+            summary = run_batch(jobs, output, claude_client, args.concurrency, args.rpm, args.max_attempts,
+                                verse_store=get_verse_store(), on_result=report)
+    except BatchAborted as e:
+        print(f"Batch aborted: {e}", file=sys.stderr)
+        return 1
+    print(f"{summary['ok']} succeeded, {summary['error']} failed, {summary['skipped']} already done; "
+          f"cost ${summary['cost']:.4f}. Results in {output}")
+    if summary.get("in_flight"):
+        print(f"{summary['in_flight']} job(s) still processing; run the same command again to collect them.")
+        return 3
+    return 0 if summary["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,42 +1,147 @@
 import requests
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from typing import Optional, Dict
 
-def get_bible_verse(reference: str, version: str = "ESV") -> Optional[Dict]:
+from utils.verse_corpus import DEFAULT_TRANSLATION
+
+def get_bible_verse(reference: str, version: str = DEFAULT_TRANSLATION) -> Optional[Dict]:
     """
-    Fetch Bible verse from API (placeholder for now)
+    Fetch Bible verse text from the local memory-mapped verse store
     
     Args:
-        reference: Bible reference (e.g., "John 3:16")
-        version: Bible version (default: ESV)
+        reference: Bible reference (e.g., "John 3:16", "John 3:16-18", "Rom 8")
+        version: Translation installed under data/bible/ (default: KJV)
     
     Returns:
-        Dictionary with verse data or None if error
+        Dictionary with verse data or None if the reference or translation is unavailable
     """
-    # For now, return a placeholder
-    # Later we can integrate with Bible API like ESV API or Bible Gateway
+    from utils.verse_store import get_verse_store
+    
+    store = get_verse_store(version)
+    if store is None:
+        return None
+    
+    verses = store.passage(reference)
+    if not verses:
+        return None
     
     return {
         "reference": reference,
-        "text": "Placeholder: Bible verse will be fetched from API in future version",
-        "version": version
+        "text": " ".join(verse["text"] for verse in verses),
+        "version": version,
+        "verses": verses
     }
 
 def search_verses_by_topic(topic: str, limit: int = 10) -> list:
     """
-    Search for Bible verses by topic (placeholder for now)
+    Search for Bible verses by topic, by meaning rather than exact words
+    
+    Uses the local semantic index, so "fear and worry" also finds verses about
+    trouble and trust; quoted phrases use the full-text index instead, as do
+    all searches while the semantic index is still being built.
     
     Args:
-        topic: Search topic
+        topic: Search topic (quote words to require an exact phrase)
         limit: Maximum number of verses to return
     
     Returns:
-        List of verse dictionaries
+        List of verse dictionaries (empty if no verse text is installed)
     """
-    # Placeholder function - will integrate with Bible search API later
+    from utils.semantic_index import semantic_verse_search
+    from utils.verse_search import get_verse_index
+    
+    verses = [] if '"' in topic else semantic_verse_search(topic, limit=limit, wait=False)
+    if not verses:
+        verse_index = get_verse_index()
+        if verse_index is None:
+            return []
+        verses = verse_index.search(topic, limit=limit)
+    
     return [
         {
-            "reference": "Example Reference",
-            "text": f"Placeholder verse related to {topic}",
-            "version": "ESV"
+            "reference": f"{verse['book_name']} {verse['chapter']}:{verse['verse']}",
+            "text": verse["text"],
+            "version": DEFAULT_TRANSLATION,
+            "score": verse["score"]
         }
+        for verse in verses
     ]
+
+def search_keywords_concurrently(keywords: list, search_fn, limit: int = 10, timeout: float = 5.0):
+    """
+    Run search_fn for every keyword concurrently and yield results as they finish
+    
+    Each distinct keyword gets its own worker, so every lookup starts at once
+    and has the full timeout to run; none waits in a queue behind the others.
+    
+    Args:
+        keywords: Words to look up (repeats are looked up once)
+        search_fn: Callable (query, limit=...) -> list of verse dictionaries
+        limit: Maximum results per keyword
+        timeout: Seconds each lookup may take; keywords still running after
+            that are reported as timed out
+    
+    Yields:
+        (keyword, results, error) tuples in completion order; error is None on
+        success, otherwise a short message (timeouts yield empty results)
+    """
+    keywords = list(dict.fromkeys(keywords))
+    if not keywords:
+        return
+    
+    executor = ThreadPoolExecutor(max_workers=len(keywords))
+    futures = {executor.submit(search_fn, keyword, limit=limit): keyword for keyword in keywords}
+    pending = dict(futures)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            keyword = pending.pop(future)
+            try:
+                yield keyword, future.result(), None
+            except Exception as e:
+                yield keyword, [], str(e)
+    except FuturesTimeout:
+        # Report every keyword not yielded yet: lookups that finished right at the
+        # deadline keep their results, the stragglers are reported instead of awaited
+        for future, keyword in pending.items():
+            if not future.done():
+                yield keyword, [], f"timed out after {timeout:.1f}s"
+            elif future.exception() is not None:
+                yield keyword, [], str(future.exception())
+            else:
+                yield keyword, future.result(), None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def benchmark_cross_reference_fanout(keyword_count: int = 5, latency: float = 0.2) -> dict:
+    """
+    Compare sequential and concurrent keyword lookups against a fake backend
+    
+    Args:
+        keyword_count: Number of keywords to look up
+        latency: Injected per-lookup latency in seconds
+    
+    Returns:
+        Dictionary with sequential and concurrent wall times in seconds
+    """
+    from utils.fakes import FakeSearchBackend
+    
+    backend = FakeSearchBackend(latency=latency)
+    keywords = [f"keyword{i}" for i in range(keyword_count)]
+    
+    start = time.perf_counter()
+    for keyword in keywords:
+        backend.search(keyword, limit=10)
+    sequential_s = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in search_keywords_concurrently(keywords, backend.search, timeout=latency * 10):
+        pass
+    concurrent_s = time.perf_counter() - start
+    
+    return {
+        "keywords": keyword_count,
+        "latency_s": latency,
+        "sequential_s": sequential_s,
+        "concurrent_s": concurrent_s,
+    }
@@ -0,0 +1,115 @@
+# Canonical book ordering shared by the charts, indexes and verse stores.
+# A book's ordinal is its position in BIBLE_BOOKS (Genesis = 0).
+
+BIBLE_BOOKS = (
+    "Genesis", "Exodus", "Leviticus", "Numbers", "Deuteronomy",
+    "Joshua", "Judges", "Ruth", "1 Samuel", "2 Samuel", "1 Kings", "2 Kings",
+    "1 Chronicles", "2 Chronicles", "Ezra", "Nehemiah", "Esther",
+    "Job", "Psalms", "Proverbs", "Ecclesiastes", "Song of Songs",
+    "Isaiah", "Jeremiah", "Lamentations", "Ezekiel", "Daniel",
+    "Hosea", "Joel", "Amos", "Obadiah", "Jonah", "Micah", "Nahum",
+    "Habakkuk", "Zephaniah", "Haggai", "Zechariah", "Malachi",
+    "Matthew", "Mark", "Luke", "John", "Acts",
+    "Romans", "1 Corinthians", "2 Corinthians", "Galatians", "Ephesians",
+    "Philippians", "Colossians", "1 Thessalonians", "2 Thessalonians",
+    "1 Timothy", "2 Timothy", "Titus", "Philemon",
+    "Hebrews", "James", "1 Peter", "2 Peter", "1 John", "2 John", "3 John",
+    "Jude", "Revelation"
+)
+
+# Books [0, OT_BOOK_COUNT) are Old Testament, the rest New Testament
+OT_BOOK_COUNT = 39
+
+BOOK_ORDINALS = {book: i for i, book in enumerate(BIBLE_BOOKS)}
+
+OLD_TESTAMENT_BOOKS = frozenset(BIBLE_BOOKS[:OT_BOOK_COUNT])
+NEW_TESTAMENT_BOOKS = frozenset(BIBLE_BOOKS[OT_BOOK_COUNT:])
+
+# Literary divisions as (genre, first book, last book); each covers a contiguous ordinal range
+_GENRE_RANGES = (
+    ("Law", "Genesis", "Deuteronomy"),
+    ("History", "Joshua", "Esther"),
+    ("Wisdom & Poetry", "Job", "Song of Songs"),
+    ("Major Prophets", "Isaiah", "Daniel"),
+    ("Minor Prophets", "Hosea", "Malachi"),
+    ("Gospels", "Matthew", "John"),
+    ("Acts", "Acts", "Acts"),
+    ("Pauline Epistles", "Romans", "Philemon"),
+    ("General Epistles", "Hebrews", "Jude"),
+    ("Apocalyptic", "Revelation", "Revelation"),
+)
+GENRES = tuple(genre for genre, _, _ in _GENRE_RANGES)
+# BOOK_GENRES[ordinal] is the index into GENRES of that book's genre
+BOOK_GENRES = tuple(
+    genre_index
+    for genre_index, (_, first, last) in enumerate(_GENRE_RANGES)
+    for _ in range(BOOK_ORDINALS[first], BOOK_ORDINALS[last] + 1)
+)
+
+# Common alternate names and abbreviations, keyed by lowercase with spaces/periods removed
+_BOOK_ALIASES = {
+    "gen": "Genesis", "ge": "Genesis", "gn": "Genesis",
+    "exod": "Exodus", "exo": "Exodus", "ex": "Exodus",
+    "lev": "Leviticus", "lv": "Leviticus",
+    "num": "Numbers", "nm": "Numbers", "nb": "Numbers",
+    "deut": "Deuteronomy", "dt": "Deuteronomy", "deu": "Deuteronomy",
+    "josh": "Joshua", "jos": "Joshua",
+    "judg": "Judges", "jdg": "Judges", "jg": "Judges",
+    "rut": "Ruth", "ru": "Ruth",
+    "1sam": "1 Samuel", "1sa": "1 Samuel", "2sam": "2 Samuel", "2sa": "2 Samuel",
+    "1kgs": "1 Kings", "1ki": "1 Kings", "2kgs": "2 Kings", "2ki": "2 Kings",
+    "1chr": "1 Chronicles", "1ch": "1 Chronicles", "2chr": "2 Chronicles", "2ch": "2 Chronicles",
+    "ezr": "Ezra", "neh": "Nehemiah", "ne": "Nehemiah", "esth": "Esther", "est": "Esther",
+    "jb": "Job",
+    "ps": "Psalms", "psa": "Psalms", "psalm": "Psalms", "pss": "Psalms",
+    "prov": "Proverbs", "pro": "Proverbs", "prv": "Proverbs",
+    "eccl": "Ecclesiastes", "ecc": "Ecclesiastes", "qoh": "Ecclesiastes",
+    "song": "Song of Songs", "sos": "Song of Songs", "songofsolomon": "Song of Songs",
+    "canticles": "Song of Songs", "sng": "Song of Songs",
+    "isa": "Isaiah", "is": "Isaiah", "jer": "Jeremiah", "je": "Jeremiah",
+    "lam": "Lamentations", "la": "Lamentations", "ezek": "Ezekiel", "eze": "Ezekiel", "ezk": "Ezekiel",
+    "dan": "Daniel", "da": "Daniel", "dn": "Daniel",
+    "hos": "Hosea", "ho": "Hosea", "joe": "Joel", "jl": "Joel", "amo": "Amos", "am": "Amos",
+    "obad": "Obadiah", "oba": "Obadiah", "ob": "Obadiah", "jon": "Jonah", "jnh": "Jonah",
+    "mic": "Micah", "mi": "Micah", "nah": "Nahum", "na": "Nahum",
+    "hab": "Habakkuk", "hb": "Habakkuk", "zeph": "Zephaniah", "zep": "Zephaniah",
+    "hag": "Haggai", "hg": "Haggai", "zech": "Zechariah", "zec": "Zechariah",
+    "mal": "Malachi", "ml": "Malachi",
+    "matt": "Matthew", "mat": "Matthew", "mt": "Matthew",
+    "mrk": "Mark", "mk": "Mark", "mr": "Mark",
+    "luk": "Luke", "lk": "Luke", "jhn": "John", "jn": "John", "joh": "John",
+    "act": "Acts", "ac": "Acts",
+    "rom": "Romans", "ro": "Romans", "rm": "Romans",
+    "1cor": "1 Corinthians", "1co": "1 Corinthians", "2cor": "2 Corinthians", "2co": "2 Corinthians",
+    "gal": "Galatians", "ga": "Galatians", "eph": "Ephesians", "ephes": "Ephesians",
+    "phil": "Philippians", "php": "Philippians", "pp": "Philippians",
+    "col": "Colossians",
+    "1thess": "1 Thessalonians", "1th": "1 Thessalonians", "2thess": "2 Thessalonians", "2th": "2 Thessalonians",
+    "1tim": "1 Timothy", "1ti": "1 Timothy", "2tim": "2 Timothy", "2ti": "2 Timothy",
+    "tit": "Titus", "ti": "Titus", "phlm": "Philemon", "philem": "Philemon", "phm": "Philemon",
+    "heb": "Hebrews", "jas": "James", "jm": "James",
+    "1pet": "1 Peter", "1pe": "1 Peter", "1pt": "1 Peter", "2pet": "2 Peter", "2pe": "2 Peter", "2pt": "2 Peter",
+    "1jn": "1 John", "1jo": "1 John", "1jhn": "1 John", "2jn": "2 John", "2jo": "2 John", "2jhn": "2 John",
+    "3jn": "3 John", "3jo": "3 John", "3jhn": "3 John",
+    "jud": "Jude", "jd": "Jude", "rev": "Revelation", "re": "Revelation", "revelations": "Revelation",
+}
+
+
+def _alias_key(name: str) -> str:
+    key = name.lower().replace(".", "").replace(" ", "")
+    # Roman numeral and spelled-out prefixes: "I John", "First John", "iii john"
+    for prefix, digit in (("iii", "3"), ("ii", "2"), ("i", "1"),
+                          ("first", "1"), ("second", "2"), ("third", "3")):
+        if name.lower().startswith(prefix + " "):
+            key = digit + key[len(prefix):]
+            break
+    return key
+
+
+BOOK_LOOKUP = {_alias_key(book): book for book in BIBLE_BOOKS}
+BOOK_LOOKUP.update(_BOOK_ALIASES)
+
+
+def normalize_book_name(name: str):
+    """Return the canonical book name for a name or abbreviation, or None if unknown"""
+    return BOOK_LOOKUP.get(_alias_key(name.strip()))
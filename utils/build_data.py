@@ -0,0 +1,270 @@
+"""Validate the data files and compile them into the binary artifacts the app loads.
+
+    python -m utils.build_data              # validate + compile everything
+    python -m utils.build_data --check      # validate only
+    python -m utils.build_data --benchmark  # also compare JSON and compiled cold starts
+
+Outputs data/compiled/lexicon.v<N>.npz (picked up by LexiconStore when its
+source hashes match the JSON files), the word aggregates, the verse-level
+occurrence store when data/lemma_verses.tsv is present, the cross-reference
+graph when data/cross_references.txt is present, and the verse store, search
+index and semantic index for each installed translation.
+"""
+
+import argparse
+import gc
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.bible_books import BIBLE_BOOKS, BOOK_ORDINALS
+from utils.lexicon_artifact import artifact_path, compile_lexicon, source_fingerprint
+from utils.lexicon_store import DATA_DIR, LEXICON_FILES, LexiconStore
+from utils.occurrence_matrix import OccurrenceMatrix
+
+_STRONG_PATTERNS = {"greek_words": re.compile(r"^G\d+[a-z]?$"), "hebrew_words": re.compile(r"^H\d+[a-z]?$")}
+_REQUIRED_FIELDS = ("strong", "meaning", "english_words")
+
+
+class DataValidationError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__(f"{len(errors)} problem(s) in data files:\n  " + "\n  ".join(errors))
+        self.errors = errors
+
+
+def validate_lexicon(greek_words, hebrew_words, word_occurrences) -> List[str]:
+    """Return a list of problems in the three lexicon files; empty if they are valid"""
+    errors = []
+    lexicons = {"greek_words": greek_words, "hebrew_words": hebrew_words}
+    for name, lexicon in lexicons.items():
+        if not isinstance(lexicon, dict):
+            errors.append(f"{name}: top level must be an object of lemma -> entry")
+            continue
+        for lemma, entry in lexicon.items():
+            where = f"{name}[{lemma!r}]"
+            if not isinstance(entry, dict):
+                errors.append(f"{where}: entry must be an object")
+                continue
+            for field in _REQUIRED_FIELDS:
+                if field not in entry:
+                    errors.append(f"{where}: missing '{field}'")
+            for field, value in entry.items():
+                is_list = isinstance(value, list)
+                if is_list and not all(isinstance(item, str) for item in value):
+                    errors.append(f"{where}.{field}: list items must be strings")
+                elif not is_list and not isinstance(value, str):
+                    errors.append(f"{where}.{field}: must be a string or list of strings")
+            if isinstance(entry.get("english_words"), list) and not entry["english_words"]:
+                errors.append(f"{where}.english_words: must not be empty")
+            strong = entry.get("strong")
+            if isinstance(strong, str) and not _STRONG_PATTERNS[name].match(strong):
+                errors.append(f"{where}.strong: {strong!r} is not a {name.split('_')[0].title()} Strong's number")
+
+    if isinstance(greek_words, dict) and isinstance(hebrew_words, dict):
+        for lemma in set(greek_words) & set(hebrew_words):
+            errors.append(f"lemma {lemma!r} appears in both greek_words and hebrew_words")
+
+    if not isinstance(word_occurrences, dict):
+        errors.append("word_occurrences: top level must be an object of word -> lemma -> book -> count")
+        return errors
+    for word, lemmas in word_occurrences.items():
+        if not isinstance(lemmas, dict):
+            errors.append(f"word_occurrences[{word!r}]: must be an object of lemma -> book counts")
+            continue
+        for lemma, books in lemmas.items():
+            where = f"word_occurrences[{word!r}][{lemma!r}]"
+            if lemma not in greek_words and lemma not in hebrew_words:
+                errors.append(f"{where}: lemma is not in greek_words or hebrew_words")
+            if not isinstance(books, dict):
+                errors.append(f"{where}: must be an object of book -> count")
+                continue
+            for book, count in books.items():
+                if book not in BOOK_ORDINALS:
+                    errors.append(f"{where}: unknown book {book!r} (use the names in utils.bible_books)")
+                if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+                    errors.append(f"{where}[{book!r}]: count must be a non-negative integer")
+    return errors
+
+
+def _source_paths(data_dir: str) -> Dict[str, str]:
+    return {name: os.path.join(data_dir, filename) for name, filename in LEXICON_FILES.items()}
+
+
+def load_and_validate(data_dir: str = DATA_DIR) -> Dict[str, dict]:
+    """Parse the JSON files; raises DataValidationError listing every problem found"""
+    raw = {}
+    for name, path in _source_paths(data_dir).items():
+        with open(path, "r", encoding="utf-8") as f:
+            raw[name] = json.load(f)
+    errors = validate_lexicon(raw["greek_words"], raw["hebrew_words"], raw["word_occurrences"])
+    if errors:
+        raise DataValidationError(errors)
+    return raw
+
+
+def build_lexicon_artifact(data_dir: str = DATA_DIR, output: Optional[str] = None) -> str:
+    """Validate the lexicon JSON files and compile them; returns the artifact path"""
+    raw = load_and_validate(data_dir)
+    path = output or artifact_path(data_dir)
+    compile_lexicon(raw["greek_words"], raw["hebrew_words"], raw["word_occurrences"],
+                    source_fingerprint(list(_source_paths(data_dir).values())), path)
+    return path
+
+
+def build_all(data_dir: str = DATA_DIR) -> List[str]:
+    """Compile every derived artifact; returns one progress line per step"""
+    from utils.verse_corpus import available_translations
+    from utils.cross_references import get_cross_references
+    from utils.semantic_index import get_semantic_index
+    from utils.verse_occurrences import get_verse_occurrences
+    from utils.verse_search import get_verse_index
+    from utils.verse_store import get_verse_store
+    from utils.word_aggregates import aggregates_path, build_word_aggregates
+
+    report = []
+    start = time.perf_counter()
+    path = build_lexicon_artifact(data_dir)
+    report.append(f"lexicon: {path} ({os.path.getsize(path) / 1024:.0f} KB, "
+                  f"{(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    snapshot = LexiconStore(data_dir).get()
+    build_word_aggregates(snapshot)
+    report.append(f"word aggregates: {aggregates_path(snapshot)}")
+
+    if data_dir == DATA_DIR:
+        occurrences = get_verse_occurrences()
+        if occurrences is not None:
+            report.append(f"verse occurrences: {len(occurrences.keys)} occurrences of "
+                          f"{len(occurrences.lemmas)} lemmas")
+        graph = get_cross_references()
+        if graph is not None:
+            report.append(f"cross-references: {graph.link_count} links between {graph.node_count} verses")
+        for translation in available_translations():
+            start = time.perf_counter()
+            store = get_verse_store(translation)
+            get_verse_index(translation)
+            get_semantic_index(translation)
+            report.append(f"{translation}: {store.verse_count} verses, store + search + semantic index ready "
+                          f"({(time.perf_counter() - start):.1f} s)")
+    return report
+
+
+def _synthetic_lexicon_files(data_dir: str, lemma_rows: int, seed: int = 3):
+    """Write JSON lexicon files with about `lemma_rows` (word, lemma, book) count entries"""
+    rng = np.random.default_rng(seed)
+    books_per_lemma = 20
+    lemma_count = max(1, lemma_rows // books_per_lemma)
+    greek, hebrew, occurrences = {}, {}, {}
+    for i in range(lemma_count):
+        hebrew_lemma = i % 2 == 0
+        lemma = f"lemma{i}"
+        (hebrew if hebrew_lemma else greek)[lemma] = {
+            "strong": f"{'H' if hebrew_lemma else 'G'}{i}",
+            "meaning": f"synthetic meaning number {i} for benchmarking",
+            "english_words": [f"word{i % 8000}", f"word{(i * 7) % 8000}ed"],
+            "part_of_speech": "noun",
+            "transliteration": lemma,
+        }
+        first = 0 if hebrew_lemma else 39
+        last = 39 if hebrew_lemma else len(BIBLE_BOOKS)
+        books = rng.choice(np.arange(first, last), size=min(books_per_lemma, last - first), replace=False)
+        occurrences.setdefault(f"word{i % 8000}", {})[lemma] = {
+            BIBLE_BOOKS[book]: int(count) for book, count in zip(books, rng.integers(1, 50, size=len(books)))
+        }
+    for name, data in (("greek_words", greek), ("hebrew_words", hebrew), ("word_occurrences", occurrences)):
+        with open(os.path.join(data_dir, LEXICON_FILES[name]), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+def _cold_start(data_dir: str, compiled: bool) -> Dict[str, float]:
+    """Time a fresh LexiconStore load plus building the occurrence matrix and one word lookup"""
+    gc.collect()
+    start = time.perf_counter()
+    snapshot = LexiconStore(data_dir, use_compiled=compiled).get()
+    load_ms = (time.perf_counter() - start) * 1000
+    assert snapshot.source == ("compiled" if compiled else "json")
+
+    start = time.perf_counter()
+    if snapshot.compiled is not None:
+        OccurrenceMatrix.from_arrays(snapshot.compiled.occurrence_rows, snapshot.compiled.counts)
+    else:
+        OccurrenceMatrix(snapshot.word_occurrences)
+    matrix_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    word = next(iter(snapshot.word_occurrences))
+    for lemma in snapshot.word_occurrences[word]:
+        (snapshot.greek_words if lemma in snapshot.greek_words else snapshot.hebrew_words)[lemma]
+    lookup_ms = (time.perf_counter() - start) * 1000
+
+    return {"load_ms": load_ms, "matrix_ms": matrix_ms, "first_lookup_ms": lookup_ms,
+            "total_ms": load_ms + matrix_ms + lookup_ms, "memory_mb": snapshot.memory_bytes / (1024 * 1024)}
+
+
+def benchmark_cold_start(lemma_rows=(None, 300_000), repeats: int = 3) -> List[Dict]:
+    """Compare JSON and compiled cold starts on the real data (None) and synthetic sizes.
+
+    Each dataset is copied or generated into a temporary directory and
+    compiled there. Figures are the best of `repeats` fresh loads in this
+    process, so OS file caching is warm for both formats; the difference
+    is parse and object-construction cost.
+    """
+    results = []
+    for rows in lemma_rows:
+        data_dir = tempfile.mkdtemp(prefix="lexicon-bench-")
+        try:
+            if rows is None:
+                for filename in LEXICON_FILES.values():
+                    shutil.copy(os.path.join(DATA_DIR, filename), data_dir)
+            else:
+                _synthetic_lexicon_files(data_dir, rows)
+            build_lexicon_artifact(data_dir)
+
+            row = {"dataset": "data/" if rows is None else f"synthetic {rows:,} rows"}
+            for label, compiled in (("json", False), ("compiled", True)):
+                timings = [_cold_start(data_dir, compiled) for _ in range(repeats)]
+                best = min(timings, key=lambda t: t["total_ms"])
+                row.update({f"{label}_{key}": value for key, value in best.items()})
+            row["speedup"] = row["json_total_ms"] / row["compiled_total_ms"]
+            results.append(row)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate and compile the data files.")
+    parser.add_argument("--check", action="store_true", help="validate only; write nothing")
+    parser.add_argument("--benchmark", action="store_true", help="compare JSON and compiled cold starts")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.check:
+            load_and_validate()
+            print("Data files are valid.")
+        else:
+            for line in build_all():
+                print(line)
+    except DataValidationError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.benchmark:
+        for row in benchmark_cold_start():
+            print(f"{row['dataset']:>24}: json {row['json_total_ms']:8.1f} ms "
+                  f"(load {row['json_load_ms']:.1f}, matrix {row['json_matrix_ms']:.1f}, "
+                  f"{row['json_memory_mb']:.1f} MB)  compiled {row['compiled_total_ms']:7.1f} ms "
+                  f"(load {row['compiled_load_ms']:.1f}, matrix {row['compiled_matrix_ms']:.1f}, "
+                  f"{row['compiled_memory_mb']:.1f} MB)  x{row['speedup']:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,63 +1,290 @@
+import hashlib
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
 import anthropic
-import streamlit as st
-from typing import Optional
+
+from utils.prompts import estimate_tokens, get_system_message
+
+DEFAULT_MODEL = "claude-3-5-haiku-20241022"
+DEFAULT_MAX_TOKENS = 2000
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 2
+# Shortest prompt prefix each model family will cache; a cache_control breakpoint on a
+# shorter prefix is ignored by the API
+CACHE_MIN_TOKENS = {"claude-3-5-haiku": 2048, "claude-3-haiku": 2048}
+DEFAULT_CACHE_MIN_TOKENS = 1024
+# Rebuild pooled clients periodically so stale connections and rotated keys don't linger
+DEFAULT_MAX_CLIENT_AGE = 3600.0
+# Least recently used clients beyond this many (e.g. one per visitor's API key) are retired
+MAX_POOLED_CLIENTS = 32
+# Retired clients are closed after this long, so requests already running on them can finish
+RETIRED_CLIENT_GRACE = 300.0
+
+
+def calculate_cost(input_tokens: int, output_tokens: int, cache_read_tokens: int = 0,
+                   cache_write_tokens: int = 0) -> float:
+    """Calculate cost based on token usage for Claude 3.5 Haiku
+
+    input_tokens excludes prompt-cache reads and writes, which the API reports
+    separately: writes cost 1.25x the input rate, reads 0.1x.
+    """
+    input_cost_per_1k = 0.00025  # $0.25 per 1K input tokens
+    output_cost_per_1k = 0.00125  # $1.25 per 1K output tokens
+    cache_write_cost_per_1k = input_cost_per_1k * 1.25
+    cache_read_cost_per_1k = input_cost_per_1k * 0.1
+
+    input_cost = (input_tokens / 1000) * input_cost_per_1k
+    output_cost = (output_tokens / 1000) * output_cost_per_1k
+    cache_cost = ((cache_write_tokens / 1000) * cache_write_cost_per_1k
+                  + (cache_read_tokens / 1000) * cache_read_cost_per_1k)
+
+    return input_cost + output_cost + cache_cost
+
+
+def min_cacheable_tokens(model: str = DEFAULT_MODEL) -> int:
+    """Minimum prefix length (tokens) the model caches"""
+    for family, minimum in CACHE_MIN_TOKENS.items():
+        if model.startswith(family):
+            return minimum
+    return DEFAULT_CACHE_MIN_TOKENS
+
+
+def prefix_is_cacheable(system_message: str, cached_prefix: str, model: str = DEFAULT_MODEL) -> bool:
+    """Whether system message + prefix (estimated) reach the model's prompt-cache minimum"""
+    return estimate_tokens(system_message) + estimate_tokens(cached_prefix) >= min_cacheable_tokens(model)
+
+
+def calculate_usage_cost(usage) -> float:
+    """Cost of an API response's usage block, including prompt-cache reads and writes"""
+    return calculate_cost(
+        usage.input_tokens,
+        usage.output_tokens,
+        cache_read_tokens=getattr(usage, "cache_read_input_tokens", None) or 0,
+        cache_write_tokens=getattr(usage, "cache_creation_input_tokens", None) or 0,
+    )
+
+
+class _PoolEntry:
+    def __init__(self, client, created_at: float):
+        self.client = client
+        self.created_at = created_at
+        self.last_used = created_at
+        self.uses = 0
+
 
 class ClaudeClient:
-    def __init__(self):
-        self.client = None
-        self.api_key = None
-    
+    """Thin wrapper around a pooled, keep-alive anthropic.Anthropic client.
+
+    Underlying SDK clients are shared process-wide, keyed by API key and
+    connection settings, so every request and every Streamlit session
+    reuses the same HTTP connection pool instead of repeating the TLS
+    handshake. Clients older than max_client_age, and the least recently
+    used beyond MAX_POOLED_CLIENTS, are dropped from the pool and closed
+    RETIRED_CLIENT_GRACE seconds later. Pass `client` to bypass the pool
+    (e.g. a stub from utils.fakes), or `http_client` to run the real SDK
+    over a stub transport.
+    """
+
+    _pool: Dict[Tuple, _PoolEntry] = {}
+    _retired: List[Tuple[float, object]] = []
+    _pool_lock = threading.Lock()
+    clients_created = 0
+    clients_closed = 0
+    requests_served = 0
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES, max_client_age: float = DEFAULT_MAX_CLIENT_AGE,
+                 http_client=None, client=None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_client_age = max_client_age
+        self.http_client = http_client
+        self._override_client = client
+
     def set_api_key(self, api_key: str):
-        """Set the API key and initialize the client"""
+        """Set the API key used to select the pooled client"""
         self.api_key = api_key
-        try:
-            self.client = anthropic.Anthropic(api_key=api_key)
-        except Exception as e:
-            st.error(f"Failed to initialize Claude client: {str(e)}")
-            self.client = None
-    
+
+    def _pool_key(self) -> Tuple:
+        key_hash = hashlib.sha256((self.api_key or "").encode("utf-8")).hexdigest()
+        return key_hash, self.timeout, self.max_retries, id(self.http_client) if self.http_client else None
+
+    def _build_client(self):
+        kwargs = {"api_key": self.api_key, "timeout": self.timeout, "max_retries": self.max_retries}
+        if self.http_client is not None:
+            kwargs["http_client"] = self.http_client
+        ClaudeClient.clients_created += 1
+        return anthropic.Anthropic(**kwargs)
+
+    @property
+    def client(self):
+        """Pooled SDK client, rebuilt once it is older than max_client_age"""
+        if self._override_client is not None:
+            return self._override_client
+        if not self.api_key:
+            raise ValueError("Claude client not initialized. Please check your API key.")
+
+        key = self._pool_key()
+        now = time.monotonic()
+        with ClaudeClient._pool_lock:
+            entry = ClaudeClient._pool.get(key)
+            if entry is None or now - entry.created_at > self.max_client_age:
+                self._sweep(now)
+                entry = _PoolEntry(self._build_client(), now)
+                ClaudeClient._pool[key] = entry
+            entry.uses += 1
+            entry.last_used = now
+            ClaudeClient.requests_served += 1
+            return entry.client
+
+    def _sweep(self, now: float):
+        """Retire aged-out and excess pooled clients and close retired ones past their grace period.
+
+        Called with the pool lock held, before a new client is added.
+        """
+        pool = ClaudeClient._pool
+        for key in [key for key, entry in pool.items() if now - entry.created_at > self.max_client_age]:
+            ClaudeClient._retired.append((now, pool.pop(key).client))
+        # Room for the client about to be added
+        for key in sorted(pool, key=lambda key: pool[key].last_used)[:max(0, len(pool) + 1 - MAX_POOLED_CLIENTS)]:
+            ClaudeClient._retired.append((now, pool.pop(key).client))
+
+        still_open = []
+        for retired_at, client in ClaudeClient._retired:
+            if now - retired_at < RETIRED_CLIENT_GRACE:
+                still_open.append((retired_at, client))
+                continue
+            try:
+                client.close()
+            except Exception:
+                pass
+            ClaudeClient.clients_closed += 1
+        ClaudeClient._retired = still_open
+
+    @staticmethod
+    def build_request(prompt: str, system_message: str, model: str = DEFAULT_MODEL,
+                      max_tokens: int = DEFAULT_MAX_TOKENS, cached_prefix: Optional[str] = None) -> Dict:
+        """messages.create arguments; with cached_prefix, system message + prefix form one cached block.
+
+        The cache breakpoint is only added when the prefix reaches the model's
+        caching minimum (min_cacheable_tokens); shorter prefixes are sent as
+        the same blocks uncached.
+        """
+        system = system_message
+        if cached_prefix:
+            system = [
+                {"type": "text", "text": system_message},
+                {"type": "text", "text": cached_prefix},
+            ]
+            if prefix_is_cacheable(system_message, cached_prefix, model):
+                # The cache breakpoint on the last system block covers everything before it
+                system[-1]["cache_control"] = {"type": "ephemeral"}
+        return {
+            "model": model,
+            "max_tokens": max_tokens,
+            "system": system,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+        }
+
+    def create_message(self, prompt: str, system_message: str, model: str = DEFAULT_MODEL,
+                       max_tokens: int = DEFAULT_MAX_TOKENS, cached_prefix: Optional[str] = None):
+        """Send a single-turn request and return the SDK Message.
+
+        `cached_prefix` is stable prompt text (e.g. a research schema) sent
+        as a prompt-cached block ahead of the per-request `prompt`.
+        """
+        return self.client.messages.create(
+            **self.build_request(prompt, system_message, model, max_tokens, cached_prefix)
+        )
+
+    def stream_message(self, prompt: str, system_message: str, model: str = DEFAULT_MODEL,
+                       max_tokens: int = DEFAULT_MAX_TOKENS, cached_prefix: Optional[str] = None):
+        """Open a streaming request; use as a context manager and read .text_stream"""
+        return self.client.messages.stream(
+            **self.build_request(prompt, system_message, model, max_tokens, cached_prefix)
+        )
+
+    def submit_batch(self, requests: List[Dict]):
+        """Submit [{"custom_id": ..., "params": build_request(...)}] to the Message Batches API"""
+        return self.client.messages.batches.create(requests=requests)
+
+    def retrieve_batch(self, batch_id: str):
+        """Current state of a batch; processing_status becomes "ended" when all requests finish"""
+        return self.client.messages.batches.retrieve(batch_id)
+
+    def batch_results(self, batch_id: str):
+        """Iterate the results of an ended batch (each has .custom_id and .result)"""
+        return self.client.messages.batches.results(batch_id)
+
     def generate_research(self, prompt: str) -> str:
         """Generate biblical research using Claude"""
-        if not self.client:
-            return "Error: Claude client not initialized. Please check your API key."
-        
         try:
-            # Prepare the system message with theological guidelines
-            system_message = """
-            You are a biblical research assistant operating within a conservative, doctrinally sound theological framework consistent with the Southern Baptist Faith and Message. 
-
-            GUIDELINES:
-            - Provide scripturally based, theologically sound responses
-            - Use only well-established, vetted theological resources
-            - Avoid controversial topics like abortion, politics, or theologically divisive issues
-            - Focus on facilitating study rather than providing complete answers
-            - Include relevant cross-references and connections
-            - Cite sources when possible with suggestions for further study
-            - Ask thought-provoking questions to encourage deeper study
-            - Use the English Standard Version (ESV) as primary translation
-            - Maintain a tone that encourages personal Bible study and application
-
-            AVOID:
-            - Single pastor perspectives or influencer theology
-            - Divisive denominational issues
-            - Political commentary
-            - Speculative or non-biblical content
-            - Complete study conclusions (encourage personal discovery)
-            """
-            
-            response = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=2000,
-                system=system_message,
-                messages=[
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ]
-            )
-            
+            response = self.create_message(prompt, get_system_message())
             return response.content[0].text
-            
         except Exception as e:
             return f"Error generating research: {str(e)}"
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, int]:
+        with cls._pool_lock:
+            return {
+                "pooled_clients": len(cls._pool),
+                "clients_created": cls.clients_created,
+                "clients_closed": cls.clients_closed,
+                "requests": cls.requests_served,
+            }
+
+
+def get_claude_client(api_key: str, timeout: float = DEFAULT_TIMEOUT,
+                      max_retries: int = DEFAULT_MAX_RETRIES) -> ClaudeClient:
+    """Return a ClaudeClient backed by the shared pool for this API key"""
+    return ClaudeClient(api_key=api_key, timeout=timeout, max_retries=max_retries)
+
+
+def benchmark_client_reuse(requests: int = 20, connect_latency: float = 0.05,
+                           request_latency: float = 0.01) -> Dict[str, float]:
+    """Measure latency saved by reusing one pooled client versus one client per request.
+
+    Runs the real SDK over utils.fakes.stub_http_client, which charges
+    `connect_latency` once per new client (standing in for TCP + TLS setup)
+    and `request_latency` per request.
+    """
+    from utils.fakes import stub_http_client
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        per_request = anthropic.Anthropic(
+            api_key="stub-key",
+            http_client=stub_http_client(connect_latency, request_latency),
+        )
+        per_request.messages.create(model=DEFAULT_MODEL, max_tokens=10,
+                                    messages=[{"role": "user", "content": "ping"}])
+    fresh_s = time.perf_counter() - start
+
+    pooled = ClaudeClient(
+        api_key="stub-key",
+        http_client=stub_http_client(connect_latency, request_latency),
+    )
+    start = time.perf_counter()
+    for _ in range(requests):
+        pooled.create_message("ping", "", max_tokens=10)
+    pooled_s = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "per_request_client_ms": fresh_s / requests * 1000,
+        "pooled_client_ms": pooled_s / requests * 1000,
+        "saved_ms_per_request": (fresh_s - pooled_s) / requests * 1000,
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark_client_reuse())
@@ -0,0 +1,239 @@
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from utils.verse_occurrences import CHAPTER_STRIDE, VerseOccurrenceStore, get_verse_occurrences
+
+# Co-occurrence units: the same verse, verses within +/- n of each other in
+# one chapter, or the whole chapter (the nearest thing to a pericope the
+# verse keys carry without section data)
+SCOPES = ("verse", "window", "chapter")
+RANKINGS = ("pmi", "llr")
+DEFAULT_WINDOW = 2
+
+
+class Collocate(NamedTuple):
+    lemma: str
+    together: int       # query units that contain the lemma
+    frequency: int      # units containing the lemma anywhere
+    pmi: float
+    llr: float
+
+
+def _llr(k11: np.ndarray, k12: np.ndarray, k21: np.ndarray, k22: np.ndarray) -> np.ndarray:
+    """Dunning's log-likelihood ratio (G^2) for 2x2 contingency tables, vectorized"""
+    def entropy_term(*counts):
+        total = sum(counts)
+        out = np.zeros_like(total, dtype=np.float64)
+        for count in counts:
+            out += count * np.log(np.where(count > 0, count, 1))
+        return out - total * np.log(np.where(total > 0, total, 1))
+
+    row = entropy_term(k11 + k12, k21 + k22)
+    column = entropy_term(k11 + k21, k12 + k22)
+    matrix = entropy_term(k11, k12, k21, k22)
+    return np.maximum(0.0, 2.0 * (matrix - row - column))
+
+
+class CooccurrenceIndex:
+    """Binary lemma x verse incidence in both orientations, for collocation queries.
+
+    `lemma_ptr`/`lemma_units` list each lemma's distinct verse keys (CSR by
+    lemma) and `unit_keys`/`unit_lemmas` list every (verse, lemma) pair sorted
+    by verse (CSR by verse); `chapter_unit_*` hold the same for chapters.
+    A query gathers the verse slices covered by the query lemma's units and
+    counts lemma ids with np.bincount: the sparse product q . A^T in a
+    handful of vectorized calls, with no per-verse loop.
+    """
+
+    def __init__(self, store: VerseOccurrenceStore):
+        self.lemmas = store.lemmas.tolist()
+        self._lemma_ids = {lemma: i for i, lemma in enumerate(self.lemmas)}
+        lemma_of_key = np.repeat(np.arange(len(self.lemmas), dtype=np.int32), np.diff(store.lemma_ptr))
+
+        # Drop repeats of a lemma within one verse; incidence is binary
+        keep = np.ones(len(store.keys), dtype=bool)
+        keep[1:] = (store.keys[1:] != store.keys[:-1]) | (lemma_of_key[1:] != lemma_of_key[:-1])
+        keys, lemma_ids = store.keys[keep], lemma_of_key[keep]
+        self.lemma_units = keys
+        self.lemma_ptr = np.zeros(len(self.lemmas) + 1, dtype=np.int64)
+        self.lemma_ptr[1:] = np.cumsum(np.bincount(lemma_ids, minlength=len(self.lemmas)))
+
+        order = np.argsort(keys, kind="stable")
+        self.unit_keys = keys[order]
+        self.unit_lemmas = lemma_ids[order]
+        self.verse_frequency = np.diff(self.lemma_ptr)
+        self._lemma_of_unit = np.repeat(np.arange(len(self.lemmas), dtype=np.int32), self.verse_frequency)
+        self._continues_lemma = np.zeros(len(keys), dtype=bool)
+        self._continues_lemma[1:] = self._lemma_of_unit[1:] == self._lemma_of_unit[:-1]
+        self.verse_count = int(len(np.unique(self.unit_keys)))
+        self._window_coverage: Dict[int, np.ndarray] = {}
+
+        # Same incidence at chapter granularity
+        chapter_keys = self.unit_keys // CHAPTER_STRIDE
+        pairs = np.unique(chapter_keys * len(self.lemmas) + self.unit_lemmas)
+        self.chapter_unit_keys = pairs // len(self.lemmas)
+        self.chapter_unit_lemmas = (pairs % len(self.lemmas)).astype(np.int32)
+        self.chapter_frequency = np.bincount(self.chapter_unit_lemmas, minlength=len(self.lemmas))
+        self.chapter_count = int(len(np.unique(self.chapter_unit_keys)))
+
+    def __contains__(self, lemma: str) -> bool:
+        return lemma in self._lemma_ids
+
+    def _query_ranges(self, lemma_id: int, scope: str, window: int):
+        """[low, high) key ranges, one per query unit: verse keys, or chapter keys (verse key // 1000)"""
+        units = self.lemma_units[self.lemma_ptr[lemma_id]:self.lemma_ptr[lemma_id + 1]]
+        if scope == "verse":
+            return units, units + 1
+        if scope == "window":
+            # Verse numbers start at 1, so key - window never reaches the previous chapter's verses
+            return units - window, units + window + 1
+        chapters = np.unique(units // CHAPTER_STRIDE)
+        return chapters, chapters + 1
+
+    def counts(self, lemma: str, scope: str = "verse", window: int = DEFAULT_WINDOW) -> np.ndarray:
+        """For every lemma, the number of the query lemma's units (verses, windows or chapters) it occurs in"""
+        lemma_id = self._lemma_ids[lemma]
+        low, high = self._query_ranges(lemma_id, scope, window)
+        unit_keys, unit_lemmas = ((self.chapter_unit_keys, self.chapter_unit_lemmas) if scope == "chapter"
+                                  else (self.unit_keys, self.unit_lemmas))
+        starts = np.searchsorted(unit_keys, low)
+        lengths = np.searchsorted(unit_keys, high) - starts
+        if scope == "window" and lengths.sum() > len(unit_keys) // 8:
+            return self._window_counts_by_interval(low + window, window)
+        # Flat gather of every (query unit, co-occurring lemma) pair
+        unit_of_entry = np.repeat(np.arange(len(starts)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        found = unit_lemmas[np.repeat(starts, lengths) + offsets]
+        if scope == "window":
+            # Overlapping windows share verses; a lemma counts once per window
+            found = np.unique(unit_of_entry.astype(np.int64) * len(self.lemmas) + found) % len(self.lemmas)
+        return np.bincount(found, minlength=len(self.lemmas))
+
+    def _window_counts_by_interval(self, query_units: np.ndarray, window: int) -> np.ndarray:
+        """Window counts for frequent query lemmas, whose gathered pairs would be too many to deduplicate.
+
+        A lemma's count is the number of query verses inside its merged
+        window intervals.
+        """
+        starts, ends = self._merged_windows(window)
+        hits = np.searchsorted(query_units, ends) - np.searchsorted(query_units, starts)
+        return np.bincount(self._lemma_of_unit, weights=hits, minlength=len(self.lemmas)).astype(np.int64)
+
+    def _merged_windows(self, window: int):
+        """Each lemma's verses as intervals [u - n, u + n], trimmed so a lemma's intervals don't overlap"""
+        ends = self.lemma_units + window + 1
+        starts = self.lemma_units - window
+        previous_ends = np.empty_like(ends)
+        previous_ends[0], previous_ends[1:] = ends[0], ends[:-1]
+        # Intervals all have the same width, so trimming each to the previous end merges them
+        starts = np.where(self._continues_lemma, np.minimum(np.maximum(starts, previous_ends), ends), starts)
+        return starts, ends
+
+    def window_coverage(self, window: int = DEFAULT_WINDOW) -> np.ndarray:
+        """For every lemma, the number of verse keys within +/- window of one of its verses"""
+        coverage = self._window_coverage.get(window)
+        if coverage is None:
+            starts, ends = self._merged_windows(window)
+            coverage = np.bincount(self._lemma_of_unit, weights=ends - starts,
+                                   minlength=len(self.lemmas)).astype(np.int64)
+            self._window_coverage[window] = coverage
+        return coverage
+
+    def collocates(self, lemma: str, scope: str = "verse", window: int = DEFAULT_WINDOW,
+                   rank_by: str = "llr", limit: int = 20, min_together: int = 2) -> List[Collocate]:
+        """Lemmas that occur with `lemma` in the same scope, ranked by PMI or log-likelihood"""
+        if scope not in SCOPES:
+            raise ValueError(f"scope must be one of {SCOPES}")
+        if rank_by not in RANKINGS:
+            raise ValueError(f"rank_by must be one of {RANKINGS}")
+        together = self.counts(lemma, scope, window).astype(np.float64)
+        lemma_id = self._lemma_ids[lemma]
+        together[lemma_id] = 0
+
+        if scope == "chapter":
+            total, frequency = self.chapter_count, self.chapter_frequency
+        else:
+            total, frequency = self.verse_count, self.verse_frequency
+        query_units = int(frequency[lemma_id])
+        # In window scope a lemma is "present" at every verse within +/- n of one of its
+        # verses; clustered lemmas cover far fewer than frequency * (2n + 1)
+        covered = self.window_coverage(window) if scope == "window" else frequency
+        expected_units = np.minimum(total, covered).astype(np.float64)
+
+        k11 = together
+        k12 = np.maximum(0.0, query_units - k11)
+        k21 = np.maximum(0.0, expected_units - k11)
+        k22 = np.maximum(0.0, total - k11 - k12 - k21)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pmi = np.log2(k11 * total / (query_units * expected_units))
+        llr = _llr(k11, k12, k21, k22)
+        # Only positive association; LLR is symmetric and would also rank avoidance
+        llr[k11 * total < query_units * expected_units] = 0.0
+
+        candidates = np.flatnonzero(together >= min_together)
+        score = pmi if rank_by == "pmi" else llr
+        order = candidates[np.argsort(-score[candidates], kind="stable")][:limit]
+        return [Collocate(self.lemmas[i], int(together[i]), int(frequency[i]),
+                          float(pmi[i]), float(llr[i])) for i in order]
+
+
+_index: Optional[CooccurrenceIndex] = None
+_index_store: Optional[VerseOccurrenceStore] = None
+_index_lock = threading.Lock()
+
+
+def get_cooccurrence_index() -> Optional[CooccurrenceIndex]:
+    """Return the process-wide index over the verse occurrence store; None if that is not installed"""
+    global _index, _index_store
+    store = get_verse_occurrences()
+    if store is None:
+        return None
+    if _index_store is store:
+        return _index
+    with _index_lock:
+        if _index_store is not store:
+            _index, _index_store = CooccurrenceIndex(store), store
+        return _index
+
+
+def _synthetic_store(occurrences: int, lemmas: int, seed: int = 11) -> VerseOccurrenceStore:
+    """Zipf-distributed lemmas over about 31k verses (66 books x 30 chapters x 16 verses)"""
+    rng = np.random.default_rng(seed)
+    lemma_ids = np.minimum(rng.zipf(1.3, size=occurrences), lemmas) - 1
+    books = rng.integers(0, 66, size=occurrences)
+    chapters = rng.integers(1, 31, size=occurrences)
+    verses = rng.integers(1, 17, size=occurrences)
+    return VerseOccurrenceStore.build(zip((f"lemma{i}" for i in lemma_ids), books.tolist(),
+                                          chapters.tolist(), verses.tolist()))
+
+
+def benchmark_collocations(occurrences: int = 450_000, lemmas: int = 14_000, queries: int = 50) -> Dict[str, float]:
+    """Query latency (ms) at full-Bible scale: ~14k Greek + Hebrew lemmas, ~450k occurrences.
+
+    Queries use the most frequent lemmas, whose unit lists are longest and
+    so the slowest to expand.
+    """
+    store = _synthetic_store(occurrences, lemmas)
+    start = time.perf_counter()
+    index = CooccurrenceIndex(store)
+    results: Dict[str, float] = {"lemmas": len(index.lemmas), "verses": index.verse_count,
+                                 "build_ms": (time.perf_counter() - start) * 1000}
+    frequent = [index.lemmas[i] for i in np.argsort(-index.verse_frequency)[:queries]]
+    for scope in SCOPES:
+        samples = []
+        for lemma in frequent:
+            start = time.perf_counter()
+            index.collocates(lemma, scope=scope)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        results[f"{scope}_p50_ms"] = samples[len(samples) // 2]
+        results[f"{scope}_max_ms"] = samples[-1]
+    return results
+
+
+if __name__ == "__main__":
+    for key, value in benchmark_collocations().items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
@@ -0,0 +1,362 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from utils.bible_books import BIBLE_BOOKS, BOOK_ORDINALS, normalize_book_name
+from utils.lexicon_store import DATA_DIR
+from utils.references import parse_reference
+from utils.response_cache import CACHE_DIR
+from utils.verse_occurrences import BOOK_STRIDE, CHAPTER_STRIDE, _key_range, split_verse_key, verse_key
+
+# Cross-references in the openbible.info format (the Treasury of Scripture
+# Knowledge plus user votes), one link per line:
+#   from<TAB>to<TAB>votes
+# e.g. "Gen.1.1<TAB>John.1.1-John.1.3<TAB>378". "John 3:16"-style references
+# work too; the target may be a verse range and votes may be omitted (1).
+# The header line, blank lines and '#' comments are ignored.
+CROSS_REFERENCES_PATH = os.path.join(DATA_DIR, "cross_references.txt")
+STORE_FORMAT_VERSION = 1
+STORE_DIR = os.path.join(CACHE_DIR, "cross_references")
+
+MAX_HOPS = 3
+# Frontier kept per hop, by walk score, so a 3-hop query stays bounded
+DEFAULT_BEAM = 200
+
+_OSIS_VERSE = re.compile(r"([1-3]?[A-Za-z]+)\.(\d{1,3})\.(\d{1,3})")
+
+
+class LinkedVerse(NamedTuple):
+    reference: str  # "Psalms 104:30-31" when the link points at a range
+    key: int
+    hop: int
+    score: float    # chance a vote-weighted walk from the seed arrives here at this hop
+    votes: int      # strongest link into the verse at this hop
+
+
+class SharedReferences(NamedTuple):
+    reference: str
+    key: int
+    shared: int     # verses this one and the seed both refer to
+    votes: int
+
+
+class ConnectedVerse(NamedTuple):
+    reference: str
+    key: int
+    links: int      # outgoing + incoming
+    votes: int
+
+
+def _parse_verse(text: str) -> Optional[int]:
+    match = _OSIS_VERSE.fullmatch(text.strip())
+    if match:
+        book = normalize_book_name(match.group(1))
+        chapter, verse = int(match.group(2)), int(match.group(3))
+    else:
+        reference = parse_reference(text)
+        if reference is None or reference.start_verse is None:
+            return None
+        book, chapter, verse = reference.book, reference.start_chapter, reference.start_verse
+    if book is None or not (0 < chapter < BOOK_STRIDE // CHAPTER_STRIDE and 0 < verse < CHAPTER_STRIDE):
+        return None
+    return verse_key(BOOK_ORDINALS[book], chapter, verse)
+
+
+def _parse_target(text: str) -> Optional[Tuple[int, int]]:
+    """(first, last) verse keys of a verse or verse range"""
+    if "-" in text and _OSIS_VERSE.match(text.strip()):
+        first, last = (_parse_verse(part) for part in text.split("-", 1))
+        return (first, last) if first is not None and last is not None and last >= first else None
+    first = _parse_verse(text)
+    if first is not None:
+        return first, first
+    reference = parse_reference(text)
+    if reference is None or reference.start_verse is None:
+        return None
+    ordinal = BOOK_ORDINALS[reference.book]
+    return (verse_key(ordinal, reference.start_chapter, reference.start_verse),
+            verse_key(ordinal, reference.end_chapter, reference.end_verse))
+
+
+def format_key(key: int, end_key: Optional[int] = None) -> str:
+    """"Book chapter:verse" for a verse key, or a range ending at end_key"""
+    book, chapter, verse = split_verse_key(key)
+    text = f"{book} {chapter}:{verse}"
+    if end_key is None or int(end_key) == int(key):
+        return text
+    _, end_chapter, end_verse = split_verse_key(end_key)
+    return f"{text}-{end_verse}" if end_chapter == chapter else f"{text}-{end_chapter}:{end_verse}"
+
+
+def _gather(ptr: np.ndarray, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(edge indices, position in `nodes` of each edge's node) for the nodes' CSR slices"""
+    starts, ends = ptr[nodes], ptr[nodes + 1]
+    counts = ends - starts
+    total = int(counts.sum())
+    owners = np.repeat(np.arange(len(nodes)), counts)
+    edges = np.arange(total, dtype=np.int64) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return edges, owners
+
+
+class CrossReferenceGraph:
+    """Directed cross-reference graph over verses, stored as CSR adjacency arrays.
+
+    Nodes are the verses that take part in any link, numbered in canonical
+    order (`keys` holds their verse keys). Outgoing links are sorted by
+    votes within each verse; an incoming copy answers "who else refers
+    here" for shared-reference clusters. Every query is a few vectorized
+    gathers over these arrays.
+    """
+
+    ARRAYS = ("keys", "out_ptr", "out_targets", "out_ends", "out_votes", "in_ptr", "in_sources", "in_votes")
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        for name in self.ARRAYS:
+            arrays[name].setflags(write=False)
+            setattr(self, name, arrays[name])
+        out_owner = np.repeat(np.arange(self.node_count), np.diff(self.out_ptr))
+        in_owner = np.repeat(np.arange(self.node_count), np.diff(self.in_ptr))
+        self.links = np.diff(self.out_ptr) + np.diff(self.in_ptr)
+        self.link_votes = (np.bincount(out_owner, np.maximum(self.out_votes, 0), minlength=self.node_count)
+                           + np.bincount(in_owner, np.maximum(self.in_votes, 0), minlength=self.node_count)
+                           ).astype(np.int64)
+
+    @classmethod
+    def build(cls, links: Iterable[Tuple[int, int, int, int]]) -> "CrossReferenceGraph":
+        """Build from (source key, target key, target end key, votes); repeated links add their votes"""
+        rows = np.array(list(links), dtype=np.int64).reshape(-1, 4)
+        keys = np.unique(np.concatenate([rows[:, 0], rows[:, 1]]))
+        sources = np.searchsorted(keys, rows[:, 0])
+        targets = np.searchsorted(keys, rows[:, 1])
+
+        pairs, inverse = np.unique(sources * len(keys) + targets, return_inverse=True)
+        sources, targets = pairs // max(len(keys), 1), pairs % max(len(keys), 1)
+        votes = np.bincount(inverse, rows[:, 3], minlength=len(pairs)).astype(np.int32)
+        ends = np.zeros(len(pairs), dtype=np.int64)
+        np.maximum.at(ends, inverse, rows[:, 2])
+
+        out_order = np.lexsort((-votes, sources))
+        in_order = np.lexsort((-votes, targets))
+        return cls({
+            "keys": keys,
+            "out_ptr": np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=len(keys)))]),
+            "out_targets": targets[out_order].astype(np.int32),
+            "out_ends": ends[out_order],
+            "out_votes": votes[out_order],
+            "in_ptr": np.concatenate([[0], np.cumsum(np.bincount(targets, minlength=len(keys)))]),
+            "in_sources": sources[in_order].astype(np.int32),
+            "in_votes": votes[in_order],
+        })
+
+    @classmethod
+    def from_file(cls, path: str) -> "CrossReferenceGraph":
+        return cls.build(iter_cross_reference_file(path))
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CrossReferenceGraph":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in cls.ARRAYS})
+
+    @property
+    def node_count(self) -> int:
+        return len(self.keys)
+
+    @property
+    def link_count(self) -> int:
+        return len(self.out_targets)
+
+    def nodes(self, reference) -> np.ndarray:
+        """Node ids of the verses a reference (string or Reference) covers that have links"""
+        if isinstance(reference, str):
+            reference = parse_reference(reference)
+            if reference is None:
+                return np.zeros(0, dtype=np.int64)
+        ordinal = BOOK_ORDINALS[reference.book]
+        low = verse_key(ordinal, reference.start_chapter, reference.start_verse or 0)
+        if reference.end_verse is None:
+            high = verse_key(ordinal, reference.end_chapter + 1, 0)
+        else:
+            high = verse_key(ordinal, reference.end_chapter, reference.end_verse + 1)
+        return np.arange(np.searchsorted(self.keys, low), np.searchsorted(self.keys, high))
+
+    def neighbourhood(self, reference, hops: int = 1, min_votes: int = 0, limit: int = 20,
+                      beam: int = DEFAULT_BEAM) -> List[LinkedVerse]:
+        """Verses 1..hops links away from a verse or passage, best first within each hop.
+
+        Each hop spreads a random walk along outgoing links in proportion to
+        their votes, so verses reached by several strong paths rank first.
+        At most `limit` verses are returned per hop.
+        """
+        seeds = self.nodes(reference)
+        visited = np.zeros(self.node_count, dtype=bool)
+        visited[seeds] = True
+        frontier, scores = seeds, np.full(len(seeds), 1.0 / max(len(seeds), 1))
+        results = []
+        for hop in range(1, min(hops, MAX_HOPS) + 1):
+            edges, owners = _gather(self.out_ptr, frontier)
+            keep = self.out_votes[edges] >= min_votes
+            edges, owners = edges[keep], owners[keep]
+            targets = self.out_targets[edges]
+            fresh = ~visited[targets]
+            if not fresh.any():
+                break
+            weights = np.maximum(self.out_votes[edges], 1).astype(np.float64)
+            totals = np.bincount(owners, weights, minlength=len(frontier))
+            walked = scores[owners] * weights / totals[owners]
+
+            reached, inverse = np.unique(targets[fresh], return_inverse=True)
+            reached_scores = np.bincount(inverse, walked[fresh], minlength=len(reached))
+            # Votes can be negative (openbible down-votes), so the max starts below any of them
+            reached_votes = np.full(len(reached), np.iinfo(np.int64).min, dtype=np.int64)
+            np.maximum.at(reached_votes, inverse, self.out_votes[edges[fresh]])
+            reached_ends = np.zeros(len(reached), dtype=np.int64)
+            np.maximum.at(reached_ends, inverse, self.out_ends[edges[fresh]])
+            visited[reached] = True
+
+            order = np.argsort(-reached_scores, kind="stable")
+            results.extend(
+                LinkedVerse(format_key(self.keys[i], reached_ends[j]), int(self.keys[i]), hop,
+                            float(reached_scores[j]), int(reached_votes[j]))
+                for i, j in zip(reached[order[:limit]], order[:limit])
+            )
+            frontier, scores = reached[order[:beam]], reached_scores[order[:beam]]
+        return results
+
+    def shared_references(self, reference, min_shared: int = 2, min_votes: int = 0,
+                          limit: int = 15) -> List[SharedReferences]:
+        """Verses that refer to several of the same verses as the seed (its reference cluster)"""
+        seeds = self.nodes(reference)
+        edges, _ = _gather(self.out_ptr, seeds)
+        cited = np.unique(self.out_targets[edges[self.out_votes[edges] >= min_votes]])
+        edges, _ = _gather(self.in_ptr, cited)
+        edges = edges[self.in_votes[edges] >= min_votes]
+        sources = self.in_sources[edges]
+        shared = np.bincount(sources, minlength=self.node_count)
+        votes = np.bincount(sources, np.maximum(self.in_votes[edges], 0), minlength=self.node_count)
+        shared[seeds] = 0
+        candidates = np.flatnonzero(shared >= min_shared)
+        order = np.lexsort((-votes[candidates], -shared[candidates]))[:limit]
+        return [SharedReferences(format_key(self.keys[i]), int(self.keys[i]), int(shared[i]), int(votes[i]))
+                for i in candidates[order]]
+
+    def most_connected(self, book: str, chapter: Optional[int] = None, limit: int = 10) -> List[ConnectedVerse]:
+        """The verses of a book or chapter with the most links, ties broken by votes"""
+        low, high = _key_range(book, chapter)
+        nodes = np.arange(np.searchsorted(self.keys, low), np.searchsorted(self.keys, high))
+        order = np.lexsort((-self.link_votes[nodes], -self.links[nodes]))[:limit]
+        return [ConnectedVerse(format_key(self.keys[i]), int(self.keys[i]), int(self.links[i]),
+                               int(self.link_votes[i]))
+                for i in nodes[order]]
+
+
+def iter_cross_reference_file(path: str):
+    """Yield (source key, target key, target end key, votes) from a cross-reference file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#") or line.startswith("From Verse"):
+                continue
+            parts = line.split("\t")
+            if len(parts) < 2:
+                raise ValueError(f"{path}:{line_number}: expected from, to and votes columns")
+            source, target = _parse_verse(parts[0]), _parse_target(parts[1])
+            if source is None or target is None:
+                raise ValueError(f"{path}:{line_number}: unrecognized verse reference")
+            votes = int(parts[2]) if len(parts) > 2 and parts[2].strip() else 1
+            yield source, target[0], target[1], votes
+
+
+def _store_path(source: str) -> str:
+    stat = os.stat(source)
+    return os.path.join(STORE_DIR, f"v{STORE_FORMAT_VERSION}-{stat.st_mtime_ns}-{stat.st_size}.npz")
+
+
+_graph: Optional[CrossReferenceGraph] = None
+_graph_path_loaded: Optional[str] = None
+_graph_lock = threading.Lock()
+
+
+def get_cross_references(source: str = CROSS_REFERENCES_PATH) -> Optional[CrossReferenceGraph]:
+    """Return the process-wide graph, compiling data/cross_references.txt if needed; None if not installed"""
+    global _graph, _graph_path_loaded
+    if not os.path.exists(source):
+        return None
+    path = _store_path(source)
+    if _graph_path_loaded == path:
+        return _graph
+    with _graph_lock:
+        if _graph_path_loaded != path:
+            if os.path.exists(path):
+                graph = CrossReferenceGraph.load(path)
+            else:
+                graph = CrossReferenceGraph.from_file(source)
+                graph.save(path)
+            _graph, _graph_path_loaded = graph, path
+        return _graph
+
+
+def _synthetic_links(verses: int = 31_102, links: int = 340_000, seed: int = 11):
+    """Links over a Bible-sized verse set: most stay near their source, votes are heavy-tailed"""
+    rng = np.random.default_rng(seed)
+    per_book = -(-verses // len(BIBLE_BOOKS))
+    ordinals = np.arange(verses)
+    keys = (ordinals // per_book) * BOOK_STRIDE + (ordinals % per_book // 30 + 1) * CHAPTER_STRIDE \
+        + ordinals % per_book % 30 + 1
+    # Popular verses are cited far more often than the rest
+    popularity = rng.lognormal(0.0, 1.2, size=verses)
+    sources = rng.choice(verses, size=links, p=popularity / popularity.sum())
+    local = rng.random(links) < 0.4
+    targets = np.where(local, np.clip(sources + rng.integers(-200, 200, size=links), 0, verses - 1),
+                       rng.choice(verses, size=links, p=popularity / popularity.sum()))
+    # A fifth of the links point at a short range of verses
+    ends = keys[targets] + np.where(rng.random(links) < 0.2, rng.integers(1, 4, size=links), 0)
+    votes = rng.zipf(1.8, size=links) - rng.integers(0, 3, size=links)
+    keep = sources != targets
+    return zip(keys[sources][keep].tolist(), keys[targets][keep].tolist(), ends[keep].tolist(),
+               votes[keep].tolist())
+
+
+def benchmark_traversal(links: int = 340_000, queries: int = 500) -> Dict[str, float]:
+    """Latency of 1-3 hop neighbourhoods, shared-reference clusters and chapter rankings (ms)"""
+    start = time.perf_counter()
+    graph = CrossReferenceGraph.build(_synthetic_links(links=links))
+    report = {"links": graph.link_count, "verses": graph.node_count,
+              "build_s": time.perf_counter() - start,
+              "memory_mb": sum(getattr(graph, name).nbytes for name in graph.ARRAYS) / 1e6}
+
+    rng = np.random.default_rng(3)
+    seeds = [format_key(key) for key in graph.keys[rng.integers(0, graph.node_count, size=queries)]]
+    chapters = [seed.split(":")[0] for seed in seeds]
+    books = [split_verse_key(key)[:2] for key in graph.keys[rng.integers(0, graph.node_count, size=queries)]]
+
+    def timed(name, fn, arguments):
+        samples = []
+        for argument in arguments:
+            start = time.perf_counter()
+            fn(argument)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        report[f"{name}_p50_ms"] = samples[len(samples) // 2]
+        report[f"{name}_p95_ms"] = samples[int(len(samples) * 0.95) - 1]
+
+    for hops in range(1, MAX_HOPS + 1):
+        timed(f"verse_{hops}hop", lambda seed: graph.neighbourhood(seed, hops=hops), seeds)
+    timed("chapter_2hop", lambda seed: graph.neighbourhood(seed, hops=2), chapters)
+    timed("shared", graph.shared_references, seeds)
+    timed("most_connected", lambda location: graph.most_connected(*location), books)
+    return report
+
+
+if __name__ == "__main__":
+    for name, value in benchmark_traversal().items():
+        print(f"{name:>22}: {value:.3f}" if isinstance(value, float) else f"{name:>22}: {value}")
@@ -0,0 +1,220 @@
+# Stand-ins for external services so the pipelines can run offline.
+
+import threading
+import time
+from types import SimpleNamespace
+from typing import Iterator
+
+
+def _fake_message(text: str, input_tokens: int, output_tokens: int):
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="text", text=text)],
+        usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens),
+        stop_reason="end_turn",
+    )
+
+
+class FakeAPIError(Exception):
+    """Raised by FakeAnthropicClient for injected failures; mirrors anthropic.APIStatusError's fields"""
+
+    def __init__(self, status_code: int, retry_after: float = None):
+        super().__init__(f"Fake API error {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class _FakeStream:
+    def __init__(self, client, kwargs):
+        self._client = client
+        self._kwargs = kwargs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self) -> Iterator[str]:
+        client = self._client
+        time.sleep(client.first_token_delay)
+        text = client.text_for(self._kwargs)
+        for i in range(0, len(text), client.chunk_size):
+            if i:
+                time.sleep(client.chunk_delay)
+            yield text[i:i + client.chunk_size]
+
+    def get_final_message(self):
+        return self._client._message(self._kwargs)
+
+
+class _FakeBatches:
+    """Message Batches endpoint: a batch ends after `batch_polls` retrieve calls"""
+
+    def __init__(self, client):
+        self._client = client
+        self._batches = {}
+
+    def create(self, requests):
+        client = self._client
+        client.batch_submissions.append(requests)
+        batch_id = f"msgbatch_fake_{len(client.batch_submissions)}"
+        results = []
+        for request in requests:
+            try:
+                client._maybe_fail()
+                result = SimpleNamespace(type="succeeded", message=client._message(request["params"]))
+            except FakeAPIError as e:
+                result = SimpleNamespace(type="errored", error=SimpleNamespace(type="api_error", message=str(e)))
+            results.append(SimpleNamespace(custom_id=request["custom_id"], result=result))
+        self._batches[batch_id] = {"polls": 0, "results": results}
+        return self.retrieve(batch_id, count_poll=False)
+
+    def retrieve(self, batch_id, count_poll=True):
+        batch = self._batches[batch_id]
+        if count_poll:
+            batch["polls"] += 1
+        ended = batch["polls"] >= self._client.batch_polls
+        succeeded = sum(entry.result.type == "succeeded" for entry in batch["results"])
+        return SimpleNamespace(
+            id=batch_id,
+            processing_status="ended" if ended else "in_progress",
+            request_counts=SimpleNamespace(
+                processing=0 if ended else len(batch["results"]),
+                succeeded=succeeded if ended else 0,
+                errored=len(batch["results"]) - succeeded if ended else 0,
+                canceled=0,
+                expired=0,
+            ),
+        )
+
+    def results(self, batch_id):
+        batch = self._batches[batch_id]
+        if batch["polls"] < self._client.batch_polls:
+            raise FakeAPIError(409)
+        # Like the real API, results are not guaranteed to come back in submission order
+        return iter(reversed(batch["results"]))
+
+
+class _FakeMessages:
+    def __init__(self, client):
+        self._client = client
+        self.batches = _FakeBatches(client)
+
+    def create(self, **kwargs):
+        self._client.calls.append(kwargs)
+        self._client._maybe_fail()
+        time.sleep(self._client.first_token_delay)
+        return self._client._message(kwargs)
+
+    def stream(self, **kwargs):
+        self._client.calls.append(kwargs)
+        self._client._maybe_fail()
+        return _FakeStream(self._client, kwargs)
+
+
+class FakeAnthropicClient:
+    """Mimics the parts of anthropic.Anthropic the app uses (messages.create / messages.stream).
+
+    Returns response_text after first_token_delay seconds; streams it in
+    chunk_size pieces separated by chunk_delay seconds. The first
+    `fail_first` calls raise FakeAPIError(failure_status), e.g. 429 to
+    exercise rate-limit retries. `response_text` may also be a callable
+    taking the request kwargs. messages.batches serves the Message Batches
+    API locally; each batch reports "ended" on its `batch_polls`-th retrieve.
+    """
+
+    def __init__(self, response_text, first_token_delay: float = 0.0, chunk_delay: float = 0.0,
+                 chunk_size: int = 16, input_tokens: int = 1000, output_tokens: int = 500,
+                 fail_first: int = 0, failure_status: int = 429, retry_after: float = None,
+                 batch_polls: int = 2):
+        self.response_text = response_text
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.fail_first = fail_first
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.failures = 0
+        self.batch_polls = batch_polls
+        self.batch_submissions = []
+        self.calls = []
+        self.messages = _FakeMessages(self)
+        self._lock = threading.Lock()
+
+    def _maybe_fail(self):
+        with self._lock:
+            if self.failures >= self.fail_first:
+                return
+            self.failures += 1
+        raise FakeAPIError(self.failure_status, self.retry_after)
+
+    def text_for(self, kwargs) -> str:
+        return self.response_text(kwargs) if callable(self.response_text) else self.response_text
+
+    def _message(self, kwargs=None):
+        return _fake_message(self.text_for(kwargs or {}), self.input_tokens, self.output_tokens)
+
+
+def _stub_message_json(text: str) -> dict:
+    return {
+        "id": "msg_stub",
+        "type": "message",
+        "role": "assistant",
+        "model": "stub",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 10},
+    }
+
+
+def stub_http_client(connect_latency: float = 0.05, request_latency: float = 0.01,
+                     response_text: str = "ok"):
+    """httpx.Client that answers /v1/messages locally with simulated network costs.
+
+    The first request through the client pays `connect_latency` (a stand-in
+    for TCP + TLS setup of a fresh connection pool); every request pays
+    `request_latency`. Pass it as anthropic.Anthropic(http_client=...).
+    """
+    import httpx
+
+    state = {"connected": False}
+
+    def handler(request):
+        if not state["connected"]:
+            time.sleep(connect_latency)
+            state["connected"] = True
+        time.sleep(request_latency)
+        return httpx.Response(200, json=_stub_message_json(response_text))
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+class FakeSearchBackend:
+    """Verse search backend with injected latency, for timing cross-reference fan-out.
+
+    `slow_keywords` get `slow_latency` instead of `latency`, to exercise timeouts.
+    """
+
+    def __init__(self, latency: float = 0.2, slow_keywords=(), slow_latency: float = 5.0):
+        self.latency = latency
+        self.slow_keywords = set(slow_keywords)
+        self.slow_latency = slow_latency
+        self.calls = 0
+
+    def search(self, query: str, limit: int = 10) -> list:
+        self.calls += 1
+        time.sleep(self.slow_latency if query in self.slow_keywords else self.latency)
+        return [
+            {
+                'book_name': 'John',
+                'chapter': '3',
+                'verse': str(16 + i),
+                'text': f'Sample verse {i} mentioning {query}.'
+            }
+            for i in range(min(limit, 3))
+        ]
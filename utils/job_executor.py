@@ -0,0 +1,158 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.metrics import percentile
+
+DEFAULT_WORKERS = 4
+# Jobs kept for sessions to collect; the oldest collected ones are dropped first
+DEFAULT_RETAINED_JOBS = 256
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    """One background call. The worker updates it; sessions read it when they rerun."""
+
+    def __init__(self, job_id: str, label: str):
+        self.id = job_id
+        self.label = label
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        # Set once the submitting session has shown the result; only then is eviction routine
+        self.collected = False
+        self._chunks: List[str] = []
+        self._lock = threading.Lock()
+
+    def append_text(self, chunk: str):
+        """Progress hook for streaming calls; pass as their on_text callback"""
+        with self._lock:
+            self._chunks.append(chunk)
+
+    def partial_text(self) -> str:
+        with self._lock:
+            return "".join(self._chunks)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    @property
+    def wait_s(self) -> float:
+        """Time spent queued behind other jobs"""
+        return (self.started_at or time.time()) - self.submitted_at
+
+    @property
+    def elapsed_s(self) -> float:
+        """Time since the job started running (its run time once finished)"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobExecutor:
+    """Process-wide thread pool for calls that should not hold the Streamlit script thread.
+
+    `submit` returns a job id at once; the caller keeps it in session state
+    and polls `get` on later reruns. A rerun or a different tab does not
+    cancel the work, and jobs from one or many sessions run in parallel up
+    to `max_workers`.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, retained_jobs: int = DEFAULT_RETAINED_JOBS):
+        self.max_workers = max_workers
+        self.retained_jobs = retained_jobs
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="research-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self._run_times: List[float] = []
+        self._wait_times: List[float] = []
+
+    def submit(self, fn: Callable[[Job], Any], label: str = "") -> str:
+        """Run fn(job) on a worker thread; its return value becomes job.result"""
+        with self._lock:
+            job = Job(f"job-{next(self._ids)}", label)
+            self._jobs[job.id] = job
+            self._evict()
+        self._pool.submit(self._run, job, fn)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]):
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            job.result = fn(job)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if job.status == DONE:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._run_times.append(job.elapsed_s)
+                self._wait_times.append(job.wait_s)
+                # Latency percentiles over the most recent jobs
+                del self._run_times[:-self.retained_jobs], self._wait_times[:-self.retained_jobs]
+
+    def _evict(self):
+        # Collected jobs go first; an uncollected result is only dropped when every
+        # retained slot holds one (e.g. from tabs closed before their jobs finished)
+        collected = [job_id for job_id, job in self._jobs.items() if job.finished and job.collected]
+        uncollected = [job_id for job_id, job in self._jobs.items() if job.finished and not job.collected]
+        for job_id in (collected + uncollected)[:max(0, len(self._jobs) - self.retained_jobs)]:
+            del self._jobs[job_id]
+
+    def mark_collected(self, job_id: str):
+        """Record that a finished job's session has shown its result"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.collected = True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            run_times = sorted(self._run_times)
+            wait_times = sorted(self._wait_times)
+        return {
+            "workers": self.max_workers,
+            "queued": statuses.count(QUEUED),
+            "running": statuses.count(RUNNING),
+            "completed": self.completed,
+            "failed": self.failed,
+            "run_p50_s": percentile(run_times, 0.5),
+            "run_p95_s": percentile(run_times, 0.95),
+            "wait_p95_s": percentile(wait_times, 0.95),
+        }
+
+
+_job_executor: Optional[JobExecutor] = None
+_job_executor_lock = threading.Lock()
+
+
+def get_job_executor() -> JobExecutor:
+    """Return the process-wide JobExecutor"""
+    global _job_executor
+    if _job_executor is None:
+        with _job_executor_lock:
+            if _job_executor is None:
+                _job_executor = JobExecutor()
+    return _job_executor
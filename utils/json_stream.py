@@ -0,0 +1,204 @@
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Characters that can change parser state outside / inside a JSON string
+_STRUCTURAL = re.compile(r'["{}\[\],]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class IncrementalJSONParser:
+    """Incrementally parse model output and emit completed top-level JSON fields.
+
+    Text before the first '{' and after the matching '}' is ignored, so
+    leading or trailing prose from the model is tolerated. Each time a
+    top-level value finishes (a ',' or the closing '}' at depth 1), the field
+    is decoded and returned from feed() as a (key, value) event, so callers
+    can render sections while the rest of the response is still streaming.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: List[Tuple[str, Any]] = []
+        self.started = False
+        self.done = False
+        self.errors = 0
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._field_start = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk of text; return the fields completed by it"""
+        self.buffer += chunk
+        completed = []
+        buffer = self.buffer
+        pos = self._pos
+
+        if not self.started:
+            brace = buffer.find('{', pos)
+            if brace == -1:
+                self._pos = len(buffer)
+                return completed
+            self.started = True
+            self._depth = 1
+            self._field_start = pos = brace + 1
+
+        while not self.done:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                pos = match.start()
+                if buffer[pos] == '\\':
+                    if pos + 1 >= len(buffer):
+                        # Escape split across chunks; resume at the backslash
+                        break
+                    pos += 2
+                    continue
+                self._in_string = False
+                pos += 1
+                continue
+
+            match = _STRUCTURAL.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            pos = match.start()
+            char = buffer[pos]
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._decode_field(buffer[self._field_start:pos]))
+                    self.done = True
+            elif self._depth == 1:  # ','
+                completed.extend(self._decode_field(buffer[self._field_start:pos]))
+                self._field_start = pos + 1
+            pos += 1
+
+        self._pos = pos
+        self.fields.extend(completed)
+        return completed
+
+    def _decode_field(self, text: str) -> List[Tuple[str, Any]]:
+        if not text.strip():
+            return []
+        try:
+            return list(json.loads("{" + text + "}").items())
+        except json.JSONDecodeError:
+            # Malformed field; skipped here and counted so callers can fall back
+            self.errors += 1
+            return []
+
+    @property
+    def document(self) -> Dict[str, Any]:
+        """Fields decoded so far as a dict"""
+        return dict(self.fields)
+
+    def pending_text(self) -> str:
+        """Raw text of the field currently being received"""
+        if not self.started or self.done:
+            return ""
+        return self.buffer[self._field_start:]
+
+
+_decoder = json.JSONDecoder()
+
+
+def parse_research_json(text: str) -> Optional[Dict[str, Any]]:
+    """Parse a complete model response; None if it has no well-formed JSON object.
+
+    When the whole text is already available there is nothing to stream, so
+    this decodes from the first '{' in one C-level raw_decode pass. Unlike
+    find/rfind, trailing prose containing '}' does not break the parse.
+    """
+    json_start = text.find('{')
+    if json_start == -1:
+        return None
+    try:
+        data, _ = _decoder.raw_decode(text, json_start)
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _legacy_parse(text: str) -> Optional[Dict[str, Any]]:
+    json_start = text.find('{')
+    json_end = text.rfind('}') + 1
+    if json_start == -1 or json_end == 0:
+        return None
+    return json.loads(text[json_start:json_end])
+
+
+def _sample_payload(target_bytes: int) -> str:
+    verse = {
+        "reference": "John 3:16",
+        "text": "For God so loved the world, that he gave his only Son, that whoever believes in him "
+                "should not perish but have eternal life.",
+        "context": "Jesus speaking with Nicodemus about the new birth, {braces} and \"quotes\" included."
+    }
+    verses = []
+    payload = ""
+    while len(payload) < target_bytes:
+        verses.append(verse)
+        payload = json.dumps({
+            "title": "TOPICAL BIBLE STUDY: LOVE",
+            "key_verses": verses,
+            "connections": ["Connection one", "Connection two"],
+            "cross_reference_keywords": ["love", "grace", "faith"],
+        }, indent=2)
+    return "Here is your study:\n" + payload + "\nI hope this helps."
+
+
+def benchmark_parsers(sizes_kb=(2, 20, 200), repeats: int = 20) -> list:
+    """Compare find/rfind + json.loads against the incremental parser.
+
+    The old app path parsed every response twice per rerun (display and
+    keyword extraction), so that is what "legacy_rerun_ms" measures. The new
+    path parses once ("parse_once_ms") and memoizes the result in session
+    state, so later reruns cost nothing; "streamed_ms" feeds the same payload
+    in 64-byte chunks, as the streaming UI does while the model is generating.
+    """
+    results = []
+    for size_kb in sizes_kb:
+        payload = _sample_payload(size_kb * 1024)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            _legacy_parse(payload)
+            _legacy_parse(payload)
+        legacy_ms = (time.perf_counter() - start) / repeats * 1000
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            parse_research_json(payload)
+        parse_once_ms = (time.perf_counter() - start) / repeats * 1000
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            parser = IncrementalJSONParser()
+            for i in range(0, len(payload), 64):
+                parser.feed(payload[i:i + 64])
+        streamed_ms = (time.perf_counter() - start) / repeats * 1000
+
+        results.append({
+            "payload_kb": len(payload) / 1024,
+            "legacy_rerun_ms": legacy_ms,
+            "parse_once_ms": parse_once_ms,
+            "streamed_ms": streamed_ms,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    for row in benchmark_parsers():
+        print(
+            f"{row['payload_kb']:7.1f} KB: legacy (2 parses/rerun) {row['legacy_rerun_ms']:7.3f} ms  "
+            f"parse once {row['parse_once_ms']:7.3f} ms  streamed {row['streamed_ms']:7.3f} ms"
+        )
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.bible_books import BIBLE_BOOKS, BOOK_ORDINALS
+
+ARTIFACT_FORMAT_VERSION = 1
+LANGUAGES = ("greek", "hebrew")
+
+
+def artifact_path(data_dir: str) -> str:
+    return os.path.join(data_dir, "compiled", f"lexicon.v{ARTIFACT_FORMAT_VERSION}.npz")
+
+
+def source_fingerprint(paths: Sequence[str]) -> List[str]:
+    """SHA-256 of each source file; survives checkouts that reset modification times"""
+    digests = []
+    for path in paths:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digests.append(digest.hexdigest())
+    return digests
+
+
+def _string_array(values: Sequence[str]) -> np.ndarray:
+    return np.array(values, dtype=str) if values else np.zeros(0, dtype="<U1")
+
+
+def compile_lexicon(greek_words: Dict, hebrew_words: Dict, word_occurrences: Dict,
+                    fingerprint: List[str], path: str):
+    """Write the three lexicon files as one .npz of column arrays.
+
+    Lexicon entries become one string column per field (list fields such as
+    english_words as CSR pointer + values), and occurrences a dense
+    (word, lemma) x book int32 matrix with rows grouped by English word.
+    Input is expected to have passed utils.build_data.validate_lexicon.
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    fields: Dict[str, Dict[str, str]] = {}
+    for language, lexicon in zip(LANGUAGES, (greek_words, hebrew_words)):
+        lemmas = list(lexicon)
+        arrays[f"{language}.lemma"] = _string_array(lemmas)
+        kinds = {}
+        for entry in lexicon.values():
+            for key, value in entry.items():
+                kinds.setdefault(key, "list" if isinstance(value, list) else "str")
+        for key, kind in kinds.items():
+            present = [key in lexicon[lemma] for lemma in lemmas]
+            arrays[f"{language}.{key}.present"] = np.array(present, dtype=bool)
+            if kind == "str":
+                arrays[f"{language}.{key}"] = _string_array([lexicon[lemma].get(key, "") for lemma in lemmas])
+            else:
+                values = [lexicon[lemma].get(key, []) for lemma in lemmas]
+                ptr = np.zeros(len(values) + 1, dtype=np.int32)
+                ptr[1:] = np.cumsum([len(items) for items in values])
+                arrays[f"{language}.{key}.ptr"] = ptr
+                arrays[f"{language}.{key}"] = _string_array([item for items in values for item in items])
+        fields[language] = kinds
+
+    words = list(word_occurrences)
+    word_row_ptr = np.zeros(len(words) + 1, dtype=np.int32)
+    row_lemmas = []
+    for i, word in enumerate(words):
+        row_lemmas.extend(word_occurrences[word])
+        word_row_ptr[i + 1] = len(row_lemmas)
+    counts = np.zeros((len(row_lemmas), len(BIBLE_BOOKS)), dtype=np.int32)
+    row = 0
+    for word in words:
+        for lemma, books in word_occurrences[word].items():
+            for book, count in books.items():
+                counts[row, BOOK_ORDINALS[book]] = count
+            row += 1
+    arrays.update({
+        "occ.words": _string_array(words),
+        "occ.word_row_ptr": word_row_ptr,
+        "occ.row_lemmas": _string_array(row_lemmas),
+        "occ.counts": counts,
+    })
+
+    meta = {"format": ARTIFACT_FORMAT_VERSION, "fingerprint": fingerprint, "fields": fields}
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+class LazyLexicon(Mapping):
+    """Read-only lemma -> entry mapping over column arrays; entries are built on first access"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], language: str, fields: Dict[str, str]):
+        self._arrays = arrays
+        self._language = language
+        self._fields = fields
+        self._lemmas = arrays[f"{language}.lemma"].tolist()
+        self._positions = {lemma: i for i, lemma in enumerate(self._lemmas)}
+        self._entries: Dict[str, MappingProxyType] = {}
+
+    def __getitem__(self, lemma: str) -> MappingProxyType:
+        entry = self._entries.get(lemma)
+        if entry is not None:
+            return entry
+        i = self._positions[lemma]
+        prefix = self._language
+        values = {}
+        for key, kind in self._fields.items():
+            if not self._arrays[f"{prefix}.{key}.present"][i]:
+                continue
+            if kind == "str":
+                values[key] = str(self._arrays[f"{prefix}.{key}"][i])
+            else:
+                ptr = self._arrays[f"{prefix}.{key}.ptr"]
+                values[key] = tuple(self._arrays[f"{prefix}.{key}"][ptr[i]:ptr[i + 1]].tolist())
+        entry = MappingProxyType(values)
+        self._entries[lemma] = entry
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._lemmas)
+
+    def __len__(self) -> int:
+        return len(self._lemmas)
+
+    def __contains__(self, lemma) -> bool:
+        return lemma in self._positions
+
+
+class LazyOccurrences(Mapping):
+    """Read-only word -> lemma -> book -> count mapping over the compiled count matrix"""
+
+    def __init__(self, words: List[str], word_row_ptr: np.ndarray, row_lemmas: List[str], counts: np.ndarray):
+        self._words = words
+        self._positions = {word: i for i, word in enumerate(words)}
+        self._word_row_ptr = word_row_ptr
+        self._row_lemmas = row_lemmas
+        self._counts = counts
+        self._entries: Dict[str, MappingProxyType] = {}
+
+    def __getitem__(self, word: str) -> MappingProxyType:
+        entry = self._entries.get(word)
+        if entry is not None:
+            return entry
+        i = self._positions[word]
+        lemmas = {}
+        for row in range(self._word_row_ptr[i], self._word_row_ptr[i + 1]):
+            books = np.flatnonzero(self._counts[row])
+            lemmas[self._row_lemmas[row]] = MappingProxyType(
+                {BIBLE_BOOKS[book]: int(self._counts[row, book]) for book in books}
+            )
+        entry = MappingProxyType(lemmas)
+        self._entries[word] = entry
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._words)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, word) -> bool:
+        return word in self._positions
+
+
+class CompiledLexicon:
+    """A loaded lexicon artifact: lazy mappings plus the raw occurrence arrays"""
+
+    def __init__(self, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        for array in arrays.values():
+            array.setflags(write=False)
+        self.meta = json.loads(arrays.pop("meta").tobytes().decode("utf-8"))
+        self.path = path
+        self.nbytes = sum(array.nbytes for array in arrays.values())
+
+        fields = self.meta["fields"]
+        self.greek_words = LazyLexicon(arrays, "greek", fields["greek"])
+        self.hebrew_words = LazyLexicon(arrays, "hebrew", fields["hebrew"])
+
+        words = arrays["occ.words"].tolist()
+        word_row_ptr = arrays["occ.word_row_ptr"]
+        row_lemmas = arrays["occ.row_lemmas"].tolist()
+        self.counts = arrays["occ.counts"]
+        self.word_occurrences = LazyOccurrences(words, word_row_ptr, row_lemmas, self.counts)
+        # (english word, lemma) for each row of counts, as OccurrenceMatrix expects
+        self.occurrence_rows: List[Tuple[str, str]] = [
+            (words[i], row_lemmas[row])
+            for i in range(len(words))
+            for row in range(word_row_ptr[i], word_row_ptr[i + 1])
+        ]
+
+    @property
+    def fingerprint(self) -> List[str]:
+        return self.meta["fingerprint"]
+
+
+def load_compiled_lexicon(path: str, source_paths: Sequence[str]) -> Optional[CompiledLexicon]:
+    """Load the artifact if it exists and was compiled from the current source files"""
+    if not os.path.exists(path):
+        return None
+    try:
+        compiled = CompiledLexicon(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if compiled.meta.get("format") != ARTIFACT_FORMAT_VERSION:
+        return None
+    if compiled.fingerprint != source_fingerprint(source_paths):
+        return None
+    return compiled
@@ -0,0 +1,166 @@
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from utils.lexicon_artifact import CompiledLexicon, artifact_path, load_compiled_lexicon
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+LEXICON_FILES = {
+    "greek_words": "greek_words.json",
+    "hebrew_words": "hebrew_words.json",
+    "word_occurrences": "word_occurrences.json",
+}
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts/lists into read-only mappings/tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _deep_sizeof(value: Any, seen: Optional[set] = None) -> int:
+    """Approximate memory footprint of a nested structure in bytes"""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (dict, MappingProxyType)):
+        if isinstance(value, MappingProxyType):
+            value = dict(value)
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in value)
+    return size
+
+
+@dataclass(frozen=True)
+class LexiconSnapshot:
+    """Immutable view of the lexicon files at one point in time.
+
+    `source` is "compiled" when loaded from the build_data artifact (the
+    mappings are then lazy views over its arrays, kept in `compiled`) and
+    "json" when parsed from the JSON files.
+    """
+    greek_words: Mapping
+    hebrew_words: Mapping
+    word_occurrences: Mapping
+    version: Tuple[int, ...]
+    load_seconds: float
+    memory_bytes: int
+    entry_count: int
+    source: str = "json"
+    compiled: Optional[CompiledLexicon] = None
+
+
+class LexiconStore:
+    """Process-wide lexicon cache shared by every Streamlit session.
+
+    Files are parsed once and re-read only when one of their modification
+    times changes. If `python -m utils.build_data` has compiled an artifact
+    from the current files, it is loaded instead of parsing the JSON.
+    Callers receive read-only views, so one session can't mutate data
+    another session is rendering.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, use_compiled: bool = True):
+        self.data_dir = data_dir
+        self.use_compiled = use_compiled
+        self._lock = threading.Lock()
+        self._snapshot: Optional[LexiconSnapshot] = None
+        self.load_count = 0
+
+    def _paths(self) -> Dict[str, str]:
+        return {name: os.path.join(self.data_dir, filename) for name, filename in LEXICON_FILES.items()}
+
+    def _current_version(self) -> Tuple[int, ...]:
+        """Tuple of file mtimes (ns); raises FileNotFoundError if any file is missing"""
+        return tuple(os.stat(path).st_mtime_ns for path in self._paths().values())
+
+    def _load(self, version: Tuple[int, ...]) -> LexiconSnapshot:
+        start = time.perf_counter()
+        if self.use_compiled:
+            compiled = load_compiled_lexicon(artifact_path(self.data_dir), list(self._paths().values()))
+            if compiled is not None:
+                return LexiconSnapshot(
+                    greek_words=compiled.greek_words,
+                    hebrew_words=compiled.hebrew_words,
+                    word_occurrences=compiled.word_occurrences,
+                    version=version,
+                    load_seconds=time.perf_counter() - start,
+                    memory_bytes=compiled.nbytes,
+                    entry_count=len(compiled.greek_words) + len(compiled.hebrew_words),
+                    source="compiled",
+                    compiled=compiled,
+                )
+
+        raw = {}
+        for name, path in self._paths().items():
+            with open(path, 'r', encoding='utf-8') as f:
+                raw[name] = json.load(f)
+        frozen = {name: _freeze(data) for name, data in raw.items()}
+        load_seconds = time.perf_counter() - start
+
+        return LexiconSnapshot(
+            greek_words=frozen["greek_words"],
+            hebrew_words=frozen["hebrew_words"],
+            word_occurrences=frozen["word_occurrences"],
+            version=version,
+            load_seconds=load_seconds,
+            memory_bytes=sum(_deep_sizeof(data) for data in frozen.values()),
+            entry_count=len(raw["greek_words"]) + len(raw["hebrew_words"]),
+        )
+
+    def get(self) -> LexiconSnapshot:
+        """Return the current snapshot, reloading if any source file changed"""
+        version = self._current_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with self._lock:
+            # Another session may have reloaded while we waited for the lock
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self._load(version)
+                self.load_count += 1
+            return self._snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        """Load time and memory footprint of the cached snapshot"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"loaded": False, "load_count": self.load_count}
+        return {
+            "loaded": True,
+            "load_count": self.load_count,
+            "load_ms": snapshot.load_seconds * 1000,
+            "memory_mb": snapshot.memory_bytes / (1024 * 1024),
+            "entries": snapshot.entry_count,
+            "english_words": len(snapshot.word_occurrences),
+            "source": snapshot.source,
+        }
+
+
+_store: Optional[LexiconStore] = None
+_store_lock = threading.Lock()
+
+
+def get_lexicon_store() -> LexiconStore:
+    """Return the process-wide LexiconStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LexiconStore()
+    return _store
@@ -0,0 +1,328 @@
+"""Per-stage latency spans, counters and histograms, exportable for scraping.
+
+    python -m utils.metrics              # span overhead and a sample export
+    METRICS_PORT=9464 streamlit run app.py   # also serve /metrics (Prometheus) and /metrics.jsonl
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from utils.response_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.path.join(CACHE_DIR, "metrics")
+METRIC_PREFIX = "biblical_research_"
+STAGE_SECONDS = "stage_seconds"
+STAGE_ERRORS = "stage_errors_total"
+
+# Histogram bucket bounds in seconds: sub-millisecond local lookups up to slow API calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Recent samples kept per series; percentiles are exact over this window
+RESERVOIR_SIZE = 1024
+
+METRIC_HELP = {
+    STAGE_SECONDS: "Time spent in each stage of a request",
+    STAGE_ERRORS: "Stage runs that raised an exception",
+    "research_requests_total": "Research requests by where the answer came from",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list; 0.0 when it is empty"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...], reservoir_size: int):
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: Deque[float] = deque(maxlen=reservoir_size)
+
+    def observe(self, value: float, buckets: Tuple[float, ...]):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        # Values above the last bound only show up in the +Inf bucket (count)
+        i = bisect_left(buckets, value)
+        if i < len(buckets):
+            self.bucket_counts[i] += 1
+
+
+class MetricsRegistry:
+    """Process-wide counters and latency histograms, keyed by name and labels.
+
+    `span(stage)` times a block into the stage_seconds histogram and counts
+    exceptions; worker threads and sessions share one registry. Histograms
+    keep cumulative buckets for Prometheus and a window of recent samples
+    for the p50/p95/p99 shown in the app.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, reservoir_size: int = RESERVOIR_SIZE):
+        self.buckets = tuple(buckets)
+        self.reservoir_size = reservoir_size
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets, self.reservoir_size)
+            histogram.observe(value, self.buckets)
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """Time the enclosed block as one run of `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.increment(STAGE_ERRORS, stage=stage, **labels)
+            raise
+        finally:
+            self.observe(STAGE_SECONDS, time.perf_counter() - start, stage=stage, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Every series as plain data: counters with their value, histograms with count, sum and percentiles"""
+        with self._lock:
+            counters = [(name, key, value) for name, series in self._counters.items()
+                        for key, value in series.items()]
+            histograms = [(name, key, histogram.count, histogram.sum, sorted(histogram.recent))
+                          for name, series in self._histograms.items() for key, histogram in series.items()]
+        return {
+            "counters": [{"metric": name, "labels": dict(key), "value": value}
+                         for name, key, value in sorted(counters)],
+            "histograms": [{"metric": name, "labels": dict(key), "count": count, "sum": total,
+                            "p50": percentile(recent, 0.5), "p95": percentile(recent, 0.95),
+                            "p99": percentile(recent, 0.99), "max": recent[-1] if recent else 0.0}
+                           for name, key, count, total, recent in sorted(histograms, key=lambda h: h[:2])],
+        }
+
+    def stage_summary(self) -> List[Dict[str, Any]]:
+        """One row per stage (and label set): runs, errors and p50/p95/p99 in milliseconds"""
+        snapshot = self.snapshot()
+        errors = {tuple(sorted(c["labels"].items())): c["value"]
+                  for c in snapshot["counters"] if c["metric"] == STAGE_ERRORS}
+        rows = []
+        for histogram in snapshot["histograms"]:
+            if histogram["metric"] != STAGE_SECONDS:
+                continue
+            labels = dict(histogram["labels"])
+            row = {"stage": labels.pop("stage", "")}
+            row.update(labels)
+            row.update({
+                "runs": histogram["count"],
+                "errors": int(errors.get(tuple(sorted(histogram["labels"].items())), 0)),
+                "p50_ms": histogram["p50"] * 1000,
+                "p95_ms": histogram["p95"] * 1000,
+                "p99_ms": histogram["p99"] * 1000,
+            })
+            rows.append(row)
+        return rows
+
+    def to_prometheus(self, prefix: str = METRIC_PREFIX) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            counters = {name: sorted(series.items()) for name, series in self._counters.items()}
+            histograms = {name: sorted((key, list(h.bucket_counts), h.count, h.sum) for key, h in series.items())
+                          for name, series in self._histograms.items()}
+        lines = []
+        for name in sorted(counters):
+            metric = prefix + name
+            lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{_format_labels(key)} {value:g}" for key, value in counters[name])
+        for name in sorted(histograms):
+            metric = prefix + name
+            lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {metric} histogram")
+            for key, bucket_counts, count, total in histograms[name]:
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{metric}_bucket{_format_labels(key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{metric}_bucket{_format_labels(key, le)} {count}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {total:.6f}")
+                lines.append(f"{metric}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_jsonl(self, timestamp: Optional[float] = None) -> str:
+        """One JSON object per series, all stamped with the same time; append to a file to keep history"""
+        timestamp = time.time() if timestamp is None else timestamp
+        snapshot = self.snapshot()
+        lines = [json.dumps({"ts": timestamp, "type": "counter", **counter}, ensure_ascii=False)
+                 for counter in snapshot["counters"]]
+        lines += [json.dumps({"ts": timestamp, "type": "histogram", **histogram}, ensure_ascii=False)
+                  for histogram in snapshot["histograms"]]
+        return "".join(line + "\n" for line in lines)
+
+    def write_files(self, directory: str = METRICS_DIR) -> Tuple[str, str]:
+        """Replace metrics.prom (for a file-based scraper) and append to metrics.jsonl; returns both paths"""
+        os.makedirs(directory, exist_ok=True)
+        prom_path = os.path.join(directory, "metrics.prom")
+        jsonl_path = os.path.join(directory, "metrics.jsonl")
+        tmp_path = prom_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, prom_path)
+        with open(jsonl_path, "a", encoding="utf-8") as f:
+            f.write(self.to_jsonl())
+        return prom_path, jsonl_path
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide MetricsRegistry"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = MetricsRegistry()
+    return _metrics
+
+
+def span(stage: str, **labels):
+    """get_metrics().span(stage); `with span("api_call"): ...`"""
+    return get_metrics().span(stage, **labels)
+
+
+def timed(stage: str) -> Callable:
+    """Decorator that records every call of the function as one run of `stage`"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_metrics().span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        registry = get_metrics()
+        if self.path == "/metrics":
+            body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.jsonl":
+            body, content_type = registry.to_jsonl(), "application/x-ndjson; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics and /metrics.jsonl from a daemon thread; later calls return the running server.
+
+    If the port cannot be bound (e.g. already in use), the error is logged
+    once and this and every later call return None; the app runs without
+    the endpoint.
+    """
+    global _server, _server_failed
+    with _server_lock:
+        if _server is None and not _server_failed:
+            try:
+                server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                _server_failed = True
+                logger.warning("Metrics endpoint disabled: cannot listen on %s:%d (%s)", host, port, e)
+                return None
+            threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+            _server = server
+        return _server
+
+
+def benchmark_overhead(spans: int = 100_000) -> Dict[str, float]:
+    """Cost of one span (µs) and of each export over a registry with a realistic number of series"""
+    registry = MetricsRegistry()
+    start = time.perf_counter()
+    for i in range(spans):
+        with registry.span(f"stage{i % 8}"):
+            pass
+    span_us = (time.perf_counter() - start) / spans * 1e6
+
+    start = time.perf_counter()
+    for i in range(spans):
+        pass
+    loop_us = (time.perf_counter() - start) / spans * 1e6
+
+    timings = {"span_us": span_us - loop_us}
+    for name, export in (("prometheus_ms", registry.to_prometheus), ("jsonl_ms", registry.to_jsonl),
+                         ("summary_ms", registry.stage_summary)):
+        start = time.perf_counter()
+        for _ in range(100):
+            export()
+        timings[name] = (time.perf_counter() - start) / 100 * 1000
+    return timings
+
+
+if __name__ == "__main__":
+    print(benchmark_overhead())
+    registry = get_metrics()
+    for delay in (0.001, 0.002, 0.004):
+        with span("example", kind="sleep"):
+            time.sleep(delay)
+    registry.increment("research_requests_total", source="cache")
+    print(registry.to_prometheus(), end="")
+    print(registry.to_jsonl(), end="")
@@ -0,0 +1,79 @@
+import threading
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from utils.bible_books import BIBLE_BOOKS, BOOK_ORDINALS
+
+
+class OccurrenceMatrix:
+    """Dense (english word, lemma) x book count matrix built from word_occurrences.json.
+
+    Columns follow BIBLE_BOOKS ordering, so a lemma selection becomes a
+    boolean row mask and per-book totals a single vectorized row sum.
+    """
+
+    def __init__(self, word_occurrences: Mapping, version=None):
+        self.version = version
+        self.rows: List[Tuple[str, str]] = []
+        self._word_rows: Dict[str, Dict[str, int]] = {}
+
+        for english_word, lemmas in word_occurrences.items():
+            for lemma in lemmas:
+                self._word_rows.setdefault(english_word, {})[lemma] = len(self.rows)
+                self.rows.append((english_word, lemma))
+
+        self.counts = np.zeros((len(self.rows), len(BIBLE_BOOKS)), dtype=np.int32)
+        for row, (english_word, lemma) in enumerate(self.rows):
+            for book, count in word_occurrences[english_word][lemma].items():
+                column = BOOK_ORDINALS.get(book)
+                if column is not None:
+                    self.counts[row, column] = count
+        self.counts.setflags(write=False)
+
+    @classmethod
+    def from_arrays(cls, rows: List[Tuple[str, str]], counts: np.ndarray, version=None) -> "OccurrenceMatrix":
+        """Wrap an already compiled count matrix (see utils.lexicon_artifact) without copying it"""
+        matrix = cls.__new__(cls)
+        matrix.version = version
+        matrix.rows = rows
+        matrix._word_rows = {}
+        for row, (english_word, lemma) in enumerate(rows):
+            matrix._word_rows.setdefault(english_word, {})[lemma] = row
+        matrix.counts = counts
+        return matrix
+
+    def selection_mask(self, english_word: str, lemmas: Iterable[str]) -> np.ndarray:
+        """Boolean row mask selecting the given lemmas of an English word"""
+        mask = np.zeros(len(self.rows), dtype=bool)
+        word_rows = self._word_rows.get(english_word, {})
+        for lemma in lemmas:
+            row = word_rows.get(lemma)
+            if row is not None:
+                mask[row] = True
+        return mask
+
+    def book_totals(self, english_word: str, lemmas: Iterable[str]) -> np.ndarray:
+        """Per-book occurrence totals (length 66) for the selected lemmas"""
+        return self.counts[self.selection_mask(english_word, lemmas)].sum(axis=0)
+
+
+_cached_matrix: Optional[OccurrenceMatrix] = None
+_matrix_lock = threading.Lock()
+
+
+def get_occurrence_matrix(snapshot) -> OccurrenceMatrix:
+    """Return the matrix for a LexiconSnapshot, compiling it once per lexicon version"""
+    global _cached_matrix
+    matrix = _cached_matrix
+    if matrix is not None and matrix.version == snapshot.version:
+        return matrix
+    with _matrix_lock:
+        if _cached_matrix is None or _cached_matrix.version != snapshot.version:
+            if snapshot.compiled is not None:
+                _cached_matrix = OccurrenceMatrix.from_arrays(
+                    snapshot.compiled.occurrence_rows, snapshot.compiled.counts, snapshot.version
+                )
+            else:
+                _cached_matrix = OccurrenceMatrix(snapshot.word_occurrences, snapshot.version)
+        return _cached_matrix
@@ -1,12 +1,100 @@
-def get_research_prompt(research_type: str, user_input: str, depth_level: str, include_greek_hebrew: bool) -> str:
-    """Generate appropriate prompt based on research type and parameters"""
+import re
+from typing import Dict, Tuple
+
+# Output budget for a research response, shared by the app and the batch runner
+RESEARCH_MAX_TOKENS = 2000
+# When verse text is filled in locally the model only writes references
+REFERENCES_ONLY_MAX_TOKENS = 1400
+
+DEPTH_INSTRUCTIONS = {
+    "Basic": "Provide clear, accessible insights suitable for general Bible study.",
+    "Intermediate": "Include moderate theological depth with some technical terms explained.",
+    "Deep Theological": "Provide thorough theological analysis with detailed cross-references and doctrinal implications."
+}
+
+# Per-request instruction and exact title for each research type. They are kept
+# out of the schema so the schema is identical across requests and cacheable.
+REQUEST_TEMPLATES = {
+    "Topical Study": ("Conduct a topical Bible study on: {user_input}", "TOPICAL BIBLE STUDY: {upper}"),
+    "Verse Analysis": ("Provide a detailed analysis of: {user_input}", "VERSE ANALYSIS: {user_input}"),
+    "Study Guide Builder": ("Create a study guide for: {user_input}", "STUDY GUIDE: {user_input}"),
+    "Cross-Reference Explorer": ("Explore cross-references for: {user_input}", "CROSS-REFERENCE STUDY: {user_input}"),
+}
+
+
+def get_research_prompt(research_type: str, user_input: str, depth_level: str, include_greek_hebrew: bool,
+                        include_verse_text: bool = True) -> str:
+    """Generate appropriate prompt based on research type and parameters
     
-    # Base prompt components
-    depth_instruction = {
-        "Basic": "Provide clear, accessible insights suitable for general Bible study.",
-        "Intermediate": "Include moderate theological depth with some technical terms explained.",
-        "Deep Theological": "Provide thorough theological analysis with detailed cross-references and doctrinal implications."
-    }
+    With include_verse_text=False the schema asks for verse references only;
+    the app fills the text in from its local verse store, saving output tokens.
+    """
+    prefix, suffix = get_research_prompt_parts(
+        research_type, user_input, depth_level, include_greek_hebrew, include_verse_text
+    )
+    return prefix + suffix
+
+
+def get_research_prompt_parts(research_type: str, user_input: str, depth_level: str, include_greek_hebrew: bool,
+                              include_verse_text: bool = True, verse_context: str = "") -> Tuple[str, str]:
+    """Split the research prompt into (stable prefix, per-request suffix)
+    
+    The prefix is the output schema for the research type and options; it
+    is byte-identical across requests, so it can be sent as a cached prompt
+    block. The suffix carries the user's input, the depth level and any
+    retrieved verses (see utils.retrieval.get_verse_context).
+    """
+    prefix = get_research_schema(research_type, include_greek_hebrew, include_verse_text)
+    return prefix, get_research_request(research_type, user_input, depth_level, verse_context)
+
+
+def get_research_request(research_type: str, user_input: str, depth_level: str, verse_context: str = "") -> str:
+    """The short, per-request part of a research prompt"""
+    request, title = REQUEST_TEMPLATES.get(research_type, REQUEST_TEMPLATES["Cross-Reference Explorer"])
+    return f"""
+        {request.format(user_input=user_input)}
+        Use this exact title: "{title.format(user_input=user_input, upper=user_input.upper())}"
+        
+        {DEPTH_INSTRUCTIONS[depth_level]}
+        """ + verse_context
+
+
+# Words, numbers and individual punctuation marks; a rough stand-in for the model's tokenizer
+_TOKEN_ESTIMATE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a prompt without calling the API"""
+    return len(_TOKEN_ESTIMATE.findall(text))
+
+
+def prompt_token_report(user_input: str = "faith", depth_level: str = "Intermediate",
+                        include_greek_hebrew: bool = True, include_verse_text: bool = False) -> Dict[str, Dict[str, int]]:
+    """Estimated tokens per research type, split into cacheable prefix and per-request suffix
+    
+    The prefix counts both the system message and the research schema,
+    since both are sent ahead of the cache breakpoint.
+    """
+    system_tokens = estimate_tokens(get_system_message())
+    report = {}
+    for research_type in REQUEST_TEMPLATES:
+        prefix, suffix = get_research_prompt_parts(
+            research_type, user_input, depth_level, include_greek_hebrew, include_verse_text
+        )
+        prefix_tokens = system_tokens + estimate_tokens(prefix)
+        suffix_tokens = estimate_tokens(suffix)
+        report[research_type] = {
+            "system": system_tokens,
+            "schema": prefix_tokens - system_tokens,
+            "prefix": prefix_tokens,
+            "suffix": suffix_tokens,
+            "cacheable_share": round(prefix_tokens / (prefix_tokens + suffix_tokens), 3),
+        }
+    return report
+
+
+def get_research_schema(research_type: str, include_greek_hebrew: bool, include_verse_text: bool = True) -> str:
+    """The stable part of a research prompt: output format and rules, with no user input"""
     
     greek_hebrew_section = """
         "greek_hebrew_insights": {
@@ -22,21 +110,24 @@ def get_research_prompt(research_type: str, user_input: str, depth_level: str, i
             "study_resources": ["Strong's Concordance", "Blue Letter Bible", "specific recommendations"]
         },""" if include_greek_hebrew else ""
     
+    # Verse text fields; omitted when the text will be filled in locally
+    verse_text_field = '"text": "Full verse text (ESV)",' if include_verse_text else ""
+    cross_reference_text_field = '"text": "Verse text (ESV)",' if include_verse_text else ""
+    references_only_note = "" if include_verse_text else (
+        "- Give verse references only; do not write out verse text"
+    )
+    
     # Research type specific prompts
     if research_type == "Topical Study":
         return f"""
-        Conduct a topical Bible study on: {user_input}
-        
-        {depth_instruction[depth_level]}
-        
         Please respond with ONLY valid JSON in this exact format:
         
         {{
-            "title": "TOPICAL BIBLE STUDY: {user_input.upper()}",
+            "title": "TOPICAL BIBLE STUDY: <TOPIC IN CAPITALS>",
             "key_verses": [
                 {{
                     "reference": "Book Chapter:Verse",
-                    "text": "Full verse text (ESV)",
+                    {verse_text_field}
                     "context": "Brief context explanation"
                 }}
             ],
@@ -74,6 +165,7 @@ def get_research_prompt(research_type: str, user_input: str, depth_level: str, i
         
         IMPORTANT: 
         - Return ONLY the JSON, no other text
+        {references_only_note}
         - Ensure all JSON is valid and properly formatted
         - Include all required sections
         - Each reflection question must include specific verse references
@@ -82,14 +174,10 @@ def get_research_prompt(research_type: str, user_input: str, depth_level: str, i
     
     elif research_type == "Verse Analysis":
         return f"""
-        Provide a detailed analysis of: {user_input}
-        
-        {depth_instruction[depth_level]}
-        
         Please respond with ONLY valid JSON in this exact format:
         
         {{
-            "title": "VERSE ANALYSIS: {user_input}",
+            "title": "VERSE ANALYSIS: <passage>",
             "verse_context": {{
                 "main_verse": "Full verse text (ESV)",
                 "surrounding_context": "Context explanation",
@@ -138,19 +226,16 @@ def get_research_prompt(research_type: str, user_input: str, depth_level: str, i
         
         IMPORTANT: 
         - Return ONLY the JSON, no other text
+        {references_only_note}
         - cross_reference_keywords should be 3-5 key words from this verse for Scripture-wide lookup
         """
     
     elif research_type == "Study Guide Builder":
         return f"""
-        Create a study guide for: {user_input}
-        
-        {depth_instruction[depth_level]}
-        
         Please respond with ONLY valid JSON in this exact format:
         
         {{
-            "title": "STUDY GUIDE: {user_input}",
+            "title": "STUDY GUIDE: <passage>",
             "opening_questions": [
                 {{
                     "question": "Engaging opening question?",
@@ -204,28 +289,25 @@ def get_research_prompt(research_type: str, user_input: str, depth_level: str, i
         
         IMPORTANT: 
         - Return ONLY the JSON, no other text
+        {references_only_note}
         - cross_reference_keywords should be 3-5 key words for broader Scripture study
         """
     
     else:  # Cross-Reference Explorer
         return f"""
-        Explore cross-references for: {user_input}
-        
-        {depth_instruction[depth_level]}
-        
         Please respond with ONLY valid JSON in this exact format:
         
         {{
-            "title": "CROSS-REFERENCE STUDY: {user_input}",
+            "title": "CROSS-REFERENCE STUDY: <verse>",
             "main_verse": {{
-                "reference": "{user_input}",
-                "text": "Full verse text (ESV)",
+                "reference": "<the verse being explored>",
+                {verse_text_field}
                 "context": "Brief context"
             }},
             "key_cross_references": [
                 {{
                     "reference": "Related verse reference",
-                    "text": "Verse text (ESV)",
+                    {cross_reference_text_field}
                     "connection_type": "thematic/verbal/conceptual",
                     "explanation": "How it connects to main verse"
                 }}
@@ -267,6 +349,7 @@ def get_research_prompt(research_type: str, user_input: str, depth_level: str, i
         
         IMPORTANT: 
         - Return ONLY the JSON, no other text
+        {references_only_note}
         - cross_reference_keywords should be 3-5 key words for expanded cross-reference lookup
         """
 
@@ -315,3 +398,8 @@ def get_system_message() -> str:
     - Complete study conclusions (encourage personal discovery)
     """
     
+
+
+if __name__ == "__main__":
+    for research_type, counts in prompt_token_report().items():
+        print(research_type, counts)
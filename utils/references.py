@@ -0,0 +1,70 @@
+import re
+from typing import List, NamedTuple, Optional
+
+from utils.bible_books import normalize_book_name
+
+
+class Reference(NamedTuple):
+    """A contiguous passage. Verse numbers are None for whole-chapter references."""
+    book: str
+    start_chapter: int
+    start_verse: Optional[int]
+    end_chapter: int
+    end_verse: Optional[int]
+
+    def __str__(self):
+        if self.start_verse is None:
+            if self.end_chapter == self.start_chapter:
+                return f"{self.book} {self.start_chapter}"
+            return f"{self.book} {self.start_chapter}-{self.end_chapter}"
+        text = f"{self.book} {self.start_chapter}:{self.start_verse}"
+        if (self.end_chapter, self.end_verse) == (self.start_chapter, self.start_verse):
+            return text
+        if self.end_chapter == self.start_chapter:
+            return f"{text}-{self.end_verse}"
+        return f"{text}-{self.end_chapter}:{self.end_verse}"
+
+
+# "John 3:16", "1 Cor 13:4-7", "Rom 8", "Gen 1:1-2:3", "Ps. 23", "I John 4:8"
+_BOOK = r"((?:[1-3]|I{1,3}|First|Second|Third)\s*)?([A-Z][A-Za-z]+\.?(?:\s+of\s+[A-Z][a-z]+)?)"
+_REFERENCE_PATTERN = _BOOK + r"\s+(\d{1,3})(?::(\d{1,3}))?(?:\s*[-–]\s*(\d{1,3})(?::(\d{1,3}))?)?(?![\d:])"
+# Free text is scanned case-sensitively so words like "is 5" aren't read as Isaiah;
+# a string that should be exactly one reference may be typed in any case.
+_REFERENCE = re.compile(_REFERENCE_PATTERN)
+_REFERENCE_ANY_CASE = re.compile(_REFERENCE_PATTERN, re.IGNORECASE)
+
+
+def _from_match(match) -> Optional[Reference]:
+    prefix, name, chapter, verse, end_a, end_b = match.groups()
+    book = normalize_book_name(f"{prefix or ''}{name}")
+    if book is None:
+        return None
+    chapter = int(chapter)
+    if verse is None:
+        # "Rom 8" or "Rom 8-9": whole chapters ("Rom 8-9:3" is not valid)
+        if end_b is not None:
+            return None
+        end_chapter = int(end_a) if end_a else chapter
+        return Reference(book, chapter, None, end_chapter, None)
+    verse = int(verse)
+    if end_a is None:
+        return Reference(book, chapter, verse, chapter, verse)
+    if end_b is None:
+        return Reference(book, chapter, verse, chapter, int(end_a))
+    return Reference(book, chapter, verse, int(end_a), int(end_b))
+
+
+def parse_reference(text: str) -> Optional[Reference]:
+    """Parse a single reference such as "John 3:16-18" or "Rom 8"; None if unrecognized"""
+    match = _REFERENCE_ANY_CASE.fullmatch(text.strip())
+    return _from_match(match) if match else None
+
+
+def find_references(text: str) -> List[Reference]:
+    """Find every recognizable reference inside free text"""
+    references = []
+    for match in _REFERENCE.finditer(text):
+        reference = _from_match(match)
+        if reference is not None:
+            references.append(reference)
+    return references
@@ -0,0 +1,210 @@
+"""Retrieve relevant verses from the local index and hand them to the model as prompt context.
+
+    python -m utils.retrieval          # prompt tokens per research type, with and without context
+    python -m utils.retrieval --live   # also send each variant to the API and compare usage and latency
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from utils.prompts import (REQUEST_TEMPLATES, estimate_tokens, get_research_prompt_parts,
+                           get_system_message)
+from utils.references import parse_reference
+from utils.verse_search import tokenize
+
+DEFAULT_TOP_K = 8
+# Long verses are cut to this many words in the context; the model only needs enough to choose
+MAX_CONTEXT_WORDS = 40
+
+
+class RetrievedVerse(NamedTuple):
+    reference: str
+    text: str
+    source: str     # "passage" (the requested verses), "crossref", "semantic" or "search" (BM25)
+    score: float
+
+
+def retrieve_verses(user_input: str, index, store=None, k: int = DEFAULT_TOP_K,
+                    semantic_index=None, graph=None) -> List[RetrievedVerse]:
+    """Top-k verses for a research request.
+
+    If the input is a reference and the verse store is available, its
+    verses come first and their text becomes the search query, so related
+    passages follow; otherwise the input itself is the BM25 query. With a
+    cross-reference graph (utils.cross_references), a reference's most-voted
+    links come right after the passage. With a semantic index
+    (utils.semantic_index), a topic's nearest verses by meaning are taken
+    first. BM25 matches fill the rest.
+    """
+    verses: List[RetrievedVerse] = []
+    reference = parse_reference(user_input) if store is not None else None
+    query = user_input
+    if reference is not None:
+        passage = store.passage(reference)[:k]
+        verses = [RetrievedVerse(verse["reference"], verse["text"], "passage", 0.0) for verse in passage]
+        if passage:
+            # Plain tokens only; quotes in verse text would otherwise be read as phrase queries
+            query = " ".join(tokenize(" ".join(verse["text"] for verse in passage)))
+        if graph is not None:
+            for link in graph.neighbourhood(reference, hops=1, limit=min((k + 1) // 2, k - len(verses))):
+                text = " ".join(verse["text"] for verse in store.passage(link.reference))
+                if text:
+                    verses.append(RetrievedVerse(link.reference, text, "crossref", float(link.votes)))
+
+    if reference is None and semantic_index is not None:
+        # Semantic and BM25 doc numbers are both verse positions in canonical order
+        for doc, score in semantic_index.search(user_input, k=(k + 1) // 2):
+            hit = index.verse(doc)
+            verses.append(RetrievedVerse(f"{hit['book_name']} {hit['chapter']}:{hit['verse']}",
+                                         hit["text"], "semantic", score))
+
+    seen = {verse.reference for verse in verses}
+    for hit in index.search(query, limit=k + len(verses)):
+        reference_text = f"{hit['book_name']} {hit['chapter']}:{hit['verse']}"
+        if reference_text in seen:
+            continue
+        verses.append(RetrievedVerse(reference_text, hit["text"], "search", hit["score"]))
+        seen.add(reference_text)
+        if len(verses) >= k:
+            break
+    return verses
+
+
+def _shorten(text: str, max_words: int = MAX_CONTEXT_WORDS) -> str:
+    words = text.split()
+    return text if len(words) <= max_words else " ".join(words[:max_words]) + " …"
+
+
+def format_verse_context(verses: Sequence[RetrievedVerse]) -> str:
+    """Numbered context block for the per-request part of the prompt; empty if nothing was retrieved"""
+    if not verses:
+        return ""
+    lines = [f"[{i}] {verse.reference}: {_shorten(verse.text)}" for i, verse in enumerate(verses, 1)]
+    return (
+        "\nRelevant verses from the local Bible text:\n"
+        + "\n".join(lines)
+        + "\nDraw on these where they fit and cite each by its reference exactly as listed; "
+          "the app inserts verse text itself. Other verses may be cited by reference too.\n"
+    )
+
+
+def get_verse_context(user_input: str, index, store=None, k: int = DEFAULT_TOP_K, semantic_index=None,
+                      graph=None) -> str:
+    """Retrieve and format context in one step; empty when no index is installed"""
+    if index is None or not user_input:
+        return ""
+    return format_verse_context(retrieve_verses(user_input, index, store, k, semantic_index, graph))
+
+
+def _variants(research_type: str, user_input: str, depth_level: str, context: str) -> Dict[str, tuple]:
+    """(prefix, suffix) for today's full-text prompt, references only, and references + retrieved context"""
+    return {
+        "full_text": get_research_prompt_parts(research_type, user_input, depth_level, True, True),
+        "references": get_research_prompt_parts(research_type, user_input, depth_level, True, False),
+        "retrieval": get_research_prompt_parts(research_type, user_input, depth_level, True, False,
+                                               verse_context=context),
+    }
+
+
+SAMPLE_INPUTS = {
+    "Topical Study": "faith",
+    "Verse Analysis": "John 3:16",
+    "Study Guide Builder": "Ephesians 2:8-10",
+    "Cross-Reference Explorer": "1 Corinthians 13:4",
+}
+
+
+def prompt_size_report(index, store=None, depth_level: str = "Intermediate", k: int = DEFAULT_TOP_K,
+                       semantic_index=None, graph=None) -> Dict[str, Dict[str, float]]:
+    """Input tokens per research type for each prompt variant, plus retrieval latency.
+
+    Pass the semantic index and cross-reference graph the app uses, so the
+    context measured is the context the app sends.
+    """
+    system_tokens = estimate_tokens(get_system_message())
+    report = {}
+    for research_type in REQUEST_TEMPLATES:
+        user_input = SAMPLE_INPUTS[research_type]
+        start = time.perf_counter()
+        context = get_verse_context(user_input, index, store, k, semantic_index, graph)
+        retrieval_ms = (time.perf_counter() - start) * 1000
+        row = {"retrieval_ms": retrieval_ms, "context_tokens": estimate_tokens(context)}
+        for name, (prefix, suffix) in _variants(research_type, user_input, depth_level, context).items():
+            row[f"{name}_input"] = system_tokens + estimate_tokens(prefix) + estimate_tokens(suffix)
+        report[research_type] = row
+    return report
+
+
+def benchmark_live(client, index, store=None, depth_level: str = "Intermediate",
+                   max_tokens: int = 2000, k: int = DEFAULT_TOP_K, semantic_index=None,
+                   graph=None) -> List[Dict]:
+    """Send every prompt variant for each research type and record API usage and wall time.
+
+    The three variants share nothing in the response cache, so each is a
+    real model call. Output tokens are where references and retrieval save
+    the most: the model no longer writes verse text out.
+    """
+    from utils.claude_client import calculate_usage_cost
+
+    system_message = get_system_message()
+    rows = []
+    for research_type in REQUEST_TEMPLATES:
+        user_input = SAMPLE_INPUTS[research_type]
+        start = time.perf_counter()
+        context = get_verse_context(user_input, index, store, k, semantic_index, graph)
+        retrieval_s = time.perf_counter() - start
+        for name, (prefix, suffix) in _variants(research_type, user_input, depth_level, context).items():
+            start = time.perf_counter()
+            message = client.create_message(suffix, system_message, max_tokens=max_tokens, cached_prefix=prefix)
+            elapsed = time.perf_counter() - start + (retrieval_s if name == "retrieval" else 0.0)
+            rows.append({
+                "research_type": research_type,
+                "variant": name,
+                "input_tokens": message.usage.input_tokens,
+                "output_tokens": message.usage.output_tokens,
+                "latency_s": elapsed,
+                "cost": calculate_usage_cost(message.usage),
+            })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from utils.cross_references import get_cross_references
+    from utils.semantic_index import get_semantic_index
+    from utils.verse_search import get_verse_index
+    from utils.verse_store import get_verse_store
+
+    parser = argparse.ArgumentParser(description="Measure retrieval-augmented research prompts.")
+    parser.add_argument("--live", action="store_true", help="call the API (needs CLAUDE_API_KEY)")
+    parser.add_argument("-k", type=int, default=DEFAULT_TOP_K, help="verses to retrieve")
+    args = parser.parse_args(argv)
+
+    index, store = get_verse_index(), get_verse_store()
+    if index is None:
+        print("No Bible text installed (see README); retrieval adds no context.", file=sys.stderr)
+    # Semantic hits only apply to topics and graph links only to references, as in the app
+    sources = {"semantic_index": get_semantic_index(), "graph": get_cross_references()}
+
+    for research_type, row in prompt_size_report(index, store, k=args.k, **sources).items():
+        print(f"{research_type:>26}: input tokens full text {row['full_text_input']}, "
+              f"references {row['references_input']}, retrieval {row['retrieval_input']} "
+              f"(+{row['context_tokens']} context, {row['retrieval_ms']:.1f} ms)")
+
+    if args.live:
+        from utils.claude_client import get_claude_client
+
+        api_key = os.environ.get("CLAUDE_API_KEY")
+        if not api_key:
+            print("Set CLAUDE_API_KEY to run --live.", file=sys.stderr)
+            return 1
+        for row in benchmark_live(get_claude_client(api_key), index, store, k=args.k, **sources):
+            print(f"{row['research_type']:>26} {row['variant']:>10}: in {row['input_tokens']:5d} "
+                  f"out {row['output_tokens']:5d}  {row['latency_s']:5.1f} s  ${row['cost']:.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
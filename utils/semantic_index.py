@@ -0,0 +1,443 @@
+"""Offline semantic search: TF-IDF + truncated SVD (latent semantic analysis) on the CPU.
+
+Passages are embedded into a low-dimensional space where verses that share
+vocabulary with related words land close together, so a topic like "fear
+and worry" also finds verses about trouble and trust that contain neither
+word. Only NumPy is needed.
+
+    python -m utils.semantic_index   # exact vs IVF search benchmark at 31k and 300k passages
+"""
+
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.response_cache import CACHE_DIR
+from utils.verse_corpus import DEFAULT_TRANSLATION, corpus_path, load_verse_corpus
+from utils.verse_search import tokenize
+
+INDEX_FORMAT_VERSION = 1
+INDEX_DIR = os.path.join(CACHE_DIR, "semantic_index")
+
+DEFAULT_COMPONENTS = 128
+MAX_VOCABULARY = 30_000
+MIN_DOC_FREQ = 2
+# Inverted lists: 4 * sqrt(passages) lists, 16 of them scanned per query
+LISTS_PER_SQRT_PASSAGE = 4
+DEFAULT_NPROBE = 16
+# Up to this many passages an exact scan costs a few milliseconds, so IVF's recall loss buys nothing
+EXACT_SEARCH_MAX_PASSAGES = 100_000
+# Rows scored per block in exact search; bounds the float32 copy of the float16 matrix
+ROW_BLOCK = 65_536
+
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from had hath have he her him his i if in into is it its me my no not
+o of on or our shall she so that the thee their them then there these they thou thy to unto up upon us
+was we were what when which who will with ye you your
+""".split())
+_SUFFIXES = ("ness", "ing", "eth", "est", "ed", "es", "ly", "s")
+
+
+def stem(token: str) -> str:
+    """Strip one common English or KJV suffix ("loveth", "loved", "loves" -> "lov").
+
+    Deliberately more aggressive than utils.word_index.normalize_gloss: verse
+    text is full of KJV endings ("-eth", "-est") that modern lexicon glosses
+    never have, and a false merge here only blurs a vector slightly, whereas
+    a false merge of glosses ("honest" with "hone") shows wrong lemmas.
+    """
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    return token[:-1] if token.endswith("e") and len(token) > 3 else token
+
+
+def analyze(text: str) -> List[str]:
+    return [stem(token) for token in tokenize(text) if token not in _STOPWORDS]
+
+
+def _sparse_dot(ptr: np.ndarray, index: np.ndarray, data: np.ndarray, dense: np.ndarray) -> np.ndarray:
+    """(CSR matrix) @ dense: one weighted np.bincount per output column"""
+    segments = np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))
+    columns = np.ascontiguousarray(dense.T)
+    out = np.empty((dense.shape[1], len(ptr) - 1), dtype=np.float32)
+    for j, column in enumerate(columns):
+        out[j] = np.bincount(segments, weights=column[index] * data, minlength=len(ptr) - 1)
+    return out.T
+
+
+def _orthonormalize(matrix: np.ndarray) -> np.ndarray:
+    """Orthonormal basis of the columns; Cholesky QR is about twice as fast as Householder here"""
+    try:
+        factor = np.linalg.cholesky((matrix.T @ matrix).astype(np.float64))
+        return np.linalg.solve(factor, matrix.T.astype(np.float64)).T.astype(np.float32)
+    except np.linalg.LinAlgError:
+        return np.linalg.qr(matrix)[0]
+
+
+def _randomized_svd(csr, csc, n_components: int, oversample: int = 10, power_iterations: int = 2,
+                    seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Truncated SVD of a sparse matrix given as CSR (rows) and CSC (columns) triples (Halko et al.)"""
+    rng = np.random.default_rng(seed)
+    width = n_components + oversample
+    terms = len(csc[0]) - 1
+    q = _orthonormalize(_sparse_dot(*csr, rng.standard_normal((terms, width)).astype(np.float32)))
+    for _ in range(power_iterations):
+        z = _orthonormalize(_sparse_dot(*csc, q))
+        q = _orthonormalize(_sparse_dot(*csr, z))
+    # B = Q^T X is small (width x terms); its SVD gives X's leading factors
+    u_b, singular_values, v_t = np.linalg.svd(_sparse_dot(*csc, q).T, full_matrices=False)
+    return (q @ u_b)[:, :n_components], singular_values[:n_components], v_t[:n_components].T
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, block: int = 8192) -> np.ndarray:
+    """Index of the most similar centroid for each row, in blocks to bound the score matrix"""
+    return np.concatenate([np.argmax(np.asarray(vectors[i:i + block], dtype=np.float32) @ centroids.T, axis=1)
+                           for i in range(0, len(vectors), block)])
+
+
+def _spherical_kmeans(vectors: np.ndarray, n_lists: int, iterations: int = 8, seed: int = 0) -> np.ndarray:
+    """Unit-length centroids for an inverted-file index, trained on a sample of the rows"""
+    rng = np.random.default_rng(seed)
+    sample = min(len(vectors), max(50_000, 32 * n_lists))
+    rows = vectors[rng.choice(len(vectors), size=sample, replace=False)].astype(np.float32)
+    centroids = rows[rng.choice(len(rows), size=n_lists, replace=False)]
+    for _ in range(iterations):
+        assignment = _nearest_centroids(rows, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, rows)
+        empty = np.flatnonzero(~sums.any(axis=1))
+        # Restart empty lists from random rows so no list is wasted
+        sums[empty] = rows[rng.choice(len(rows), size=len(empty), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class SemanticIndex:
+    """Unit-length passage vectors with exact and IVF top-k search.
+
+    `vectors` (passages x components, float16) is stored as a .npy file and
+    memory-mapped, so every process shares its pages. Rows are grouped by
+    inverted list: `list_ptr` gives each list's contiguous row range and
+    `row_docs` maps rows back to passage numbers. Exact search scores every
+    row in blocks (many queries at once as one matrix product); IVF search
+    scores only the `nprobe` lists whose centroids are closest to the query.
+    Unless `exact` is given, indexes up to EXACT_SEARCH_MAX_PASSAGES (a
+    single Bible) are searched exactly and larger ones with IVF.
+    """
+
+    ARRAYS = ("vocab", "idf", "term_vectors", "centroids", "list_ptr", "row_docs")
+
+    def __init__(self, arrays: Dict[str, np.ndarray], vectors: np.ndarray):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.vectors = vectors
+        self.term_ids = {term: i for i, term in enumerate(self.vocab.tolist())}
+
+    @classmethod
+    def build(cls, texts: Sequence[str], n_components: int = DEFAULT_COMPONENTS,
+              n_lists: Optional[int] = None, seed: int = 0) -> "SemanticIndex":
+        """Embed passages (given in document order) and build the inverted lists"""
+        # Surface token -> term id (-1 for stopwords), so each distinct word is stemmed once
+        token_terms: Dict[str, int] = {}
+        term_ids: Dict[str, int] = {}
+        token_ids, lengths = [], []
+        for text in texts:
+            ids = []
+            for token in tokenize(text):
+                term = token_terms.get(token)
+                if term is None:
+                    term = -1 if token in _STOPWORDS else term_ids.setdefault(stem(token), len(term_ids))
+                    token_terms[token] = term
+                if term >= 0:
+                    ids.append(term)
+            token_ids.extend(ids)
+            lengths.append(len(ids))
+        if not token_ids:
+            raise ValueError("no indexable text")
+        terms = np.array(list(term_ids), dtype=str)
+        term_of_token = np.array(token_ids, dtype=np.int64)
+        doc_of_token = np.repeat(np.arange(len(texts)), lengths)
+        documents = texts
+
+        # (doc, term) counts, then keep the most widespread terms that occur in >= MIN_DOC_FREQ passages
+        pairs, tf = np.unique(doc_of_token.astype(np.int64) * len(terms) + term_of_token, return_counts=True)
+        pair_docs, pair_terms = pairs // len(terms), pairs % len(terms)
+        df = np.bincount(pair_terms, minlength=len(terms))
+        candidates = np.flatnonzero(df >= MIN_DOC_FREQ)
+        kept = np.sort(candidates[np.argsort(-df[candidates], kind="stable")[:MAX_VOCABULARY]])
+        remap = np.full(len(terms), -1, dtype=np.int64)
+        remap[kept] = np.arange(len(kept))
+        keep = remap[pair_terms] >= 0
+        pair_docs, pair_terms, tf = pair_docs[keep], remap[pair_terms[keep]], tf[keep]
+
+        idf = (np.log((1 + len(documents)) / (1 + df[kept])) + 1).astype(np.float32)
+        data = ((1 + np.log(tf)) * idf[pair_terms]).astype(np.float32)
+        doc_norms = np.sqrt(np.bincount(pair_docs, weights=data.astype(np.float64) ** 2, minlength=len(documents)))
+        data /= np.where(doc_norms > 0, doc_norms, 1)[pair_docs].astype(np.float32)
+
+        doc_ptr = np.zeros(len(documents) + 1, dtype=np.int64)
+        doc_ptr[1:] = np.cumsum(np.bincount(pair_docs, minlength=len(documents)))
+        by_term = np.argsort(pair_terms, kind="stable")
+        term_ptr = np.zeros(len(kept) + 1, dtype=np.int64)
+        term_ptr[1:] = np.cumsum(np.bincount(pair_terms, minlength=len(kept)))
+        csr = (doc_ptr, pair_terms, data)
+        csc = (term_ptr, pair_docs[by_term], data[by_term])
+
+        n_components = min(n_components, len(kept) - 1, len(documents) - 1)
+        u, s, term_vectors = _randomized_svd(csr, csc, n_components, seed=seed)
+        vectors = _normalize(u * s).astype(np.float32)
+
+        if n_lists is None:
+            n_lists = int(LISTS_PER_SQRT_PASSAGE * np.sqrt(len(documents)))
+        centroids = _spherical_kmeans(vectors, max(1, min(n_lists, len(documents))), seed=seed)
+        assignment = _nearest_centroids(vectors, centroids)
+        row_docs = np.argsort(assignment, kind="stable")
+        list_ptr = np.zeros(len(centroids) + 1, dtype=np.int64)
+        list_ptr[1:] = np.cumsum(np.bincount(assignment, minlength=len(centroids)))
+
+        return cls({
+            "vocab": terms[kept],
+            "idf": idf,
+            "term_vectors": term_vectors.astype(np.float32),
+            "centroids": centroids.astype(np.float32),
+            "list_ptr": list_ptr,
+            "row_docs": row_docs,
+        }, vectors[row_docs].astype(np.float16))
+
+    def save(self, directory: str):
+        tmp_dir = directory + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "vectors.npy"), np.asarray(self.vectors))
+        np.savez(os.path.join(tmp_dir, "index.npz"), **{name: getattr(self, name) for name in self.ARRAYS})
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load(cls, directory: str) -> "SemanticIndex":
+        with np.load(os.path.join(directory, "index.npz"), allow_pickle=False) as data:
+            arrays = {name: data[name] for name in cls.ARRAYS}
+        return cls(arrays, np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r"))
+
+    @property
+    def passage_count(self) -> int:
+        return len(self.row_docs)
+
+    def embed(self, queries: Sequence[str]) -> np.ndarray:
+        """Unit vectors for queries (zero rows where no query word is in the vocabulary)"""
+        out = np.zeros((len(queries), self.term_vectors.shape[1]), dtype=np.float32)
+        for i, query in enumerate(queries):
+            ids, counts = np.unique([self.term_ids[t] for t in analyze(query) if t in self.term_ids],
+                                    return_counts=True)
+            if len(ids):
+                weights = (1 + np.log(counts)) * self.idf[ids.astype(np.int64)]
+                out[i] = weights @ self.term_vectors[ids.astype(np.int64)]
+        return _normalize(out)
+
+    def _top_rows(self, scores: np.ndarray, k: int) -> np.ndarray:
+        if len(scores) > k:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def search_vectors(self, query_vectors: np.ndarray, k: int = 10, exact: Optional[bool] = None,
+                       nprobe: int = DEFAULT_NPROBE) -> List[List[Tuple[int, float]]]:
+        """Top-k (passage, cosine) for each query vector"""
+        if exact is None:
+            exact = self.passage_count <= EXACT_SEARCH_MAX_PASSAGES
+        if exact:
+            # One pass over the matrix for the whole batch: blocks x queries scores
+            best_rows = np.zeros((len(query_vectors), 0), dtype=np.int64)
+            best_scores = np.zeros((len(query_vectors), 0), dtype=np.float32)
+            for start in range(0, self.passage_count, ROW_BLOCK):
+                block = np.asarray(self.vectors[start:start + ROW_BLOCK], dtype=np.float32)
+                scores = np.concatenate([best_scores, (block @ query_vectors.T).T], axis=1)
+                rows = np.concatenate([best_rows, np.broadcast_to(
+                    np.arange(start, start + len(block)), (len(query_vectors), len(block)))], axis=1)
+                keep = np.argpartition(-scores, min(k, scores.shape[1]) - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(scores, keep, axis=1)
+                best_rows = np.take_along_axis(rows, keep, axis=1)
+            results = []
+            for rows, scores in zip(best_rows, best_scores):
+                order = np.argsort(-scores, kind="stable")
+                results.append([(int(self.row_docs[rows[i]]), float(scores[i])) for i in order if scores[i] > 0])
+            return results
+
+        results = []
+        list_scores = query_vectors @ self.centroids.T
+        for query, centroid_scores in zip(query_vectors, list_scores):
+            lists = self._top_rows(centroid_scores, nprobe)
+            rows = np.concatenate([np.arange(self.list_ptr[i], self.list_ptr[i + 1]) for i in lists])
+            scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+            top = self._top_rows(scores, k)
+            results.append([(int(self.row_docs[rows[i]]), float(scores[i])) for i in top if scores[i] > 0])
+        return results
+
+    def search(self, query: str, k: int = 10, exact: Optional[bool] = None,
+               nprobe: int = DEFAULT_NPROBE) -> List[Tuple[int, float]]:
+        return self.search_vectors(self.embed([query]), k, exact, nprobe)[0]
+
+
+def _index_dir(translation: str) -> Optional[str]:
+    source = corpus_path(translation)
+    if not os.path.exists(source):
+        return None
+    stat = os.stat(source)
+    return os.path.join(INDEX_DIR, f"{translation}-v{INDEX_FORMAT_VERSION}-{stat.st_mtime_ns}-{stat.st_size}")
+
+
+_indexes: Dict[str, SemanticIndex] = {}
+_index_dirs: Dict[str, str] = {}
+_indexes_lock = threading.Lock()
+_builders: Dict[str, threading.Thread] = {}
+_builders_lock = threading.Lock()
+
+
+def get_semantic_index(translation: str = DEFAULT_TRANSLATION, wait: bool = True) -> Optional[SemanticIndex]:
+    """Return the process-wide semantic index over a translation's verses, or None if it isn't installed.
+
+    Passage numbers are verse positions in canonical order, the same
+    document numbers VerseSearchIndex uses. Built on first use and kept
+    under .cache/semantic_index/ keyed by the corpus file's mtime and size.
+    With wait=False an index that isn't loaded yet is built or loaded on a
+    background thread and None is returned until it is ready.
+    """
+    directory = _index_dir(translation)
+    if directory is None:
+        return None
+    if _index_dirs.get(translation) == directory:
+        return _indexes[translation]
+    if not wait:
+        with _builders_lock:
+            builder = _builders.get(translation)
+            if builder is None or not builder.is_alive():
+                builder = threading.Thread(target=get_semantic_index, args=(translation,),
+                                           name=f"semantic-index-{translation}", daemon=True)
+                _builders[translation] = builder
+                builder.start()
+        return None
+
+    with _indexes_lock:
+        if _index_dirs.get(translation) != directory:
+            if os.path.exists(os.path.join(directory, "vectors.npy")):
+                index = SemanticIndex.load(directory)
+            else:
+                index = SemanticIndex.build([verse.text for verse in load_verse_corpus(translation)])
+                index.save(directory)
+                index = SemanticIndex.load(directory)
+            _indexes[translation] = index
+            _index_dirs[translation] = directory
+        return _indexes[translation]
+
+
+def semantic_verse_search(query: str, limit: int = 10, translation: str = DEFAULT_TRANSLATION,
+                          wait: bool = True) -> List[Dict]:
+    """Verses closest in meaning to the query, shaped like VerseSearchIndex.search results.
+
+    With wait=False nothing is returned while the index is still being built
+    (see get_semantic_index).
+    """
+    from utils.verse_search import get_verse_index
+
+    index, verse_index = get_semantic_index(translation, wait=wait), get_verse_index(translation)
+    if index is None or verse_index is None:
+        return []
+    results = []
+    for doc, score in index.search(query, k=limit):
+        verse = verse_index.verse(doc)
+        verse["score"] = score
+        results.append(verse)
+    return results
+
+
+def _synthetic_passages(count: int, commentary_share: float = 0.0, topics: int = 400,
+                        vocabulary: int = 20_000, seed: int = 3) -> Tuple[List[str], List[np.ndarray]]:
+    """Topic-structured passages: verse-length, plus a share of longer commentary chunks.
+
+    Each passage mixes words from one topic's vocabulary with Zipf-distributed
+    background words; returns the texts and each topic's word ids for queries.
+    """
+    rng = np.random.default_rng(seed)
+    topic_words = [rng.choice(vocabulary, size=60, replace=False) for _ in range(topics)]
+    texts = []
+    for i in range(count):
+        commentary = i >= count * (1 - commentary_share)
+        length = int(rng.integers(60, 150) if commentary else rng.integers(10, 40))
+        topical = rng.choice(topic_words[int(rng.integers(topics))], size=length // 2)
+        background = np.minimum(rng.zipf(1.3, size=length - len(topical)), vocabulary) - 1
+        texts.append(" ".join(f"w{w}" for w in np.concatenate([topical, background])))
+    return texts, topic_words
+
+
+def benchmark_semantic(sizes: Sequence[Tuple[int, float]] = ((31_102, 0.0), (300_000, 0.9)),
+                       queries: int = 200, k: int = 10, nprobes: Sequence[int] = (8, 16, 32)) -> List[Dict]:
+    """Build time, exact and IVF query latency (ms), and IVF recall@k against exact search.
+
+    The 300k corpus is 31k verse-length passages plus commentary-length
+    chunks. Latency is per single query; `exact_batch_ms` is the per-query
+    cost when 64 queries are scored in one pass.
+    """
+    results = []
+    for count, commentary_share in sizes:
+        texts, topic_words = _synthetic_passages(count, commentary_share)
+        start = time.perf_counter()
+        index = SemanticIndex.build(texts)
+        build_s = time.perf_counter() - start
+
+        directory = os.path.join(INDEX_DIR, f"benchmark-{count}")
+        index.save(directory)
+        index = SemanticIndex.load(directory)
+        try:
+            rng = np.random.default_rng(5)
+            query_texts = [" ".join(f"w{w}" for w in rng.choice(topic_words[int(rng.integers(len(topic_words)))],
+                                                                size=3, replace=False))
+                           for _ in range(queries)]
+            query_vectors = index.embed(query_texts)
+            row = {"passages": count, "build_s": build_s,
+                   "vectors_mb": index.vectors.nbytes / (1024 * 1024)}
+
+            exact, samples = [], []
+            for vector in query_vectors:
+                start = time.perf_counter()
+                exact.append(index.search_vectors(vector[None], k, exact=True)[0])
+                samples.append((time.perf_counter() - start) * 1000)
+            row["exact_p50_ms"], row["exact_p95_ms"] = np.percentile(samples, [50, 95])
+
+            start = time.perf_counter()
+            for i in range(0, queries, 64):
+                index.search_vectors(query_vectors[i:i + 64], k, exact=True)
+            row["exact_batch_ms"] = (time.perf_counter() - start) * 1000 / queries
+
+            for nprobe in nprobes:
+                samples, recall = [], []
+                for vector, truth in zip(query_vectors, exact):
+                    start = time.perf_counter()
+                    found = index.search_vectors(vector[None], k, exact=False, nprobe=nprobe)[0]
+                    samples.append((time.perf_counter() - start) * 1000)
+                    if truth:
+                        recall.append(len({d for d, _ in found} & {d for d, _ in truth}) / len(truth))
+                row[f"ivf{nprobe}_p50_ms"], row[f"ivf{nprobe}_p95_ms"] = np.percentile(samples, [50, 95])
+                row[f"ivf{nprobe}_recall"] = float(np.mean(recall)) if recall else 0.0
+            results.append(row)
+        finally:
+            del index
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    for row in benchmark_semantic():
+        print(", ".join(f"{key} {value:.2f}" if isinstance(value, float) else f"{key} {value}"
+                        for key, value in row.items()))
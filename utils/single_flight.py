@@ -0,0 +1,170 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running wait for it and receive the same result, or
+    the same exception. Nothing is remembered after the call finishes, so
+    this complements the response cache rather than replacing it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.unique = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn() once per key at a time; returns (result, shared).
+
+        `shared` is False for the leader and True for callers that received
+        the leader's result, so callers can attribute cost only once.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.unique += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.unique + self.coalesced
+            return {
+                "unique": self.unique,
+                "coalesced": self.coalesced,
+                "coalesced_rate": self.coalesced / total if total else 0.0,
+                "in_flight": len(self._calls),
+                "max_waiters": self.max_waiters,
+            }
+
+
+def flight_key(cache_key: str, mode: str, api_key: Optional[str]) -> str:
+    """Single-flight key for a research request.
+
+    Callers only join a leader that returns the same shape (`mode`, e.g.
+    "stream" or "message") and calls with the same API key, so one key's
+    auth or quota error, or its bill, never reaches another key's session.
+    """
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    return f"{mode}:{key_hash}:{cache_key}"
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide SingleFlight used for research requests"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
+
+
+def benchmark_coalescing(sessions: int = 20, upstream_latency: float = 0.5) -> Dict[str, float]:
+    """Simulate a class of `sessions` users submitting the same passage at once.
+
+    Returns upstream calls made and wall time with and without coalescing.
+    """
+    def run(flight: Optional[SingleFlight]):
+        upstream_calls = []
+
+        def upstream():
+            upstream_calls.append(1)
+            time.sleep(upstream_latency)
+            return "research"
+
+        def session(_):
+            return flight.do("John 3:16", upstream) if flight else (upstream(), False)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions) as executor:
+            list(executor.map(session, range(sessions)))
+        return len(upstream_calls), time.perf_counter() - start
+
+    plain_calls, plain_s = run(None)
+    coalesced_calls, coalesced_s = run(SingleFlight())
+    return {
+        "sessions": sessions,
+        "upstream_calls_without": plain_calls,
+        "upstream_calls_with": coalesced_calls,
+        "wall_s_without": plain_s,
+        "wall_s_with": coalesced_s,
+    }
+
+
+def check_key_isolation(upstream_latency: float = 0.2) -> Dict[str, int]:
+    """Regression check: concurrent calls share a leader only when mode and API key match.
+
+    Starts streamed and plain calls for the same prompt under two API keys
+    at once; each (mode, key) pair must make exactly one upstream call and
+    every caller must get its own mode's result shape.
+    """
+    flight = SingleFlight()
+    calls: Dict[str, int] = {}
+    calls_lock = threading.Lock()
+
+    def request(mode: str, api_key: str):
+        def upstream():
+            with calls_lock:
+                calls[f"{mode}/{api_key}"] = calls.get(f"{mode}/{api_key}", 0) + 1
+            time.sleep(upstream_latency)
+            return ("text", 0.01, 0.1) if mode == "stream" else ("text", 0.01)
+        result, _ = flight.do(flight_key("same prompt", mode, api_key), upstream)
+        assert len(result) == (3 if mode == "stream" else 2), f"{mode} caller got a {len(result)}-tuple"
+
+    requests = [(mode, api_key) for mode in ("stream", "message") for api_key in ("key-a", "key-b")] * 3
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        list(executor.map(lambda args: request(*args), requests))
+    assert sorted(calls.values()) == [1, 1, 1, 1], calls
+    return calls
+
+
+if __name__ == "__main__":
+    print(benchmark_coalescing())
+    print(check_key_isolation())
@@ -0,0 +1,64 @@
+import os
+from typing import Iterator, List, NamedTuple, Optional
+
+from utils.bible_books import BOOK_ORDINALS, normalize_book_name
+from utils.lexicon_store import DATA_DIR
+
+# Verse text lives in data/bible/<TRANSLATION>.tsv, one verse per line:
+#   Book<TAB>Chapter<TAB>Verse<TAB>Text
+# Book may be any name or abbreviation normalize_book_name() understands.
+# Only public-domain translations (KJV, WEB, ...) should be placed here.
+BIBLE_TEXT_DIR = os.path.join(DATA_DIR, "bible")
+DEFAULT_TRANSLATION = "KJV"
+
+
+class Verse(NamedTuple):
+    book: str
+    chapter: int
+    verse: int
+    text: str
+
+    @property
+    def reference(self) -> str:
+        return f"{self.book} {self.chapter}:{self.verse}"
+
+    @property
+    def book_ordinal(self) -> int:
+        return BOOK_ORDINALS[self.book]
+
+
+def corpus_path(translation: str = DEFAULT_TRANSLATION) -> str:
+    return os.path.join(BIBLE_TEXT_DIR, f"{translation}.tsv")
+
+
+def available_translations() -> List[str]:
+    """Translations with a verse file in data/bible/"""
+    if not os.path.isdir(BIBLE_TEXT_DIR):
+        return []
+    return sorted(name[:-4] for name in os.listdir(BIBLE_TEXT_DIR) if name.endswith(".tsv"))
+
+
+def iter_verse_file(path: str) -> Iterator[Verse]:
+    """Yield verses from a TSV file, skipping blank lines and '#' comments"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.split("\t", 3)
+            if len(parts) != 4:
+                raise ValueError(f"{path}:{line_number}: expected 4 tab-separated columns")
+            book = normalize_book_name(parts[0])
+            if book is None:
+                raise ValueError(f"{path}:{line_number}: unknown book '{parts[0]}'")
+            yield Verse(book, int(parts[1]), int(parts[2]), parts[3].strip())
+
+
+def load_verse_corpus(translation: str = DEFAULT_TRANSLATION) -> Optional[List[Verse]]:
+    """Load a translation in canonical order, or None if its file is not installed"""
+    path = corpus_path(translation)
+    if not os.path.exists(path):
+        return None
+    verses = list(iter_verse_file(path))
+    verses.sort(key=lambda v: (v.book_ordinal, v.chapter, v.verse))
+    return verses
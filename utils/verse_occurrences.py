@@ -0,0 +1,233 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.bible_books import BIBLE_BOOKS, BOOK_ORDINALS, normalize_book_name
+from utils.lexicon_store import DATA_DIR
+from utils.response_cache import CACHE_DIR
+
+# Verse-level lemma occurrences, one per line (a repeated line counts twice):
+#   lemma<TAB>book<TAB>chapter<TAB>verse
+# Book may be any name normalize_book_name() understands. Blank lines and
+# '#' comments are ignored.
+VERSE_OCCURRENCES_PATH = os.path.join(DATA_DIR, "lemma_verses.tsv")
+STORE_FORMAT_VERSION = 1
+STORE_DIR = os.path.join(CACHE_DIR, "verse_occurrences")
+
+# A verse key sorts in canonical order and needs no versification table:
+# book ordinal * BOOK_STRIDE + chapter * CHAPTER_STRIDE + verse
+BOOK_STRIDE = 1_000_000
+CHAPTER_STRIDE = 1_000
+
+
+def verse_key(book_ordinal: int, chapter: int, verse: int) -> int:
+    return book_ordinal * BOOK_STRIDE + chapter * CHAPTER_STRIDE + verse
+
+
+def split_verse_key(key: int) -> Tuple[str, int, int]:
+    """(book, chapter, verse) for a verse key"""
+    key = int(key)
+    return BIBLE_BOOKS[key // BOOK_STRIDE], key % BOOK_STRIDE // CHAPTER_STRIDE, key % CHAPTER_STRIDE
+
+
+def _key_range(book: str, chapter: Optional[int] = None, end_chapter: Optional[int] = None) -> Tuple[int, int]:
+    """[low, high) verse keys covering a book, one chapter, or chapters chapter..end_chapter"""
+    ordinal = BOOK_ORDINALS[book]
+    if chapter is None:
+        return ordinal * BOOK_STRIDE, (ordinal + 1) * BOOK_STRIDE
+    last = end_chapter if end_chapter is not None else chapter
+    return verse_key(ordinal, chapter, 0), verse_key(ordinal, last + 1, 0)
+
+
+class VerseOccurrenceStore:
+    """Lemma -> sorted verse keys, stored CSR-style in two flat arrays.
+
+    Every count over a book, chapter or chapter range is two binary searches
+    per lemma (np.searchsorted on the lemma's slice), so any subset
+    aggregates without scanning occurrences.
+    """
+
+    ARRAYS = ("lemmas", "lemma_ptr", "keys")
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        for name in self.ARRAYS:
+            arrays[name].setflags(write=False)
+            setattr(self, name, arrays[name])
+        self._lemma_ids = {lemma: i for i, lemma in enumerate(self.lemmas.tolist())}
+        self._book_bounds = np.arange(len(BIBLE_BOOKS) + 1, dtype=np.int64) * BOOK_STRIDE
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, int, int, int]]) -> "VerseOccurrenceStore":
+        """Build from (lemma, book ordinal, chapter, verse) rows in any order"""
+        by_lemma: Dict[str, List[int]] = {}
+        for lemma, book_ordinal, chapter, verse in rows:
+            by_lemma.setdefault(lemma, []).append(verse_key(book_ordinal, chapter, verse))
+        lemmas = sorted(by_lemma)
+        lemma_ptr = np.zeros(len(lemmas) + 1, dtype=np.int64)
+        lemma_ptr[1:] = np.cumsum([len(by_lemma[lemma]) for lemma in lemmas])
+        keys = np.zeros(int(lemma_ptr[-1]), dtype=np.int64)
+        for i, lemma in enumerate(lemmas):
+            keys[lemma_ptr[i]:lemma_ptr[i + 1]] = np.sort(np.array(by_lemma[lemma], dtype=np.int64))
+        return cls({
+            "lemmas": np.array(lemmas, dtype=str) if lemmas else np.zeros(0, dtype="<U1"),
+            "lemma_ptr": lemma_ptr,
+            "keys": keys,
+        })
+
+    @classmethod
+    def from_tsv(cls, path: str) -> "VerseOccurrenceStore":
+        return cls.build(iter_occurrence_file(path))
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "VerseOccurrenceStore":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in cls.ARRAYS})
+
+    def __contains__(self, lemma: str) -> bool:
+        return lemma in self._lemma_ids
+
+    def lemma_keys(self, lemma: str) -> np.ndarray:
+        """Sorted verse keys of one lemma (empty if unknown)"""
+        i = self._lemma_ids.get(lemma)
+        if i is None:
+            return self.keys[:0]
+        return self.keys[self.lemma_ptr[i]:self.lemma_ptr[i + 1]]
+
+    def count(self, lemmas: Iterable[str], book: str, chapter: Optional[int] = None,
+              end_chapter: Optional[int] = None) -> int:
+        """Occurrences of the lemmas in a book, a chapter, or a chapter range"""
+        low, high = _key_range(book, chapter, end_chapter)
+        total = 0
+        for lemma in lemmas:
+            keys = self.lemma_keys(lemma)
+            total += int(np.searchsorted(keys, high) - np.searchsorted(keys, low))
+        return total
+
+    def book_counts(self, lemmas: Iterable[str]) -> np.ndarray:
+        """Per-book totals (length 66) for the lemmas"""
+        totals = np.zeros(len(BIBLE_BOOKS), dtype=np.int64)
+        for lemma in lemmas:
+            totals += np.diff(np.searchsorted(self.lemma_keys(lemma), self._book_bounds))
+        return totals
+
+    def _keys_in(self, lemmas: Iterable[str], low: int, high: int) -> np.ndarray:
+        parts = []
+        for lemma in lemmas:
+            keys = self.lemma_keys(lemma)
+            parts.append(keys[np.searchsorted(keys, low):np.searchsorted(keys, high)])
+        return np.sort(np.concatenate(parts)) if parts else self.keys[:0]
+
+    def chapter_histogram(self, lemmas: Iterable[str], book: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(chapter numbers, occurrences) for chapters of a book where the lemmas occur"""
+        keys = self._keys_in(lemmas, *_key_range(book))
+        chapters, counts = np.unique(keys % BOOK_STRIDE // CHAPTER_STRIDE, return_counts=True)
+        return chapters, counts
+
+    def verses(self, lemmas: Iterable[str], book: str, chapter: Optional[int] = None) -> List[Tuple[str, int, int, int]]:
+        """(book, chapter, verse, occurrences) in canonical order for a book or chapter"""
+        keys = self._keys_in(lemmas, *_key_range(book, chapter))
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        return [split_verse_key(key) + (int(count),) for key, count in zip(unique_keys, counts)]
+
+
+def iter_occurrence_file(path: str):
+    """Yield (lemma, book ordinal, chapter, verse) from a lemma_verses.tsv file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.split("\t")
+            if len(parts) != 4:
+                raise ValueError(f"{path}:{line_number}: expected 4 tab-separated columns")
+            book = normalize_book_name(parts[1])
+            if book is None:
+                raise ValueError(f"{path}:{line_number}: unknown book '{parts[1]}'")
+            chapter, verse = int(parts[2]), int(parts[3])
+            if not (0 < chapter < BOOK_STRIDE // CHAPTER_STRIDE and 0 < verse < CHAPTER_STRIDE):
+                raise ValueError(f"{path}:{line_number}: chapter or verse out of range")
+            yield parts[0].strip(), BOOK_ORDINALS[book], chapter, verse
+
+
+def _store_path(source: str) -> str:
+    stat = os.stat(source)
+    return os.path.join(STORE_DIR, f"v{STORE_FORMAT_VERSION}-{stat.st_mtime_ns}-{stat.st_size}.npz")
+
+
+_store: Optional[VerseOccurrenceStore] = None
+_store_path_loaded: Optional[str] = None
+_store_lock = threading.Lock()
+
+
+def get_verse_occurrences(source: str = VERSE_OCCURRENCES_PATH) -> Optional[VerseOccurrenceStore]:
+    """Return the process-wide store, compiling data/lemma_verses.tsv if needed; None if not installed"""
+    global _store, _store_path_loaded
+    if not os.path.exists(source):
+        return None
+    path = _store_path(source)
+    if _store_path_loaded == path:
+        return _store
+    with _store_lock:
+        if _store_path_loaded != path:
+            if os.path.exists(path):
+                store = VerseOccurrenceStore.load(path)
+            else:
+                store = VerseOccurrenceStore.from_tsv(source)
+                store.save(path)
+            _store, _store_path_loaded = store, path
+        return _store
+
+
+def _synthetic_rows(rows: int, lemmas: int = 8000, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    lemma_ids = np.minimum(rng.zipf(1.4, size=rows), lemmas) - 1
+    books = rng.integers(0, len(BIBLE_BOOKS), size=rows)
+    chapters = rng.integers(1, 51, size=rows)
+    verses = rng.integers(1, 41, size=rows)
+    return zip((f"lemma{i}" for i in lemma_ids), books.tolist(), chapters.tolist(), verses.tolist())
+
+
+def benchmark_range_counts(rows: int = 300_000, queries: int = 2000) -> Dict[str, float]:
+    """Latency of book / chapter-range counts for 1-3 lemma selections over synthetic data (µs)"""
+    start = time.perf_counter()
+    store = VerseOccurrenceStore.build(_synthetic_rows(rows))
+    build_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(9)
+    # Frequent lemmas have the longest key arrays, so they are the slowest to search
+    popular = [f"lemma{i}" for i in range(20)]
+    samples = []
+    for _ in range(queries):
+        selection = list(rng.choice(popular, size=int(rng.integers(1, 4)), replace=False))
+        book = BIBLE_BOOKS[int(rng.integers(0, len(BIBLE_BOOKS)))]
+        first = int(rng.integers(1, 40))
+        start = time.perf_counter()
+        store.count(selection, book, first, first + int(rng.integers(0, 10)))
+        samples.append((time.perf_counter() - start) * 1e6)
+
+    start = time.perf_counter()
+    for _ in range(200):
+        store.chapter_histogram(popular[:3], "Psalms")
+    histogram_us = (time.perf_counter() - start) / 200 * 1e6
+
+    samples.sort()
+    return {
+        "rows": rows,
+        "build_s": build_s,
+        "count_p50_us": samples[len(samples) // 2],
+        "count_p99_us": samples[int(len(samples) * 0.99) - 1],
+        "chapter_histogram_us": histogram_us,
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark_range_counts())
@@ -0,0 +1,289 @@
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.bible_books import BIBLE_BOOKS, OT_BOOK_COUNT, normalize_book_name
+from utils.response_cache import CACHE_DIR
+from utils.verse_corpus import DEFAULT_TRANSLATION, Verse, corpus_path, load_verse_corpus
+
+INDEX_FORMAT_VERSION = 1
+INDEX_DIR = os.path.join(CACHE_DIR, "verse_index")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_QUERY_PART = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class VerseSearchIndex:
+    """Positional inverted index over a verse corpus with BM25 ranking.
+
+    Postings are stored CSR-style in flat NumPy arrays (term -> docs, term
+    frequencies, positions), so the index can be saved and reloaded with one
+    np.load instead of being rebuilt on startup. Documents are verses in
+    canonical order, which makes book and testament filters contiguous
+    document ranges.
+    """
+
+    ARRAYS = ("vocab", "term_ptr", "post_docs", "post_tfs", "pos_ptr", "positions",
+              "doc_len", "doc_book", "doc_chapter", "doc_verse", "book_start", "text_blob", "text_ptr")
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.term_ids = {term: i for i, term in enumerate(self.vocab.tolist())}
+        self.doc_count = len(self.doc_len)
+        self.avg_doc_len = float(self.doc_len.mean()) if self.doc_count else 0.0
+        # Positions are < stride, so doc * stride + position is a unique key
+        self._stride = int(self.doc_len.max()) + 1 if self.doc_count else 1
+
+    @classmethod
+    def build(cls, verses: Sequence[Verse]) -> "VerseSearchIndex":
+        """Build an index from verses already sorted in canonical order"""
+        postings: Dict[str, list] = {}
+        doc_len = np.zeros(len(verses), dtype=np.int32)
+        for doc, verse in enumerate(verses):
+            tokens = tokenize(verse.text)
+            doc_len[doc] = len(tokens)
+            term_positions: Dict[str, list] = {}
+            for position, token in enumerate(tokens):
+                term_positions.setdefault(token, []).append(position)
+            for token, token_positions in term_positions.items():
+                postings.setdefault(token, []).append((doc, token_positions))
+
+        vocab = sorted(postings)
+        term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        post_docs, post_tfs, pos_ptr, positions = [], [], [0], []
+        for i, term in enumerate(vocab):
+            for doc, token_positions in postings[term]:
+                post_docs.append(doc)
+                post_tfs.append(len(token_positions))
+                positions.extend(token_positions)
+                pos_ptr.append(len(positions))
+            term_ptr[i + 1] = len(post_docs)
+
+        doc_book = np.array([verse.book_ordinal for verse in verses], dtype=np.int16)
+        book_start = np.searchsorted(doc_book, np.arange(len(BIBLE_BOOKS) + 1)).astype(np.int64)
+
+        encoded = [verse.text.encode("utf-8") for verse in verses]
+        text_ptr = np.zeros(len(verses) + 1, dtype=np.int64)
+        text_ptr[1:] = np.cumsum([len(text) for text in encoded])
+
+        return cls({
+            "vocab": np.array(vocab, dtype=str),
+            "term_ptr": term_ptr,
+            "post_docs": np.array(post_docs, dtype=np.int32),
+            "post_tfs": np.array(post_tfs, dtype=np.int32),
+            "pos_ptr": np.array(pos_ptr, dtype=np.int64),
+            "positions": np.array(positions, dtype=np.int32),
+            "doc_len": doc_len,
+            "doc_book": doc_book,
+            "doc_chapter": np.array([verse.chapter for verse in verses], dtype=np.int16),
+            "doc_verse": np.array([verse.verse for verse in verses], dtype=np.int16),
+            "book_start": book_start,
+            "text_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "text_ptr": text_ptr,
+        })
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "VerseSearchIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in cls.ARRAYS})
+
+    def verse(self, doc: int) -> Dict:
+        """Verse dictionary in the shape the app's verse display functions expect"""
+        text = self.text_blob[self.text_ptr[doc]:self.text_ptr[doc + 1]].tobytes().decode("utf-8")
+        return {
+            'book_name': BIBLE_BOOKS[int(self.doc_book[doc])],
+            'chapter': str(int(self.doc_chapter[doc])),
+            'verse': str(int(self.doc_verse[doc])),
+            'text': text,
+        }
+
+    def _postings(self, term_id: int):
+        start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+        return start, self.post_docs[start:end], self.post_tfs[start:end]
+
+    def _phrase_starts(self, term_id: int, offset: int) -> np.ndarray:
+        """Encoded (doc, phrase start) keys implied by each occurrence of a term at `offset`"""
+        start, docs, tfs = self._postings(term_id)
+        positions = self.positions[self.pos_ptr[start]:self.pos_ptr[start + len(docs)]]
+        keys = np.repeat(docs.astype(np.int64), tfs) * self._stride + positions - offset
+        return keys[positions >= offset]
+
+    def _phrase_docs(self, term_ids: List[int]) -> np.ndarray:
+        """Docs containing the terms consecutively, matched with vectorized set intersections"""
+        starts = self._phrase_starts(term_ids[0], 0)
+        for offset, term_id in enumerate(term_ids[1:], 1):
+            starts = np.intersect1d(starts, self._phrase_starts(term_id, offset), assume_unique=True)
+            if not len(starts):
+                break
+        return np.unique(starts // self._stride)
+
+    def _doc_range(self, book: Optional[str], testament: Optional[str]):
+        if book:
+            canonical = normalize_book_name(book)
+            if canonical is None:
+                return 0, 0
+            ordinal = BIBLE_BOOKS.index(canonical)
+            return int(self.book_start[ordinal]), int(self.book_start[ordinal + 1])
+        if testament:
+            boundary = int(self.book_start[OT_BOOK_COUNT])
+            if testament.upper() in ("OT", "OLD"):
+                return 0, boundary
+            if testament.upper() in ("NT", "NEW"):
+                return boundary, self.doc_count
+            raise ValueError(f"testament must be 'OT' or 'NT', not {testament!r}")
+        return 0, self.doc_count
+
+    def search(self, query: str, limit: int = 10, book: Optional[str] = None,
+               testament: Optional[str] = None) -> List[Dict]:
+        """BM25-ranked verse search.
+
+        Quoted parts of the query are phrases that must appear verbatim
+        (token order); other words are optional terms that add to the score.
+        `book` restricts to one book, `testament` to "OT" or "NT" ("Old" and
+        "New" work too; anything else raises ValueError).
+        """
+        phrases, terms = [], []
+        for phrase, word in _QUERY_PART.findall(query):
+            if phrase:
+                phrases.append(tokenize(phrase))
+            else:
+                terms.extend(tokenize(word))
+
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        for term in set(terms + [token for phrase in phrases for token in phrase]):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            _, docs, tfs = self._postings(term_id)
+            idf = math.log(1 + (self.doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = K1 * (1 - B + B * self.doc_len[docs] / self.avg_doc_len)
+            scores[docs] += idf * tfs * (K1 + 1) / (tfs + norm)
+
+        for phrase in phrases:
+            if not phrase:
+                continue
+            term_ids = [self.term_ids.get(token) for token in phrase]
+            if None in term_ids:
+                return []
+            keep = np.zeros(self.doc_count, dtype=bool)
+            keep[self._phrase_docs(term_ids)] = True
+            scores[~keep] = 0
+
+        start, end = self._doc_range(book, testament)
+        scores[:start] = 0
+        scores[end:] = 0
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+
+        results = []
+        for doc in hits:
+            verse = self.verse(int(doc))
+            verse['score'] = float(scores[doc])
+            results.append(verse)
+        return results
+
+
+def _index_path(translation: str) -> Optional[str]:
+    source = corpus_path(translation)
+    if not os.path.exists(source):
+        return None
+    stat = os.stat(source)
+    return os.path.join(
+        INDEX_DIR, f"{translation}-v{INDEX_FORMAT_VERSION}-{stat.st_mtime_ns}-{stat.st_size}.npz"
+    )
+
+
+_indexes: Dict[str, VerseSearchIndex] = {}
+_index_paths: Dict[str, str] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_verse_index(translation: str = DEFAULT_TRANSLATION) -> Optional[VerseSearchIndex]:
+    """Return the process-wide index for a translation, or None if its text isn't installed.
+
+    The index is persisted under .cache/verse_index/ keyed by the source
+    file's mtime and size, so it is only rebuilt when the corpus changes.
+    """
+    path = _index_path(translation)
+    if path is None:
+        return None
+    if _index_paths.get(translation) == path:
+        return _indexes[translation]
+
+    with _indexes_lock:
+        if _index_paths.get(translation) != path:
+            if os.path.exists(path):
+                index = VerseSearchIndex.load(path)
+            else:
+                index = VerseSearchIndex.build(load_verse_corpus(translation))
+                index.save(path)
+            _indexes[translation] = index
+            _index_paths[translation] = path
+        return _indexes[translation]
+
+
+def _synthetic_corpus(verse_count: int = 31_102, vocabulary: int = 12_000, seed: int = 7) -> List[Verse]:
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+    lengths = rng.integers(8, 45, size=verse_count)
+    # Zipf-like word frequencies, like natural text
+    token_ids = np.minimum(rng.zipf(1.3, size=int(lengths.sum())), vocabulary) - 1
+    verses, offset = [], 0
+    per_book = verse_count // len(BIBLE_BOOKS) + 1
+    for i, length in enumerate(lengths):
+        text = " ".join(words[token_ids[offset:offset + length]])
+        offset += length
+        verses.append(Verse(BIBLE_BOOKS[i // per_book], i % per_book // 30 + 1, i % 30 + 1, text))
+    return verses
+
+
+def benchmark_search(verse_count: int = 31_102, queries: int = 500) -> Dict[str, float]:
+    """Build an index over a synthetic corpus and report query latency percentiles (ms)"""
+    corpus = _synthetic_corpus(verse_count)
+    start = time.perf_counter()
+    index = VerseSearchIndex.build(corpus)
+    build_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(11)
+    samples = []
+    for i in range(queries):
+        a, b = rng.integers(0, 300, size=2)
+        query = f'w{a} w{b}' if i % 3 else f'"w{a} w{b}"'
+        start = time.perf_counter()
+        index.search(query, limit=10, testament="NT" if i % 5 == 0 else None)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        "verses": verse_count,
+        "build_s": build_s,
+        "p50_ms": samples[len(samples) // 2],
+        "p99_ms": samples[int(len(samples) * 0.99) - 1],
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark_search())
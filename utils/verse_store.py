@@ -0,0 +1,215 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.bible_books import BIBLE_BOOKS, BOOK_ORDINALS
+from utils.references import Reference, parse_reference
+from utils.response_cache import CACHE_DIR
+from utils.verse_corpus import DEFAULT_TRANSLATION, Verse, available_translations, corpus_path, load_verse_corpus
+
+STORE_FORMAT_VERSION = 1
+STORE_DIR = os.path.join(CACHE_DIR, "verse_store")
+_MAGIC = b"VRSSTORE"
+_HEADER = struct.Struct("<8sII")  # magic, format version, JSON header length
+_ALIGN = 8
+
+
+def _offsets_at(meta_length: int) -> int:
+    """File position of the offsets array: after the metadata, 8-byte aligned"""
+    return -(-(_HEADER.size + meta_length) // _ALIGN) * _ALIGN
+
+
+class VerseStore:
+    """Read-only, memory-mapped verse text for one translation.
+
+    File layout: fixed header, JSON metadata, a uint64 offsets array with
+    one entry per verse ordinal (plus a sentinel), then the UTF-8 text blob.
+    Verse ordinals run through the Bible in canonical order; each chapter
+    occupies a contiguous ordinal range, so any passage is one slice of the
+    offsets array. The file is opened with mmap, so every worker process
+    that opens the same file shares its pages through the OS page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, meta_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != STORE_FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {STORE_FORMAT_VERSION} verse store")
+        meta = json.loads(self._mmap[_HEADER.size:_HEADER.size + meta_length].decode("utf-8"))
+
+        self.translation = meta["translation"]
+        self.verse_count = meta["verse_count"]
+        # chapter_first[book_chapter_ptr[b] + c - 1] is the first ordinal of chapter c of book b
+        self.book_chapter_ptr = np.array(meta["book_chapter_ptr"], dtype=np.int64)
+        self.chapter_first = np.array(meta["chapter_first"], dtype=np.int64)
+        offsets_at = _offsets_at(meta_length)
+        self.offsets = np.frombuffer(self._mmap, dtype=np.uint64, count=self.verse_count + 1,
+                                     offset=offsets_at)
+        self._blob = memoryview(self._mmap)[offsets_at + self.offsets.nbytes:]
+
+    @staticmethod
+    def build(verses: Sequence[Verse], translation: str, path: str):
+        """Write a store file from verses sorted in canonical order"""
+        chapters: Dict[Tuple[int, int], Dict[int, str]] = {}
+        for verse in verses:
+            chapters.setdefault((verse.book_ordinal, verse.chapter), {})[verse.verse] = verse.text
+
+        book_chapter_ptr = [0]
+        chapter_first = [0]
+        texts: List[bytes] = []
+        for book in range(len(BIBLE_BOOKS)):
+            chapter_count = max((c for b, c in chapters if b == book), default=0)
+            for chapter in range(1, chapter_count + 1):
+                chapter_verses = chapters.get((book, chapter), {})
+                # Verses a translation omits keep their ordinal with empty text
+                for verse in range(1, max(chapter_verses, default=0) + 1):
+                    texts.append(chapter_verses.get(verse, "").encode("utf-8"))
+                chapter_first.append(len(texts))
+            book_chapter_ptr.append(len(chapter_first) - 1)
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum([len(text) for text in texts])
+
+        meta_bytes = json.dumps({
+            "translation": translation,
+            "verse_count": len(texts),
+            "book_chapter_ptr": book_chapter_ptr,
+            "chapter_first": chapter_first,
+        }).encode("utf-8")
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, STORE_FORMAT_VERSION, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(b"\0" * (_offsets_at(len(meta_bytes)) - f.tell()))
+            f.write(offsets.tobytes())
+            for text in texts:
+                f.write(text)
+        os.replace(tmp_path, path)
+
+    def chapter_count(self, book: str) -> int:
+        ordinal = BOOK_ORDINALS[book]
+        return int(self.book_chapter_ptr[ordinal + 1] - self.book_chapter_ptr[ordinal])
+
+    def chapter_range(self, book: str, chapter: int) -> Tuple[int, int]:
+        """[first, end) verse ordinals of a chapter; empty range if the chapter doesn't exist"""
+        if not 1 <= chapter <= self.chapter_count(book):
+            return 0, 0
+        index = self.book_chapter_ptr[BOOK_ORDINALS[book]] + chapter - 1
+        return int(self.chapter_first[index]), int(self.chapter_first[index + 1])
+
+    def ordinal(self, book: str, chapter: int, verse: int) -> Optional[int]:
+        first, end = self.chapter_range(book, chapter)
+        if verse < 1 or first + verse - 1 >= end:
+            return None
+        return first + verse - 1
+
+    def location(self, ordinal: int) -> Tuple[str, int, int]:
+        """(book, chapter, verse) for a verse ordinal"""
+        index = int(np.searchsorted(self.chapter_first, ordinal, side="right")) - 1
+        book = int(np.searchsorted(self.book_chapter_ptr, index, side="right")) - 1
+        chapter = index - int(self.book_chapter_ptr[book]) + 1
+        return BIBLE_BOOKS[book], chapter, ordinal - int(self.chapter_first[index]) + 1
+
+    def ordinal_range(self, reference: Reference) -> Tuple[int, int]:
+        """[start, end) ordinals covered by a reference, clipped to what exists"""
+        if reference.start_verse is None:
+            first, chapter_end = self.chapter_range(reference.book, reference.start_chapter)
+            start = first if chapter_end > first else None
+        else:
+            start = self.ordinal(reference.book, reference.start_chapter, reference.start_verse)
+        if reference.end_verse is None:
+            last_chapter = min(reference.end_chapter, self.chapter_count(reference.book))
+            end = self.chapter_range(reference.book, last_chapter)[1]
+        else:
+            first, chapter_end = self.chapter_range(reference.book, reference.end_chapter)
+            end = min(first + reference.end_verse, chapter_end) if chapter_end else 0
+        if start is None or end <= start:
+            return 0, 0
+        return start, end
+
+    def raw_range(self, start: int, end: int) -> memoryview:
+        """Zero-copy view of the UTF-8 text of verses [start, end), concatenated"""
+        return self._blob[int(self.offsets[start]):int(self.offsets[end])]
+
+    def text(self, ordinal: int) -> str:
+        return bytes(self.raw_range(ordinal, ordinal + 1)).decode("utf-8")
+
+    def iter_range(self, start: int, end: int) -> Iterator[Tuple[int, str]]:
+        """Yield (ordinal, text) for verses [start, end), decoding lazily from the shared mapping"""
+        offsets = self.offsets[start:end + 1]
+        for i in range(end - start):
+            yield start + i, bytes(self._blob[int(offsets[i]):int(offsets[i + 1])]).decode("utf-8")
+
+    def passage(self, reference) -> List[Dict]:
+        """Verses for a reference (string or Reference) as dictionaries"""
+        if isinstance(reference, str):
+            reference = parse_reference(reference)
+            if reference is None:
+                return []
+        start, end = self.ordinal_range(reference)
+        verses = []
+        for ordinal, text in self.iter_range(start, end):
+            book, chapter, verse = self.location(ordinal)
+            verses.append({"reference": f"{book} {chapter}:{verse}", "text": text,
+                           "version": self.translation, "ordinal": ordinal})
+        return verses
+
+    def close(self):
+        self._blob.release()
+        self.offsets = None
+        self._mmap.close()
+
+
+def _store_path(translation: str) -> Optional[str]:
+    source = corpus_path(translation)
+    if not os.path.exists(source):
+        return None
+    stat = os.stat(source)
+    return os.path.join(
+        STORE_DIR, f"{translation}-v{STORE_FORMAT_VERSION}-{stat.st_mtime_ns}-{stat.st_size}.vst"
+    )
+
+
+_stores: Dict[str, VerseStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_verse_store(translation: str = DEFAULT_TRANSLATION) -> Optional[VerseStore]:
+    """Return the memory-mapped store for a translation, building it from its TSV if needed.
+
+    Returns None when the translation's verse file is not installed.
+    """
+    path = _store_path(translation)
+    if path is None:
+        return None
+    store = _stores.get(translation)
+    if store is not None and store.path == path:
+        return store
+
+    with _stores_lock:
+        store = _stores.get(translation)
+        if store is None or store.path != path:
+            if not os.path.exists(path):
+                VerseStore.build(load_verse_corpus(translation), translation, path)
+            _stores[translation] = VerseStore(path)
+        return _stores[translation]
+
+
+def get_parallel_passage(reference: str, translations: Optional[Sequence[str]] = None) -> Dict[str, List[Dict]]:
+    """Look up one reference in several translations side by side"""
+    result = {}
+    for translation in translations or available_translations():
+        store = get_verse_store(translation)
+        if store is not None:
+            result[translation] = store.passage(reference)
+    return result
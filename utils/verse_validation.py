@@ -0,0 +1,101 @@
+import difflib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.references import parse_reference
+
+# Below this word-level similarity the model's quotation is treated as wrong, not just
+# a different translation of the same verse
+DEFAULT_SIMILARITY_THRESHOLD = 0.45
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def text_similarity(a: str, b: str) -> float:
+    """Word-level similarity in [0, 1] between two verse texts"""
+    return difflib.SequenceMatcher(None, _words(a), _words(b), autojunk=False).ratio()
+
+
+def collect_verse_items(data: Any) -> List[Dict]:
+    """Every dict in a research JSON document that carries a 'reference' field"""
+    items = []
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if isinstance(node.get('reference'), str):
+                items.append(node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return items
+
+
+def resolve_references(references: List[str], store) -> Dict[str, Optional[str]]:
+    """Resolve many references against a VerseStore in one ordered pass.
+
+    All ordinal ranges are computed first, merged and read in ascending
+    order, so one response costs a single sweep over the mapped text.
+    """
+    ranges: Dict[str, Tuple[int, int]] = {}
+    for reference in set(references):
+        parsed = parse_reference(reference)
+        ranges[reference] = store.ordinal_range(parsed) if parsed else (0, 0)
+
+    wanted = sorted({ordinal for start, end in ranges.values() for ordinal in range(start, end)})
+    texts: Dict[int, str] = {}
+    run_start = None
+    for i, ordinal in enumerate(wanted):
+        if run_start is None:
+            run_start = ordinal
+        if i + 1 == len(wanted) or wanted[i + 1] != ordinal + 1:
+            texts.update(store.iter_range(run_start, ordinal + 1))
+            run_start = None
+
+    resolved = {}
+    for reference, (start, end) in ranges.items():
+        verse_texts = [texts[ordinal] for ordinal in range(start, end) if texts.get(ordinal)]
+        resolved[reference] = " ".join(verse_texts) if verse_texts else None
+    return resolved
+
+
+def enrich_verses(data: Any, store, threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> Dict[str, int]:
+    """Fill in or check verse text in a parsed research document, in place.
+
+    Every item with a 'reference' that resolves locally gets the local text
+    (labelled with `text_source`); quotations that disagree with it are
+    marked text_status='corrected' and the model's wording kept as
+    'model_text'. References that don't resolve are marked 'unverified'.
+    Returns counts per status.
+    """
+    counts = {"filled": 0, "verified": 0, "corrected": 0, "unverified": 0}
+    if store is None:
+        return counts
+
+    items = collect_verse_items(data)
+    resolved = resolve_references([item['reference'] for item in items], store)
+
+    for item in items:
+        local_text = resolved.get(item['reference'])
+        model_text = item.get('text')
+        if local_text is None:
+            # Also without model text (references-only prompts): the reference itself may be invented
+            item['text_status'] = 'unverified'
+            counts['unverified'] += 1
+            continue
+
+        if not model_text:
+            item['text_status'] = 'filled'
+        elif text_similarity(model_text, local_text) >= threshold:
+            item['text_status'] = 'verified'
+        else:
+            item['text_status'] = 'corrected'
+            item['model_text'] = model_text
+        counts[item['text_status']] += 1
+        item['text'] = local_text
+        item['text_source'] = store.translation
+    return counts
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from utils.bible_books import BIBLE_BOOKS, BOOK_GENRES, GENRES, OT_BOOK_COUNT
+from utils.occurrence_matrix import OccurrenceMatrix, get_occurrence_matrix
+from utils.response_cache import CACHE_DIR
+
+AGGREGATES_FORMAT_VERSION = 1
+AGGREGATES_DIR = os.path.join(CACHE_DIR, "word_aggregates")
+
+# Books x genres indicator; book_counts @ _GENRE_MATRIX gives per-genre sums
+_GENRE_MATRIX = np.zeros((len(BIBLE_BOOKS), len(GENRES)), dtype=np.int64)
+_GENRE_MATRIX[np.arange(len(BIBLE_BOOKS)), BOOK_GENRES] = 1
+
+
+class WordSummary(NamedTuple):
+    """Everything the word study summary widgets show for one selection"""
+    book_totals: np.ndarray
+    total: int
+    books_with_word: int
+    ot_total: int
+    nt_total: int
+    genre_totals: np.ndarray
+    ranked_books: List[Tuple[str, int]]
+
+    def top_books(self, n: int = 5) -> List[Tuple[str, int]]:
+        return self.ranked_books[:n]
+
+    def genre_breakdown(self) -> List[Tuple[str, int]]:
+        """(genre, occurrences) for genres where the selection occurs, in canonical order"""
+        return [(genre, int(count)) for genre, count in zip(GENRES, self.genre_totals) if count]
+
+
+class WordAggregates:
+    """Per-word and per-lemma summary statistics, precomputed at data-build time.
+
+    Row i is either an English word (lemma "") holding the sum over all its
+    lemmas, or one (word, lemma) pair. Each row stores per-book counts,
+    total, OT/NT split, per-genre sums and the books ranked by count, so the
+    summary for a full word or a single lemma is a lookup; any other lemma
+    combination sums a few stored vectors.
+    """
+
+    ARRAYS = ("words", "lemmas", "book_counts", "totals", "books_with_word",
+              "testament_totals", "genre_totals", "ranked_books")
+
+    def __init__(self, arrays: Dict[str, np.ndarray], version: Optional[Tuple[int, ...]] = None):
+        for name in self.ARRAYS:
+            # Summaries hand out views of these arrays to every session
+            arrays[name].setflags(write=False)
+            setattr(self, name, arrays[name])
+        self.version = version
+        self._rows = {(word, lemma): i for i, (word, lemma) in
+                      enumerate(zip(self.words.tolist(), self.lemmas.tolist()))}
+        self._word_lemmas: Dict[str, set] = {}
+        for word, lemma in self._rows:
+            if lemma:
+                self._word_lemmas.setdefault(word, set()).add(lemma)
+
+    @classmethod
+    def build(cls, matrix: OccurrenceMatrix, version: Optional[Tuple[int, ...]] = None) -> "WordAggregates":
+        words, lemmas, vectors = [], [], []
+        word_rows: Dict[str, List[int]] = {}
+        for row, (word, lemma) in enumerate(matrix.rows):
+            word_rows.setdefault(word, []).append(row)
+        for word, rows in word_rows.items():
+            words.append(word)
+            lemmas.append("")
+            vectors.append(matrix.counts[rows].sum(axis=0))
+            for row in rows:
+                words.append(word)
+                lemmas.append(matrix.rows[row][1])
+                vectors.append(matrix.counts[row])
+
+        book_counts = (np.array(vectors, dtype=np.int32) if vectors
+                       else np.zeros((0, len(BIBLE_BOOKS)), dtype=np.int32))
+        return cls({
+            "words": np.array(words, dtype=str),
+            "lemmas": np.array(lemmas, dtype=str),
+            "book_counts": book_counts,
+            "totals": book_counts.sum(axis=1, dtype=np.int64),
+            "books_with_word": np.count_nonzero(book_counts, axis=1).astype(np.int16),
+            "testament_totals": np.stack([book_counts[:, :OT_BOOK_COUNT].sum(axis=1),
+                                          book_counts[:, OT_BOOK_COUNT:].sum(axis=1)], axis=1).astype(np.int64),
+            "genre_totals": book_counts.astype(np.int64) @ _GENRE_MATRIX,
+            # Highest count first, ties in canonical order
+            "ranked_books": np.argsort(-book_counts, axis=1, kind="stable").astype(np.int8),
+        }, version)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, version: Optional[Tuple[int, ...]] = None) -> "WordAggregates":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in cls.ARRAYS}, version)
+
+    def _row_summary(self, row: int) -> WordSummary:
+        book_totals = self.book_counts[row]
+        ranked = [(BIBLE_BOOKS[i], int(book_totals[i])) for i in self.ranked_books[row]
+                  if book_totals[i] > 0]
+        return WordSummary(
+            book_totals=book_totals,
+            total=int(self.totals[row]),
+            books_with_word=int(self.books_with_word[row]),
+            ot_total=int(self.testament_totals[row, 0]),
+            nt_total=int(self.testament_totals[row, 1]),
+            genre_totals=self.genre_totals[row],
+            ranked_books=ranked,
+        )
+
+    def summary(self, word: str, lemmas: Optional[Iterable[str]] = None) -> WordSummary:
+        """Summary for an English word, restricted to `lemmas` if given"""
+        known = self._word_lemmas.get(word, set())
+        selected = known if lemmas is None else known.intersection(lemmas)
+        if selected == known and word in self._word_lemmas:
+            return self._row_summary(self._rows[(word, "")])
+        if len(selected) == 1:
+            return self._row_summary(self._rows[(word, next(iter(selected)))])
+
+        rows = [self._rows[(word, lemma)] for lemma in selected]
+        book_totals = self.book_counts[rows].sum(axis=0)
+        order = np.argsort(-book_totals, kind="stable")
+        testament_totals = self.testament_totals[rows].sum(axis=0)
+        return WordSummary(
+            book_totals=book_totals,
+            total=int(self.totals[rows].sum()),
+            books_with_word=int(np.count_nonzero(book_totals)),
+            ot_total=int(testament_totals[0]),
+            nt_total=int(testament_totals[1]),
+            genre_totals=self.genre_totals[rows].sum(axis=0),
+            ranked_books=[(BIBLE_BOOKS[i], int(book_totals[i])) for i in order if book_totals[i] > 0],
+        )
+
+
+def _version_key(version) -> str:
+    return hashlib.sha256(repr(version).encode("utf-8")).hexdigest()[:16]
+
+
+def aggregates_path(snapshot) -> str:
+    return os.path.join(AGGREGATES_DIR, f"v{AGGREGATES_FORMAT_VERSION}-{_version_key(snapshot.version)}.npz")
+
+
+def build_word_aggregates(snapshot, matrix: Optional[OccurrenceMatrix] = None) -> WordAggregates:
+    """Compile and save the aggregates file for a lexicon snapshot"""
+    if matrix is None:
+        matrix = get_occurrence_matrix(snapshot)
+    aggregates = WordAggregates.build(matrix, snapshot.version)
+    aggregates.save(aggregates_path(snapshot))
+    return aggregates
+
+
+_cached_aggregates: Optional[WordAggregates] = None
+_aggregates_lock = threading.Lock()
+
+
+def get_word_aggregates(snapshot) -> WordAggregates:
+    """Return the aggregates for a LexiconSnapshot, loading the precomputed file if it exists"""
+    global _cached_aggregates
+    aggregates = _cached_aggregates
+    if aggregates is not None and aggregates.version == snapshot.version:
+        return aggregates
+    with _aggregates_lock:
+        if _cached_aggregates is None or _cached_aggregates.version != snapshot.version:
+            path = aggregates_path(snapshot)
+            if os.path.exists(path):
+                _cached_aggregates = WordAggregates.load(path, snapshot.version)
+            else:
+                _cached_aggregates = build_word_aggregates(snapshot)
+        return _cached_aggregates
+
+
+if __name__ == "__main__":
+    from utils.lexicon_store import get_lexicon_store
+
+    snapshot = get_lexicon_store().get()
+    start = time.perf_counter()
+    aggregates = build_word_aggregates(snapshot)
+    print(f"{len(aggregates.words)} rows written to {aggregates_path(snapshot)} "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,123 @@
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+
+def normalize_gloss(word: str) -> str:
+    """Case-fold an English gloss and reduce it to a crude stem.
+
+    Groups simple inflections so "believe", "believed", "believing" and
+    "believes" share one key. This is deliberately lightweight; it only has
+    to be consistent between index build and lookup. Verse text is stemmed
+    by utils.semantic_index.stem instead, which also strips KJV endings.
+    """
+    stem = word.strip().casefold()
+    if len(stem) > 5 and stem.endswith("ing"):
+        stem = stem[:-3]
+    elif len(stem) > 4 and stem.endswith("ed"):
+        stem = stem[:-2]
+    elif len(stem) > 3 and stem.endswith("s") and not stem.endswith("ss"):
+        stem = stem[:-1]
+    if len(stem) > 3 and stem.endswith("e"):
+        stem = stem[:-1]
+    return stem
+
+
+class EnglishWordIndex:
+    """Inverted index from normalized English gloss to original-language lemmas"""
+
+    def __init__(self, greek_words: Mapping, hebrew_words: Mapping, version=None):
+        self.version = version
+        index: Dict[str, Dict[str, list]] = {}
+        for language, lexicon in (("greek", greek_words), ("hebrew", hebrew_words)):
+            for lemma, info in lexicon.items():
+                for gloss in info.get('english_words', ()):
+                    buckets = index.setdefault(normalize_gloss(gloss), {"greek": [], "hebrew": []})
+                    if lemma not in buckets[language]:
+                        buckets[language].append(lemma)
+
+        self._index = {
+            key: (tuple(buckets["greek"]), tuple(buckets["hebrew"]))
+            for key, buckets in index.items()
+        }
+        self._greek_words = greek_words
+        self._hebrew_words = hebrew_words
+
+    def __len__(self):
+        return len(self._index)
+
+    def lemma_ids(self, english_word: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Return (greek_lemmas, hebrew_lemmas) for an English word"""
+        return self._index.get(normalize_gloss(english_word), ((), ()))
+
+    def related_words(self, english_word: str) -> Tuple[Mapping, Mapping]:
+        """Return ({lemma: info} for Greek, {lemma: info} for Hebrew)"""
+        greek_ids, hebrew_ids = self.lemma_ids(english_word)
+        related_greek = {lemma: self._greek_words[lemma] for lemma in greek_ids}
+        related_hebrew = {lemma: self._hebrew_words[lemma] for lemma in hebrew_ids}
+        return MappingProxyType(related_greek), MappingProxyType(related_hebrew)
+
+
+_cached_index: Optional[EnglishWordIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_word_index(snapshot) -> EnglishWordIndex:
+    """Return the index for a LexiconSnapshot, building it once per lexicon version"""
+    global _cached_index
+    index = _cached_index
+    if index is not None and index.version == snapshot.version:
+        return index
+    with _index_lock:
+        if _cached_index is None or _cached_index.version != snapshot.version:
+            _cached_index = EnglishWordIndex(snapshot.greek_words, snapshot.hebrew_words, snapshot.version)
+        return _cached_index
+
+
+def _synthetic_lexicon(size: int, vocabulary: int = 5000) -> Dict[str, dict]:
+    return {
+        f"lemma{i}": {"english_words": [f"word{i % vocabulary}", f"word{(i * 7) % vocabulary}ed"]}
+        for i in range(size)
+    }
+
+
+def benchmark_lookup(sizes=(100, 10_000, 100_000), lookups: int = 200) -> list:
+    """Compare the linear english_words scan against the inverted index.
+
+    Returns one dict per lexicon size with per-lookup timings in microseconds.
+    """
+    results = []
+    for size in sizes:
+        greek_words = _synthetic_lexicon(size)
+        queries = [f"word{i % 5000}" for i in range(lookups)]
+
+        start = time.perf_counter()
+        for query in queries:
+            {word: info for word, info in greek_words.items() if query in info.get('english_words', [])}
+        scan_us = (time.perf_counter() - start) / lookups * 1e6
+
+        start = time.perf_counter()
+        index = EnglishWordIndex(greek_words, {})
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for query in queries:
+            index.related_words(query)
+        index_us = (time.perf_counter() - start) / lookups * 1e6
+
+        results.append({
+            "entries": size,
+            "scan_us": scan_us,
+            "index_us": index_us,
+            "index_build_ms": build_ms,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    for row in benchmark_lookup():
+        print(
+            f"{row['entries']:>7} entries: scan {row['scan_us']:10.1f} us  "
+            f"index {row['index_us']:6.1f} us  (build {row['index_build_ms']:.1f} ms)"
+        )